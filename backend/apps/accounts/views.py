@@ -1,3 +1,4 @@
+from asgiref.sync import sync_to_async
 from rest_framework.request import Request
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -12,7 +13,7 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from django.conf import settings
-from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
@@ -23,6 +24,8 @@ from apps.accounts.serializers import (
     RefreshSerializer,
 )
 from apps.users.models import User
+from apps.cart.storage import merge_guest_cart
+from apps.core.views import AsyncAPIView
 
 TOKEN_RESPONSE = openapi.Schema(
     type=openapi.TYPE_OBJECT,
@@ -72,7 +75,13 @@ class TokenObtainPairViewSwagger(TokenObtainPairView):
         },
     )
     def post(self, request: Request, *args, **kwargs) -> Response:
-        return super().post(request, *args, **kwargs)
+        serializer = self.get_serializer(data=request.data)
+        try:
+            serializer.is_valid(raise_exception=True)
+        except TokenError as e:
+            raise InvalidToken(e.args[0])
+        merge_guest_cart(request, serializer.user)
+        return Response(serializer.validated_data, status=status.HTTP_200_OK)
 
 
 
@@ -210,7 +219,7 @@ class TokenRefreshViewSwagger(TokenRefreshView):
 
 
 
-class RequestOtp(APIView):
+class RequestOtp(AsyncAPIView):
     permission_classes = [AllowAny]
     throttle_classes = [ScopedRateThrottle]
     throttle_scope = "otp_request"
@@ -235,17 +244,17 @@ class RequestOtp(APIView):
             400: "Bad Request",
         },
     )
-    def post(self, request):
+    async def post(self, request):
         serializer = OtpRequestSerializer(data=request.data)
         if serializer.is_valid():
             email = serializer.validated_data["email"]  # type: ignore
             otp_key = f"otp_{email}"
-            otp = cache.get(otp_key)
+            otp = await cache.aget(otp_key)
             if not otp:
                 otp = randint(1000, 9999)
-                cache.set(otp_key, otp, timeout=settings.OTP_TIME)
+                await cache.aset(otp_key, otp, timeout=settings.OTP_TIME)
             print(otp)  # for testing purposes
-            send_otp_email_task.delay(email, otp)
+            await sync_to_async(send_otp_email_task.delay)(email, otp)
             return Response(
                 {"message": "An OTP has been sent to your email."},
                 status=status.HTTP_200_OK,
@@ -259,7 +268,7 @@ def get_tokens_for_user(user):
         "access": str(refresh.access_token),
     }
 
-class VerifyOtp(APIView):
+class VerifyOtp(AsyncAPIView):
     throttle_classes = [ScopedRateThrottle]
     throttle_scope = "otp_verify"
     permission_classes = [AllowAny]
@@ -301,13 +310,13 @@ class VerifyOtp(APIView):
             ),
         },
     )
-    def post(self, request):
+    async def post(self, request):
         serializer = OtpVerifySerializer(data=request.data)
         if serializer.is_valid():
             email = serializer.validated_data["email"]  # type: ignore
             sent_otp = serializer.validated_data["otp"]  # type: ignore
             otp_key = f"otp_{email}"
-            main_otp = cache.get(otp_key)
+            main_otp = await cache.aget(otp_key)
             if main_otp is None:
                 return Response(
                     {"message": "OTP has expired or is invalid."},
@@ -315,9 +324,10 @@ class VerifyOtp(APIView):
                 )
             if sent_otp == main_otp:
                 try:
-                    user = User.objects.get(email=email)
-                    cache.delete(otp_key)
-                    tokens = get_tokens_for_user(user)
+                    user = await User.objects.aget(email=email)
+                    await cache.adelete(otp_key)
+                    await sync_to_async(merge_guest_cart)(request, user)
+                    tokens = await sync_to_async(get_tokens_for_user)(user)
                     return Response(tokens, status=status.HTTP_200_OK)
                 except User.DoesNotExist:
                     return Response(
@@ -0,0 +1,11 @@
+from rest_framework.permissions import BasePermission
+from apps.cart.storage import redis_carts_enabled
+
+
+class HasCart(BasePermission):
+    """Logged-in users, and guests too when carts are kept in Redis."""
+
+    def has_permission(self, request, view):
+        return bool(
+            request.user and request.user.is_authenticated
+        ) or redis_carts_enabled()
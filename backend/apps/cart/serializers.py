@@ -71,25 +71,31 @@ class CartSerializer(serializers.ModelSerializer):
         model = Cart
         fields = ["user", "items", "total_price", "total_discount", "products"]
 
+    def cart_items(self, obj):
+        # Redis carts have no rows; their lines are passed in the context.
+        if "items" in self.context:
+            return self.context["items"]
+        return obj.items.all()
+
     def get_items(self, obj):
-        items = obj.items.all()
+        items = self.cart_items(obj)
         return CartItemReadSerializer(items, many=True, context=self.context).data
 
     def get_total_price(self, obj):
         total = sum(
-            item.quantity * item.store_item.total_price for item in obj.items.all()
+            item.quantity * item.store_item.total_price for item in self.cart_items(obj)
         )
         return total
 
     def get_total_discount(self, obj):
         total_discount = sum(
             item.quantity * (item.store_item.price - item.store_item.total_price)
-            for item in obj.items.all()
+            for item in self.cart_items(obj)
         )
         return total_discount
 
     def get_products(self, obj):
-        products = [item.store_item.product for item in obj.items.all()]
+        products = [item.store_item.product for item in self.cart_items(obj)]
         serializer = ProductReadSerializer(products, many=True, context=self.context)
         return serializer.data
 
@@ -112,3 +118,15 @@ class CartItemWriteSerializer(serializers.ModelSerializer):
         if value > 0 and store_item and store_item.stock < value:
             raise serializers.ValidationError("Not enough stock available")
         return value
+
+
+class CartOperationSerializer(serializers.Serializer):
+    op = serializers.ChoiceField(choices=["add", "set", "remove"])
+    store_item = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=0, default=1)
+
+
+class CartBatchSerializer(serializers.Serializer):
+    operations = serializers.ListField(
+        child=CartOperationSerializer(), min_length=1, max_length=100
+    )
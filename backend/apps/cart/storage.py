@@ -0,0 +1,371 @@
+import re
+import threading
+import uuid
+from collections import defaultdict
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django_redis.cache import RedisCache
+from apps.cart.models import Cart, CartItem
+from apps.products.serializers import product_read_queryset
+from apps.stores.models import StoreItem
+
+CART_KEY = "cart:{owner}"
+DIRTY_CARTS_KEY = "cart:dirty"
+CART_TOKEN_HEADER = "HTTP_X_CART_TOKEN"
+GUEST_TOKEN = re.compile(r"[0-9a-f]{32}")
+# Field set in every user cart loaded from the database, so an emptied cart
+# is not loaded again from rows that were not flushed yet.
+LOADED = 0
+
+
+class NotEnoughStock(Exception):
+    pass
+
+
+def cart_items_for_read(items):
+    """``items`` with everything ``CartItemReadSerializer`` reads loaded up front."""
+    return product_read_queryset(
+        items.select_related("store_item__store"), "store_item__product__"
+    )
+
+
+def redis_carts_enabled():
+    return settings.CART_STORAGE == "redis"
+
+
+class LocalCartBackend:
+    """Per-process carts, used when the cache is not Redis (tests, local runs)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.carts = defaultdict(dict)
+        self.dirty = set()
+
+    def read(self, key):
+        with self.lock:
+            return dict(self.carts.get(key, {}))
+
+    def update(self, key, values, ttl):
+        with self.lock:
+            cart = self.carts[key]
+            for field, value in values.items():
+                if value > 0:
+                    cart[field] = value
+                else:
+                    cart.pop(field, None)
+
+    def increment(self, key, field, amount, ttl):
+        with self.lock:
+            cart = self.carts[key]
+            cart[field] = cart.get(field, 0) + amount
+            return cart[field]
+
+    def delete(self, key):
+        with self.lock:
+            self.carts.pop(key, None)
+
+    def mark_dirty(self, user_id):
+        with self.lock:
+            self.dirty.add(user_id)
+
+    def pop_dirty(self, count):
+        with self.lock:
+            popped = [self.dirty.pop() for _ in range(min(count, len(self.dirty)))]
+        return popped
+
+
+class RedisCartBackend:
+    """Carts kept in one Redis hash each (store item id -> quantity), shared
+    by every web and Celery worker process."""
+
+    def connection(self):
+        from django_redis import get_redis_connection
+
+        return get_redis_connection("default")
+
+    def read(self, key):
+        raw = self.connection().hgetall(key)
+        return {int(field): int(value) for field, value in raw.items()}
+
+    def update(self, key, values, ttl):
+        pipe = self.connection().pipeline()
+        removed = [field for field, value in values.items() if value <= 0]
+        kept = {field: value for field, value in values.items() if value > 0}
+        if removed:
+            pipe.hdel(key, *removed)
+        if kept:
+            pipe.hset(key, mapping=kept)
+        pipe.expire(key, ttl)
+        pipe.execute()
+
+    def increment(self, key, field, amount, ttl):
+        pipe = self.connection().pipeline()
+        pipe.hincrby(key, field, amount)
+        pipe.expire(key, ttl)
+        return pipe.execute()[0]
+
+    def delete(self, key):
+        self.connection().delete(key)
+
+    def mark_dirty(self, user_id):
+        self.connection().sadd(DIRTY_CARTS_KEY, user_id)
+
+    def pop_dirty(self, count):
+        popped = self.connection().spop(DIRTY_CARTS_KEY, count) or []
+        return [int(user_id) for user_id in popped]
+
+
+local_backend = LocalCartBackend()
+
+
+def get_backend():
+    if isinstance(caches["default"], RedisCache):
+        return RedisCartBackend()
+    return local_backend
+
+
+class DatabaseCart:
+    """The user's ``Cart`` and ``CartItem`` rows."""
+
+    token = None
+    new_token = False
+
+    def __init__(self, user):
+        self.user = user
+
+    def as_model(self):
+        return self.user.cart
+
+    def lines(self):
+        return dict(
+            CartItem.objects.filter(cart__user=self.user).values_list(
+                "store_item_id", "quantity"
+            )
+        )
+
+    def write(self, values):
+        with transaction.atomic():
+            save_lines(self.user.cart, values)
+
+    def items(self):
+        items = CartItem.objects.filter(cart=self.user.cart)
+        return list(cart_items_for_read(items))
+
+    def get_item(self, pk):
+        try:
+            return CartItem.objects.get(pk=pk, cart=self.user.cart)
+        except CartItem.DoesNotExist:
+            return None
+
+    def add(self, store_item, quantity):
+        """Add ``quantity`` of ``store_item``; returns the line and whether it
+        is new."""
+        cart_item, created = CartItem.objects.get_or_create(
+            cart=self.user.cart, store_item=store_item, defaults={"quantity": 0}
+        )
+        if cart_item.quantity + quantity > store_item.stock:
+            raise NotEnoughStock
+        cart_item.quantity += quantity
+        cart_item.save()
+        return cart_item, created
+
+    def set_quantity(self, item, quantity):
+        item.quantity = quantity
+        item.save()
+
+    def remove(self, item):
+        item.delete()
+
+
+class RedisCart:
+    """Cart lines kept in a Redis hash instead of ``CartItem`` rows, so a
+    cart update is one Redis round trip and one stock lookup.
+
+    User carts are loaded from their rows on first use and written back by
+    ``flush_carts`` and before checkout. Guest carts are named by a token
+    sent in the ``X-Cart-Token`` header, live only in Redis for
+    ``CART_TTL`` seconds and are merged into the user's cart at login.
+
+    Lines are not rows, so their ``id`` is the store item's id.
+    """
+
+    def __init__(self, user=None, token=None, new_token=False):
+        self.user = user
+        self.token = token
+        self.new_token = new_token
+        self.backend = get_backend()
+        if user is not None:
+            self.key = CART_KEY.format(owner=f"user:{user.pk}")
+        elif token:
+            self.key = CART_KEY.format(owner=f"guest:{token}")
+        else:
+            self.key = None
+
+    def as_model(self):
+        """An unsaved ``Cart`` standing for this one in ``CartSerializer``."""
+        return Cart(user=self.user)
+
+    def lines(self):
+        if self.key is None:
+            return {}
+        lines = self.backend.read(self.key)
+        if not lines and self.user is not None:
+            lines = dict(
+                CartItem.objects.filter(cart__user=self.user).values_list(
+                    "store_item_id", "quantity"
+                )
+            )
+            self.backend.update(self.key, {**lines, LOADED: 1}, settings.CART_TTL)
+        lines.pop(LOADED, None)
+        return lines
+
+    def write(self, values):
+        self.backend.update(self.key, values, settings.CART_TTL)
+        if self.user is not None:
+            self.backend.mark_dirty(self.user.pk)
+
+    def build_items(self, lines):
+        store_items = product_read_queryset(
+            StoreItem.objects.select_related("store").filter(pk__in=list(lines)),
+            "product__",
+        ).order_by("pk")
+        return [
+            CartItem(
+                id=store_item.pk, store_item=store_item, quantity=lines[store_item.pk]
+            )
+            for store_item in store_items
+        ]
+
+    def items(self):
+        lines = self.lines()
+        return self.build_items(lines) if lines else []
+
+    def get_item(self, pk):
+        quantity = self.lines().get(pk)
+        if not quantity:
+            return None
+        items = self.build_items({pk: quantity})
+        return items[0] if items else None
+
+    def add(self, store_item, quantity):
+        current = self.lines().get(store_item.pk, 0)
+        if current + quantity > store_item.stock:
+            raise NotEnoughStock
+        new_quantity = self.backend.increment(
+            self.key, store_item.pk, quantity, settings.CART_TTL
+        )
+        if self.user is not None:
+            self.backend.mark_dirty(self.user.pk)
+        item = CartItem(id=store_item.pk, store_item=store_item, quantity=new_quantity)
+        return item, not current
+
+    def set_quantity(self, item, quantity):
+        self.write({item.store_item_id: quantity})
+        item.quantity = quantity
+
+    def remove(self, item):
+        self.write({item.store_item_id: 0})
+
+    def clear(self):
+        # The next read loads the (emptied) rows again.
+        self.backend.delete(self.key)
+
+
+def get_cart(request, create=False):
+    """The cart of ``request``'s user or, with Redis carts, the guest cart
+    named by its ``X-Cart-Token`` header. With ``create`` a guest without a
+    token is given a new one."""
+    if request.user.is_authenticated:
+        if redis_carts_enabled():
+            return RedisCart(user=request.user)
+        return DatabaseCart(request.user)
+    token = request.META.get(CART_TOKEN_HEADER, "")
+    if GUEST_TOKEN.fullmatch(token):
+        return RedisCart(token=token)
+    if create:
+        return RedisCart(token=uuid.uuid4().hex, new_token=True)
+    return RedisCart()
+
+
+def merge_guest_cart(request, user):
+    """Move the guest cart of ``request`` into ``user``'s cart after login.
+    Quantities are added up, but never beyond the stock."""
+    token = request.META.get(CART_TOKEN_HEADER, "")
+    if not redis_carts_enabled() or not GUEST_TOKEN.fullmatch(token):
+        return
+    guest = RedisCart(token=token)
+    guest_lines = guest.lines()
+    if guest_lines:
+        cart = RedisCart(user=user)
+        lines = cart.lines()
+        stock = dict(
+            StoreItem.objects.filter(pk__in=list(guest_lines)).values_list(
+                "pk", "stock"
+            )
+        )
+        cart.write(
+            {
+                pk: min(lines.get(pk, 0) + quantity, stock[pk])
+                for pk, quantity in guest_lines.items()
+                if pk in stock
+            }
+        )
+    guest.clear()
+
+
+def save_lines(cart, values):
+    """Set the quantities ``values`` (store item id -> quantity) on ``cart``'s
+    rows with one bulk update and one bulk insert; 0 removes a line."""
+    removed = [pk for pk, quantity in values.items() if quantity <= 0]
+    kept = [pk for pk, quantity in values.items() if quantity > 0]
+    if removed:
+        cart.items.filter(store_item_id__in=removed).delete()
+    rows = {
+        item.store_item_id: item
+        for item in cart.items.filter(store_item_id__in=kept)
+    }
+    changed = []
+    for pk, quantity in values.items():
+        row = rows.get(pk)
+        if row is not None and row.quantity != quantity:
+            row.quantity = quantity
+            changed.append(row)
+    CartItem.objects.bulk_update(changed, ["quantity"])
+    CartItem.objects.bulk_create(
+        [
+            CartItem(cart=cart, store_item_id=pk, quantity=quantity)
+            for pk, quantity in values.items()
+            if quantity > 0 and pk not in rows
+        ]
+    )
+
+
+def flush_cart(user_id):
+    """Write the Redis cart of user ``user_id`` to its ``CartItem`` rows."""
+    lines = get_backend().read(CART_KEY.format(owner=f"user:{user_id}"))
+    if not lines:
+        # Expired or cleared: the rows are already up to date.
+        return
+    lines.pop(LOADED, None)
+    existing = set(
+        StoreItem.objects.filter(pk__in=list(lines)).values_list("pk", flat=True)
+    )
+    lines = {pk: quantity for pk, quantity in lines.items() if pk in existing}
+    with transaction.atomic():
+        cart, _ = Cart.objects.get_or_create(user_id=user_id)
+        cart.items.exclude(store_item_id__in=list(lines)).delete()  # type: ignore
+        save_lines(cart, lines)
+
+
+def persist_cart(user):
+    """Make ``user``'s ``CartItem`` rows current, e.g. before checkout."""
+    if redis_carts_enabled():
+        flush_cart(user.pk)
+
+
+def clear_cart(user):
+    """Empty ``user``'s cart, in the database and in Redis."""
+    CartItem.objects.filter(cart__user=user).delete()
+    if redis_carts_enabled():
+        RedisCart(user=user).clear()
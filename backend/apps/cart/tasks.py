@@ -0,0 +1,22 @@
+from celery import shared_task
+from apps.cart.storage import flush_cart, get_backend, redis_carts_enabled
+
+FLUSH_BATCH_SIZE = 500
+
+
+@shared_task
+def flush_carts():
+    """Write the Redis carts changed since the last run to the database."""
+    if not redis_carts_enabled():
+        return "carts are stored in the database"
+    backend = get_backend()
+    flushed = 0
+    while user_ids := backend.pop_dirty(FLUSH_BATCH_SIZE):
+        for user_id in user_ids:
+            try:
+                flush_cart(user_id)
+            except Exception:
+                backend.mark_dirty(user_id)
+                raise
+            flushed += 1
+    return f"flushed {flushed} cart(s)"
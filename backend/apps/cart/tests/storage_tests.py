@@ -0,0 +1,152 @@
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from apps.cart.models import Cart, CartItem
+from apps.cart.storage import local_backend
+from apps.cart.tasks import flush_carts
+from apps.categories.models import Category
+from apps.products.models import Product
+from apps.stores.models import Store, StoreItem
+from apps.users.models import User
+
+
+@override_settings(CART_STORAGE="redis")
+class RedisCartTest(APITestCase):
+    def setUp(self):
+        local_backend.carts.clear()
+        local_backend.dirty.clear()
+        self.user = User.objects.create_user(  # type: ignore
+            email="user@example.com", password="password123", phone="09120000000"
+        )
+        self.cart = Cart.objects.create(user=self.user)
+        category = Category.objects.create(name="Phones", description="Phones")
+        product = Product.objects.create(
+            name="Phone X", description="A phone", category=category
+        )
+        store = Store.objects.create(seller=self.user, name="Shop", description="")
+        self.store_item = StoreItem.objects.create(
+            store=store, product=product, price=100, stock=5
+        )
+        self.add_url = reverse("add_store_item_to_cart", args=[self.store_item.pk])
+
+    def test_user_cart_is_written_back_by_flush(self):
+        CartItem.objects.create(cart=self.cart, store_item=self.store_item, quantity=1)
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.post(self.add_url, {"quantity": 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["quantity"], 3)  # type: ignore
+        self.assertEqual(self.cart.items.get().quantity, 1)  # type: ignore
+
+        flush_carts()
+        self.assertEqual(self.cart.items.get().quantity, 3)  # type: ignore
+
+        url = reverse("user_cart_item_detail", args=[self.store_item.pk])
+        response = self.client.delete(url)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.client.get(reverse("user_cart_items")).data, [])
+        flush_carts()
+        self.assertFalse(self.cart.items.exists())  # type: ignore
+
+    def test_guest_cart_is_merged_at_login(self):
+        response = self.client.post(self.add_url, {"quantity": 4})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        token = response["X-Cart-Token"]
+
+        response = self.client.get(reverse("user_cart"), HTTP_X_CART_TOKEN=token)
+        self.assertEqual(len(response.data["items"]), 1)  # type: ignore
+        self.assertIsNone(response.data["user"])  # type: ignore
+        self.assertEqual(self.client.get(reverse("user_cart_items")).data, [])
+
+        CartItem.objects.create(cart=self.cart, store_item=self.store_item, quantity=3)
+        response = self.client.post(
+            reverse("token_obtain_pair"),
+            {"phone": "09120000000", "password": "password123"},
+            HTTP_X_CART_TOKEN=token,
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        flush_carts()
+        # 3 + 4 is more than the 5 in stock.
+        self.assertEqual(self.cart.items.get().quantity, 5)  # type: ignore
+        response = self.client.get(reverse("user_cart_items"), HTTP_X_CART_TOKEN=token)
+        self.assertEqual(response.data, [])
+
+
+class CartBatchTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(  # type: ignore
+            email="user@example.com", password="password123", phone="09120000000"
+        )
+        self.cart = Cart.objects.create(user=self.user)
+        category = Category.objects.create(name="Phones", description="Phones")
+        store = Store.objects.create(seller=self.user, name="Shop", description="")
+        self.items = [
+            StoreItem.objects.create(
+                store=store,
+                product=Product.objects.create(
+                    name=f"Phone {n}", description="A phone", category=category
+                ),
+                price=100,
+                stock=5,
+            )
+            for n in range(3)
+        ]
+        CartItem.objects.create(cart=self.cart, store_item=self.items[0], quantity=1)
+        CartItem.objects.create(cart=self.cart, store_item=self.items[1], quantity=1)
+        self.url = reverse("user_cart_batch")
+        self.client.force_authenticate(user=self.user)
+
+    def batch(self, *operations):
+        return self.client.post(
+            self.url,
+            {
+                "operations": [
+                    {"op": op, "store_item": item.pk, "quantity": quantity}
+                    for op, item, quantity in operations
+                ]
+            },
+            format="json",
+        )
+
+    def quantities(self):
+        return dict(self.cart.items.values_list("store_item_id", "quantity"))  # type: ignore
+
+    def test_operations_are_applied_together(self):
+        response = self.batch(
+            ("add", self.items[0], 2),
+            ("remove", self.items[1], 0),
+            ("add", self.items[2], 1),
+            ("add", self.items[2], 1),
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["items"]), 2)  # type: ignore
+        self.assertEqual(self.quantities(), {self.items[0].pk: 3, self.items[2].pk: 2})
+
+    def test_nothing_is_applied_when_one_operation_fails(self):
+        response = self.batch(("set", self.items[0], 2), ("add", self.items[1], 5))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["store_items"], [self.items[1].pk])  # type: ignore
+        self.assertEqual(self.quantities(), {self.items[0].pk: 1, self.items[1].pk: 1})
+
+    def test_deactivated_lines_can_still_be_removed(self):
+        StoreItem.objects.filter(pk__in=[self.items[0].pk, self.items[1].pk]).update(
+            is_active=False
+        )
+        response = self.batch(("remove", self.items[0], 0), ("set", self.items[1], 0))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.quantities(), {})
+
+        response = self.batch(("add", self.items[0], 1))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["store_items"], [self.items[0].pk])  # type: ignore
+
+    @override_settings(CART_STORAGE="redis")
+    def test_guest_batch_issues_a_cart_token(self):
+        local_backend.carts.clear()
+        self.client.force_authenticate(user=None)
+        response = self.batch(("add", self.items[2], 2))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response["X-Cart-Token"])
+        self.assertEqual(response.data["items"][0]["quantity"], 2)  # type: ignore
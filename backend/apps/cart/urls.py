@@ -1,10 +1,17 @@
 from django.urls import path
-from apps.cart.views import UserCart,UserCartItem, CartItemDetail, AddStoreItemToCart
+from apps.cart.views import (
+    UserCart,
+    UserCartItem,
+    CartItemDetail,
+    AddStoreItemToCart,
+    CartBatchView,
+)
 
 urlpatterns = [
     path("", UserCart.as_view(), name="user_cart"),
     path("items/", UserCartItem.as_view(), name="user_cart_items"),
     path("items/<int:pk>/", CartItemDetail.as_view(), name="user_cart_item_detail"),
+    path("batch/", CartBatchView.as_view(), name="user_cart_batch"),
     path(
         "add_to_cart/<int:pk>/",
         AddStoreItemToCart.as_view(),
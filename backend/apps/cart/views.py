@@ -1,13 +1,14 @@
-from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from .serializers import (
+    CartBatchSerializer,
     CartItemReadSerializer,
     CartItemWriteSerializer,
     CartSerializer,
 )
-from apps.cart.models import CartItem
+from apps.cart.permissions import HasCart
+from apps.cart.storage import NotEnoughStock, get_cart
 from apps.stores.models import StoreItem
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
@@ -67,8 +68,15 @@ MESSAGE_RESPONSE_SCHEMA = openapi.Schema(
 )
 
 
+def serialize_cart(request, cart):
+    items = cart.items()
+    return CartSerializer(
+        cart.as_model(), context={"request": request, "items": items}
+    ).data
+
+
 class UserCart(APIView):
-    permission_classes = [IsAuthenticated]
+    permission_classes = [HasCart]
 
     @swagger_auto_schema(
         operation_summary="My Cart",
@@ -81,13 +89,13 @@ class UserCart(APIView):
         },
     )
     def get(self, request):
-        user_cart = request.user.cart
-        serializer = CartSerializer(user_cart, context={"request": request})
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return Response(
+            serialize_cart(request, get_cart(request)), status=status.HTTP_200_OK
+        )
 
 
 class UserCartItem(APIView):
-    permission_classes = [IsAuthenticated]
+    permission_classes = [HasCart]
 
     @swagger_auto_schema(
         operation_summary="My Cart Items",
@@ -102,10 +110,8 @@ class UserCartItem(APIView):
         },
     )
     def get(self, request):
-        user_cart = request.user.cart
-        cart_items = user_cart.items.all()
         serializer = CartItemReadSerializer(
-            cart_items,
+            get_cart(request).items(),
             many=True,
             context={"request": request},
         )
@@ -113,13 +119,7 @@ class UserCartItem(APIView):
 
 
 class CartItemDetail(APIView):
-    permission_classes = [IsAuthenticated]
-
-    def get_object(self, pk, user):
-        try:
-            return CartItem.objects.get(pk=pk, cart=user.cart)
-        except CartItem.DoesNotExist:
-            return None
+    permission_classes = [HasCart]
 
     @swagger_auto_schema(
         request_body=CART_ITEM_WRITE_REQUEST,
@@ -152,7 +152,8 @@ class CartItemDetail(APIView):
         },
     )
     def patch(self, request, pk):
-        cart_item = self.get_object(pk, request.user)
+        cart = get_cart(request)
+        cart_item = cart.get_item(pk)
         if not cart_item:
             return Response(
                 {"message": "Cart item not found"}, status=status.HTTP_404_NOT_FOUND
@@ -172,7 +173,7 @@ class CartItemDetail(APIView):
             new_quantity = serializer.validated_data.get("quantity")  # type: ignore
             if new_quantity is not None:
                 if new_quantity <= 0:  # type: ignore
-                    cart_item.delete()
+                    cart.remove(cart_item)
                     return Response(
                         {"message": "Cart item deleted"},
                         status=status.HTTP_204_NO_CONTENT,
@@ -183,8 +184,8 @@ class CartItemDetail(APIView):
                         {"message": "Not enough stock available"},
                         status=status.HTTP_400_BAD_REQUEST,
                     )
+                cart.set_quantity(cart_item, new_quantity)
 
-            serializer.save()
             response_serializer = CartItemReadSerializer(
                 cart_item,
                 context={"request": request},
@@ -205,17 +206,18 @@ class CartItemDetail(APIView):
         },
     )
     def delete(self, request, pk):
-        cart_item = self.get_object(pk, request.user)
+        cart = get_cart(request)
+        cart_item = cart.get_item(pk)
         if not cart_item:
             return Response(
                 {"message": "Cart item not found"}, status=status.HTTP_404_NOT_FOUND
             )
-        cart_item.delete()
+        cart.remove(cart_item)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 class AddStoreItemToCart(APIView):
-    permission_classes = [IsAuthenticated]
+    permission_classes = [HasCart]
 
     @swagger_auto_schema(
         request_body=CartItemWriteSerializer,
@@ -256,7 +258,7 @@ class AddStoreItemToCart(APIView):
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        user_cart = request.user.cart
+        cart = get_cart(request, create=True)
 
         serializer = CartItemWriteSerializer(
             data=request.data, context={"request": request, "store_item": store_item}
@@ -264,24 +266,103 @@ class AddStoreItemToCart(APIView):
 
         if serializer.is_valid():
             quantity_to_add = serializer.validated_data.get("quantity", 1)  # type: ignore
-            cart_item, created = CartItem.objects.get_or_create(
-                cart=user_cart, store_item=store_item, defaults={"quantity": 0}
-            )
-            if cart_item.quantity + quantity_to_add > store_item.stock:
+            try:
+                cart_item, created = cart.add(store_item, quantity_to_add)
+            except NotEnoughStock:
                 return Response(
                     {"message": "Not enough stock available"},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            cart_item.quantity += quantity_to_add
-            cart_item.save()
             response_serializer = CartItemReadSerializer(
                 cart_item,
                 context={"request": request},
             )
-            return Response(
+            response = Response(
                 response_serializer.data,
                 status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
             )
+            if cart.new_token:
+                response["X-Cart-Token"] = cart.token
+            return response
         else:
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class CartBatchView(APIView):
+    permission_classes = [HasCart]
+
+    @swagger_auto_schema(
+        request_body=CartBatchSerializer,
+        operation_summary="Update Cart In One Request",
+        operation_description=(
+            "apply many operations to your cart at once: add (adds quantity), "
+            "set (sets quantity, 0 removes) and remove. Either every operation "
+            "is applied or none is."
+        ),
+        responses={
+            200: openapi.Response(
+                description="Cart after the operations", schema=CART_READ_SCHEMA
+            ),
+            400: openapi.Response(
+                description="Bad Request / Not enough stock / Store item not found",
+                schema=MESSAGE_RESPONSE_SCHEMA,
+            ),
+        },
+    )
+    def post(self, request):
+        serializer = CartBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        operations = serializer.validated_data["operations"]  # type: ignore
+
+        cart = get_cart(request, create=True)
+        lines = cart.lines()
+        changes = {}
+        for operation in operations:
+            pk = operation["store_item"]
+            current = changes.get(pk, lines.get(pk, 0))
+            if operation["op"] == "add":
+                changes[pk] = current + operation["quantity"]
+            elif operation["op"] == "set":
+                changes[pk] = operation["quantity"]
+            else:
+                changes[pk] = 0
+
+        # Lines kept in the cart need an active store item; a line already in
+        # the cart can always be removed, even if its item was deactivated.
+        kept = {pk for pk, quantity in changes.items() if quantity > 0}
+        unknown = {pk for pk in changes if pk not in kept and pk not in lines}
+        store_items = StoreItem.objects.filter(pk__in=kept | unknown).in_bulk()
+        missing = sorted(
+            {
+                pk
+                for pk in kept
+                if pk not in store_items or not store_items[pk].is_active
+            }
+            | {pk for pk in unknown if pk not in store_items}
+        )
+        if missing:
+            return Response(
+                {"message": "Store item not found", "store_items": missing},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        short = sorted(pk for pk in kept if changes[pk] > store_items[pk].stock)
+        if short:
+            return Response(
+                {"message": "Not enough stock available", "store_items": short},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        changes = {
+            pk: quantity
+            for pk, quantity in changes.items()
+            if quantity != lines.get(pk, 0)
+        }
+        if changes:
+            cart.write(changes)
+        response = Response(serialize_cart(request, cart), status=status.HTTP_200_OK)
+        if cart.new_token:
+            response["X-Cart-Token"] = cart.token
+        return response
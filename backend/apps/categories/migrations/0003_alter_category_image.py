@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:38
+
+import apps.core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0002_category_image_placeholder_category_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='category',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=apps.core.storage.media_storage, upload_to='categories/'),
+        ),
+    ]
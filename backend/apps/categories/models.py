@@ -1,5 +1,8 @@
 from django.db import models
 from apps.core.models import BaseModel
+from apps.core.images import schedule_image_variants
+from apps.core.response_cache import track_catalog
+from apps.core.storage import media_storage, track_media
 from django.core.exceptions import ValidationError
 
 
@@ -7,9 +10,12 @@ class Category(BaseModel):
     name = models.CharField(max_length=255)
     image = models.ImageField(
         upload_to="categories/",
+        storage=media_storage,
         null=True,
         blank=True,
     )
+    image_variants = models.JSONField(default=dict, blank=True)
+    image_placeholder = models.TextField(blank=True, default="")
     description = models.TextField()
     is_active = models.BooleanField(default=True)
     parent = models.ForeignKey(
@@ -31,3 +37,8 @@ class Category(BaseModel):
     def save(self, *args, **kwargs):
         self.full_clean()
         super().save(*args, **kwargs)
+        schedule_image_variants(self, "image")
+
+
+track_media(Category, "image")
+track_catalog(Category)
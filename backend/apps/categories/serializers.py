@@ -1,5 +1,16 @@
 from rest_framework import serializers
 from apps.categories.models import Category
+from django.db.models import prefetch_related_objects
+from apps.core.images import image_variant_urls
+
+
+def prefetch_ancestors(categories):
+    """Load the parent chain of ``categories`` with one query per tree level,
+    so ``CategoryReadSerializer.get_parents`` does not walk it row by row."""
+    level = list(categories)
+    while level:
+        prefetch_related_objects(level, "parent")
+        level = [category.parent for category in level if category.parent]
 
 
 class CategorySimpleSerializer(serializers.ModelSerializer):
@@ -11,6 +22,7 @@ class CategorySimpleSerializer(serializers.ModelSerializer):
 class CategoryReadSerializer(serializers.ModelSerializer):
     children = CategorySimpleSerializer(many=True, read_only=True)
     parents = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Category
@@ -19,12 +31,19 @@ class CategoryReadSerializer(serializers.ModelSerializer):
             "name",
             "description",
             "image",
+            "image_variants",
+            "image_placeholder",
             "is_active",
             "parents",
             "children",
         ]
         read_only_fields = fields
 
+    def get_image_variants(self, obj):
+        return image_variant_urls(
+            obj.image, obj.image_variants, self.context.get("request")
+        )
+
     def get_parents(self, obj):
         parents = []
         current = obj.parent
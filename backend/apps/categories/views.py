@@ -1,6 +1,10 @@
 from rest_framework.permissions import AllowAny
 from apps.categories.models import Category
-from apps.categories.serializers import CategoryReadSerializer, CategoryWriteSerializer
+from apps.categories.serializers import (
+    CategoryReadSerializer,
+    CategoryWriteSerializer,
+    prefetch_ancestors,
+)
 from rest_framework.views import APIView
 from django.db.models import Q
 from rest_framework.pagination import PageNumberPagination
@@ -9,6 +13,7 @@ from rest_framework import status
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from apps.users.permissions import IsSellerUser
+from apps.core.response_cache import cache_catalog_response
 
 
 CATEGORY_READ_SCHEMA = openapi.Schema(
@@ -71,6 +76,8 @@ NOT_FOUND_RESPONSE = openapi.Schema(
 
 
 class CategoryListView(APIView):
+    read_replica = True
+
     def get_permissions(self):
         if self.request.method == "GET":
             return [AllowAny()]
@@ -98,8 +105,13 @@ class CategoryListView(APIView):
             ),
         ],
     )
+    @cache_catalog_response
     def get(self, request):
-        categories = Category.objects.filter(is_active=True).order_by("-id")
+        categories = (
+            Category.objects.filter(is_active=True)
+            .prefetch_related("children")
+            .order_by("-id")
+        )
         search_term = request.query_params.get("category", None)
         if search_term:
             categories = categories.filter(
@@ -113,6 +125,7 @@ class CategoryListView(APIView):
 
         paginator.page_size = page_size
         result_page = paginator.paginate_queryset(categories, request)
+        prefetch_ancestors(result_page)
         category_data = CategoryReadSerializer(
             result_page, many=True, context={"request": request}
         ).data
@@ -139,6 +152,8 @@ class CategoryListView(APIView):
 
 
 class CategoryDetailView(APIView):
+    read_replica = True
+
     def get_permissions(self):
         if self.request.method == "GET":
             return [AllowAny()]
@@ -164,6 +179,7 @@ class CategoryDetailView(APIView):
             ),
         },
     )
+    @cache_catalog_response
     def get(self, request, pk):
         category = self.get_object(pk)
         if not category:
@@ -4,3 +4,14 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.core"
+
+    def ready(self):
+        from celery.signals import task_postrun, task_prerun
+        from apps.core.metrics import record_task_end, record_task_start
+        from django.db.backends.signals import connection_created
+        from apps.core.profiling import install_query_recorder, instrument_serializers
+
+        instrument_serializers()
+        connection_created.connect(install_query_recorder, weak=False)
+        task_prerun.connect(record_task_start, weak=False)
+        task_postrun.connect(record_task_end, weak=False)
@@ -0,0 +1,331 @@
+import platform
+import statistics
+import subprocess
+import time
+from itertools import cycle
+import django
+from django.db import close_old_connections, connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.tokens import RefreshToken
+from apps.orders.models import Order
+from apps.payments.models import Payment
+from apps.products.models import Product
+from apps.reviews.models import Review
+from apps.stores.models import StoreItem
+from apps.users.models import User
+from apps.core.renderers import FastJSONRenderer
+from apps.core.seeding import SEED_EMAIL_DOMAIN
+
+BENCHMARK_SETTINGS = {
+    "ALLOWED_HOSTS": ["testserver"],
+    "PAYMENT_GATEWAY": "apps.payments.gateway.FakeGateway",
+    "EMAIL_BACKEND": "django.core.mail.backends.locmem.EmailBackend",
+    "REQUEST_PROFILING_SAMPLE_RATE": 0,
+}
+
+
+class BenchmarkContext:
+    """Seeded rows the scenarios pick their targets from."""
+
+    def __init__(self):
+        customers = list(
+            User.objects.filter(
+                email__endswith=f"@{SEED_EMAIL_DOMAIN}",
+                is_seller=False,
+                cart__isnull=False,
+                addresses__isnull=False,
+            )
+            .distinct()
+            .order_by("pk")[:200]
+        )
+        if not customers:
+            raise ValueError("No seeded customers found, run seed_catalog first.")
+        self.customers = cycle(customers)
+        self.reader = customers[0]
+        self.products = cycle(
+            Product.objects.filter(store_items__isnull=False)
+            .values_list("pk", flat=True)
+            .distinct()
+            .order_by("pk")[:500]
+        )
+        self.reviewed_products = cycle(
+            Review.objects.filter(product__isnull=False)
+            .values_list("product_id", flat=True)
+            .distinct()
+            .order_by("product_id")[:500]
+        )
+        self.store_items = cycle(
+            StoreItem.objects.filter(is_active=True, stock__gt=10)
+            .values_list("pk", flat=True)
+            .order_by("pk")[:500]
+        )
+        self.tokens = {}
+
+    def auth(self, user):
+        if user.pk not in self.tokens:
+            token = RefreshToken.for_user(user).access_token
+            self.tokens[user.pk] = f"Bearer {token}"
+        return {"HTTP_AUTHORIZATION": self.tokens[user.pk]}
+
+
+def product_list(ctx):
+    return "get", reverse("products_list_create") + "?page_size=20", None, None
+
+
+def product_detail(ctx):
+    pk = next(ctx.products)
+    return "get", reverse("products_detail_update_delete", args=[pk]), None, None
+
+
+def cart(ctx):
+    return "get", reverse("user_cart"), None, ctx.reader
+
+
+def add_to_cart(ctx):
+    pk = next(ctx.store_items)
+    url = reverse("add_store_item_to_cart", args=[pk])
+    return "post", url, {"quantity": 1}, next(ctx.customers)
+
+
+def checkout(ctx):
+    customer = next(ctx.customers)
+    address = customer.addresses.first()
+    return "post", reverse("user_create_order"), {"address_id": address.pk}, customer
+
+
+def payment_verify(ctx):
+    payment = (
+        Payment.objects.filter(status=Payment.PaymentStatus.PROGRESS)
+        .exclude(transaction_id__startswith="SEED")
+        .order_by("-pk")
+        .first()
+    )
+    authority = payment.transaction_id if payment else "missing"
+    url = f"{reverse('zarinpal_result')}?Authority={authority}&Status=OK"
+    return "get", url, None, None
+
+
+def order_history(ctx):
+    return "get", reverse("user_orders"), None, ctx.reader
+
+
+def review_list(ctx):
+    pk = next(ctx.reviewed_products)
+    return "get", reverse("product-reviews", args=[pk]), None, None
+
+
+SCENARIOS = {
+    "product_list": product_list,
+    "product_detail": product_detail,
+    "cart": cart,
+    "add_to_cart": add_to_cart,
+    "checkout": checkout,
+    "payment_verify": payment_verify,
+    "order_history": order_history,
+    "review_list": review_list,
+}
+
+
+RENDER_PAYLOADS = ["product_list", "cart"]
+RENDERERS = {"drf": JSONRenderer, "orjson": FastJSONRenderer}
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies, queries, errors, elapsed):
+    ms = [value * 1000 for value in latencies]
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "latency_ms": {
+            "mean": round(statistics.mean(ms), 2),
+            "p50": round(percentile(ms, 0.50), 2),
+            "p95": round(percentile(ms, 0.95), 2),
+            "p99": round(percentile(ms, 0.99), 2),
+            "max": round(max(ms), 2),
+        },
+        "queries": {"mean": round(statistics.mean(queries), 2), "max": max(queries)},
+    }
+
+
+def run_scenario(client, ctx, scenario, iterations, warmup):
+    latencies, queries, errors = [], [], 0
+    elapsed = 0.0
+    for i in range(warmup + iterations):
+        method, url, data, user = scenario(ctx)
+        extra = ctx.auth(user) if user else {}
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            if method == "post":
+                response = client.post(
+                    url, data=data, content_type="application/json", **extra
+                )
+            else:
+                response = client.get(url, **extra)
+            duration = time.perf_counter() - started
+        if i < warmup:
+            continue
+        elapsed += duration
+        latencies.append(duration)
+        queries.append(len(captured))
+        if response.status_code >= 400:
+            errors += 1
+    return summarize(latencies, queries, errors, elapsed)
+
+
+def run_render_benchmark(client, ctx, name, iterations):
+    """Time both JSON renderers on the response data of scenario ``name``."""
+    _, url, _, user = SCENARIOS[name](ctx)
+    data = client.get(url, **(ctx.auth(user) if user else {})).data
+    result, outputs = {}, set()
+    for label, renderer_class in RENDERERS.items():
+        renderer = renderer_class()
+        ms = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            output = renderer.render(data)
+            ms.append((time.perf_counter() - started) * 1000)
+        outputs.add(output)
+        result[label] = {
+            "mean_ms": round(statistics.mean(ms), 3),
+            "p95_ms": round(percentile(ms, 0.95), 3),
+        }
+    result["bytes"] = len(output)
+    result["identical"] = len(outputs) == 1
+    return result
+
+
+def run_connection_benchmark(client, ctx, iterations):
+    """Latency of ``product_detail`` with a new connection per request, as
+    with ``CONN_MAX_AGE=0``, and with the configured connection settings.
+
+    Skipped inside a transaction (e.g. under TestCase), where connections
+    cannot be closed.
+    """
+    if connection.in_atomic_block:
+        return None
+    settings_dict = connection.settings_dict
+    configured = settings_dict["CONN_MAX_AGE"]
+    result = {}
+    try:
+        for label, max_age in (("connect_per_request", 0), ("configured", configured)):
+            connection.close()
+            settings_dict["CONN_MAX_AGE"] = max_age
+            ms = []
+            for _ in range(iterations):
+                _, url, _, _ = product_detail(ctx)
+                started = time.perf_counter()
+                client.get(url)
+                # The test client keeps connections open; close them the way
+                # the request_finished handler does behind a real server.
+                close_old_connections()
+                ms.append((time.perf_counter() - started) * 1000)
+            result[label] = {
+                "p50_ms": round(percentile(ms, 0.50), 2),
+                "p95_ms": round(percentile(ms, 0.95), 2),
+            }
+    finally:
+        settings_dict["CONN_MAX_AGE"] = configured
+        connection.close()
+    result["conn_max_age"] = configured
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(names=None, iterations=50, warmup=5, log=None):
+    """Run the scenarios in-process and return a JSON-serializable report."""
+    from config.celery import app
+
+    log = log or (lambda message: None)
+    eager = app.conf.task_always_eager
+    app.conf.task_always_eager = True
+    try:
+        with override_settings(**BENCHMARK_SETTINGS):
+            ctx = BenchmarkContext()
+            client = Client()
+            results = {}
+            for name in names or SCENARIOS:
+                log(f"running {name}")
+                results[name] = run_scenario(
+                    client, ctx, SCENARIOS[name], iterations, warmup
+                )
+            rendering = {}
+            for name in RENDER_PAYLOADS:
+                log(f"rendering {name}")
+                rendering[name] = run_render_benchmark(client, ctx, name, iterations)
+            log("measuring connection reuse")
+            connections = run_connection_benchmark(client, ctx, iterations)
+    finally:
+        app.conf.task_always_eager = eager
+
+    return {
+        "commit": git_commit(),
+        "created_at": timezone.now().isoformat(),
+        "environment": {
+            "database": connection.vendor,
+            "python": platform.python_version(),
+            "django": django.get_version(),
+        },
+        "dataset": {
+            "users": User.objects.count(),
+            "products": Product.objects.count(),
+            "store_items": StoreItem.objects.count(),
+            "orders": Order.objects.count(),
+            "reviews": Review.objects.count(),
+        },
+        "iterations": iterations,
+        "scenarios": results,
+        "rendering": rendering,
+        "connections": connections,
+    }
+
+
+def compare_reports(baseline, report):
+    """Lines describing how p95 latency and query counts moved per scenario."""
+    lines = []
+    for name, result in report["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if before is None:
+            continue
+        old_p95 = before["latency_ms"]["p95"]
+        new_p95 = result["latency_ms"]["p95"]
+        change = (new_p95 - old_p95) / old_p95 * 100 if old_p95 else 0
+        lines.append(
+            f"{name}: p95 {old_p95} -> {new_p95} ms ({change:+.1f}%), "
+            f"queries {before['queries']['max']} -> {result['queries']['max']}"
+        )
+    for name, result in report.get("rendering", {}).items():
+        lines.append(
+            f"render {name} ({result['bytes']} bytes): drf {result['drf']['mean_ms']} "
+            f"ms, orjson {result['orjson']['mean_ms']} ms, "
+            f"identical: {result['identical']}"
+        )
+    connections = report.get("connections")
+    if connections:
+        lines.append(
+            "product_detail p95: "
+            f"{connections['connect_per_request']['p95_ms']} ms connecting per "
+            f"request, {connections['configured']['p95_ms']} ms with "
+            f"CONN_MAX_AGE={connections['conn_max_age']}"
+        )
+    return lines
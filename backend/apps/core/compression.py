@@ -0,0 +1,58 @@
+import gzip
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Content codings the API can produce, in order of preference.
+ENCODINGS = ("br", "gzip") if brotli else ("gzip",)
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/",
+)
+
+
+def is_compressible(content_type):
+    return content_type.split(";")[0].strip().lower().startswith(COMPRESSIBLE_TYPES)
+
+
+def choose_encoding(accept_encoding):
+    """The preferred coding the client accepts, or ``None``.
+
+    Codings with ``q=0`` are refused; ``*`` accepts anything not listed.
+    """
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name] = quality
+    for encoding in ENCODINGS:
+        if accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return None
+
+
+def compress(content, encoding):
+    if encoding == "br":
+        return brotli.compress(content, quality=5)
+    # mtime=0 keeps the output identical for identical content.
+    return gzip.compress(content, compresslevel=6, mtime=0)
+
+
+def compress_all(content):
+    """``content`` in every coding the API can produce."""
+    return {encoding: compress(content, encoding) for encoding in ENCODINGS}
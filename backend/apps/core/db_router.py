@@ -0,0 +1,65 @@
+import hashlib
+import random
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.cache import cache
+
+# Set by ReplicaRoutingMiddleware for the length of a request that may read
+# from a replica.
+replica_reads = ContextVar("replica_reads", default=False)
+
+PIN_KEY = "replica:pin:{digest}"
+
+
+class ReplicaRouter:
+    """Send reads to one of ``DB_REPLICAS`` while ``replica_reads`` is set,
+    everything else to ``default``.
+
+    Users are always read from the primary: JWT authentication looks the
+    user up on every request, and a replica may not have an account that
+    was just created.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (
+            replica_reads.get()
+            and settings.DB_REPLICAS
+            and model._meta.label != settings.AUTH_USER_MODEL
+        ):
+            return random.choice(settings.DB_REPLICAS)
+        return "default"
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DB_REPLICAS
+
+
+def pin_key(request):
+    """Cache key pinning the client behind ``request`` to the primary, or
+    ``None`` for anonymous requests.
+
+    Clients are told apart by their bearer token, which is known before the
+    view authenticates the request.
+    """
+    authorization = request.META.get("HTTP_AUTHORIZATION")
+    if not authorization:
+        return None
+    digest = hashlib.sha256(authorization.encode()).hexdigest()
+    return PIN_KEY.format(digest=digest)
+
+
+def pin_to_primary(request):
+    key = pin_key(request)
+    if key:
+        cache.set(key, 1, settings.DB_REPLICA_PIN_SECONDS)
+
+
+def is_pinned(request):
+    key = pin_key(request)
+    return bool(key and cache.get(key))
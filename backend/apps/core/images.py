@@ -0,0 +1,153 @@
+import base64
+import logging
+import posixpath
+from io import BytesIO
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+PLACEHOLDER_WIDTH = 16
+
+
+def variants_field_name(field_name):
+    return f"{field_name}_variants"
+
+
+def placeholder_field_name(field_name):
+    return f"{field_name}_placeholder"
+
+
+def queue_variants(task, *args):
+    """``task.delay(*args)``, logging rather than raising when the broker is
+    down: the row is already committed and the request should not fail."""
+    try:
+        task.delay(*args)
+    except Exception:
+        logger.warning("Could not queue %s%r", task.name, args, exc_info=True)
+
+
+def schedule_image_variants(instance, field_name):
+    """Queue variant generation when the save that just ran put a new file in
+    ``field_name`` (see ``track_media``). Saves that leave the file alone,
+    like a ``last_login`` update, queue nothing."""
+    if field_name not in getattr(instance, "_media_changed", ()):
+        return
+    image = getattr(instance, field_name)
+    variants = getattr(instance, variants_field_name(field_name)) or {}
+    if variants.get("source") == image.name:
+        return
+    from apps.core.tasks import generate_image_variants
+
+    label, pk = instance._meta.label, instance.pk
+    transaction.on_commit(
+        lambda: queue_variants(generate_image_variants, label, pk, field_name)
+    )
+
+
+def schedule_bulk_image_variants(instances, field_name):
+    """Same as ``schedule_image_variants`` for rows saved with ``bulk_create``,
+    which skips ``save()``. All rows are handled by a single task."""
+    pks = [instance.pk for instance in instances if getattr(instance, field_name)]
+    if not pks:
+        return
+    from apps.core.tasks import generate_image_variants_batch
+
+    label = instances[0]._meta.label
+    transaction.on_commit(
+        lambda: queue_variants(generate_image_variants_batch, label, pks, field_name)
+    )
+
+
+def read_image_header(fileobj):
+    """Return ``(format, width, height)`` from the image header only.
+
+    ``Image.open`` is lazy, so no pixel data is decoded. Raises ``ValueError``
+    when the file is not an image Pillow understands.
+    """
+    try:
+        with Image.open(fileobj) as image:
+            return image.format, image.width, image.height
+    except (UnidentifiedImageError, OSError) as e:
+        raise ValueError("Upload a valid image.") from e
+    finally:
+        fileobj.seek(0)
+
+
+def encode_webp(image, quality):
+    buffer = BytesIO()
+    image.save(buffer, "WEBP", quality=quality, method=4)
+    return buffer.getvalue()
+
+
+def build_image_variants(field_file):
+    """Write WebP copies of ``field_file`` at the configured widths.
+
+    Returns ``(variants, placeholder)`` where ``variants`` maps width to the
+    stored file name (plus the ``source`` it was built from) and
+    ``placeholder`` is a tiny blurred data URI for progressive loading.
+    """
+    storage = field_file.storage
+    with field_file.open("rb") as fileobj:
+        image = Image.open(fileobj)
+        image = ImageOps.exif_transpose(image)
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+
+    directory, filename = posixpath.split(field_file.name)
+    stem = posixpath.splitext(filename)[0]
+    widths = [w for w in settings.IMAGE_VARIANT_WIDTHS if w < image.width] or [
+        image.width
+    ]
+    variants = {"source": field_file.name}
+    for width in widths:
+        variant = image.copy()
+        variant.thumbnail((width, image.height), Image.Resampling.LANCZOS)
+        name = storage.save(
+            posixpath.join(directory, "variants", f"{stem}_{width}w.webp"),
+            ContentFile(encode_webp(variant, settings.IMAGE_VARIANT_QUALITY)),
+        )
+        variants[str(width)] = name
+
+    tiny = image.copy()
+    tiny.thumbnail((PLACEHOLDER_WIDTH, PLACEHOLDER_WIDTH), Image.Resampling.BILINEAR)
+    placeholder = "data:image/webp;base64," + base64.b64encode(
+        encode_webp(tiny, 30)
+    ).decode()
+    return variants, placeholder
+
+
+def current_variants(field_file, variants):
+    """``variants`` if they were built from the file ``field_file`` holds now.
+    Right after an image is replaced they still describe the old one."""
+    if not field_file or not variants or variants.get("source") != field_file.name:
+        return {}
+    return variants
+
+
+def image_variant_urls(field_file, variants, request=None):
+    variants = current_variants(field_file, variants)
+    if not variants:
+        return {}
+    urls = {}
+    for width, name in variants.items():
+        if width == "source":
+            continue
+        url = field_file.storage.url(name)
+        urls[width] = request.build_absolute_uri(url) if request else url
+    return urls
+
+
+def pick_image_url(field_file, variants, width, request=None):
+    """URL of the smallest variant at least ``width`` wide, else the original."""
+    if not field_file:
+        return None
+    url = field_file.url
+    variants = current_variants(field_file, variants)
+    candidates = sorted(
+        int(w) for w in variants if w != "source" and int(w) >= width
+    )
+    if candidates:
+        url = field_file.storage.url(variants[str(candidates[0])])
+    return request.build_absolute_uri(url) if request else url
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from apps.core.tasks import generate_image_variants
+from apps.categories.models import Category
+from apps.products.models import ProductImage
+from apps.users.models import User
+
+IMAGE_MODELS = [
+    (ProductImage, "image"),
+    (Category, "image"),
+    (User, "picture"),
+]
+
+
+class Command(BaseCommand):
+    """Queue variant generation for images uploaded before the pipeline existed."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sync",
+            action="store_true",
+            help="Build the variants in this process instead of queueing tasks.",
+        )
+
+    def handle(self, *args, **options):
+        for model, field_name in IMAGE_MODELS:
+            pks = (
+                model._base_manager.exclude(**{field_name: ""})
+                .exclude(**{f"{field_name}__isnull": True})
+                .filter(**{f"{field_name}_variants": {}})
+                .values_list("pk", flat=True)
+            )
+            count = 0
+            for pk in pks.iterator():
+                if options["sync"]:
+                    generate_image_variants(model._meta.label, pk, field_name)
+                else:
+                    generate_image_variants.delay(model._meta.label, pk, field_name)
+                count += 1
+            self.stdout.write(f"{model._meta.label}: {count} image(s)")
+        self.stdout.write(self.style.SUCCESS("Image variants scheduled"))
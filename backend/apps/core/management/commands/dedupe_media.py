@@ -0,0 +1,56 @@
+from django.core.files.storage import storages
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from apps.core.images import variants_field_name, placeholder_field_name
+from apps.core.storage import BLOB_DIR
+from apps.core.management.commands.build_image_variants import IMAGE_MODELS
+
+
+class Command(BaseCommand):
+    """Move images uploaded before content-addressed storage into blobs."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--keep-originals",
+            action="store_true",
+            help="Leave the old files on disk after copying them.",
+        )
+
+    def handle(self, *args, **options):
+        legacy_storage = storages["default"]
+        for model, field_name in IMAGE_MODELS:
+            storage = model._meta.get_field(field_name).storage
+            rows = (
+                model._base_manager.exclude(
+                    Q(**{field_name: ""}) | Q(**{f"{field_name}__isnull": True})
+                )
+                .exclude(**{f"{field_name}__startswith": f"{BLOB_DIR}/"})
+                .values_list("pk", field_name, variants_field_name(field_name))
+            )
+            moved = missing = 0
+            for pk, name, variants in rows.iterator():
+                if not legacy_storage.exists(name):
+                    missing += 1
+                    continue
+                with legacy_storage.open(name, "rb") as fileobj:
+                    new_name = storage.save(name, fileobj)
+                # Variants are rebuilt from the blob by build_image_variants.
+                model._base_manager.filter(pk=pk, **{field_name: name}).update(
+                    **{
+                        field_name: new_name,
+                        variants_field_name(field_name): {},
+                        placeholder_field_name(field_name): "",
+                    }
+                )
+                if not options["keep_originals"]:
+                    legacy_storage.delete(name)
+                    for key, variant in (variants or {}).items():
+                        if key != "source":
+                            legacy_storage.delete(variant)
+                moved += 1
+            self.stdout.write(
+                f"{model._meta.label}: {moved} moved, {missing} missing on disk"
+            )
+        self.stdout.write(
+            self.style.SUCCESS("Done, run build_image_variants to rebuild variants")
+        )
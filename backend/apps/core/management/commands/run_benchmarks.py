@@ -0,0 +1,52 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from apps.core.benchmarks import SCENARIOS, compare_reports, run_benchmarks
+
+
+class Command(BaseCommand):
+    """Measure latency, throughput and query counts of the hot endpoints.
+
+    Run ``seed_catalog`` first. Payments go through the fake gateway, so no
+    network access is needed.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "scenarios",
+            nargs="*",
+            help=f"Scenarios to run, all by default: {', '.join(SCENARIOS)}.",
+        )
+        parser.add_argument("--iterations", type=int, default=50)
+        parser.add_argument("--warmup", type=int, default=5)
+        parser.add_argument("--output", help="Write the JSON report to this file.")
+        parser.add_argument(
+            "--compare", help="Previous JSON report to compare the results with."
+        )
+
+    def handle(self, *args, **options):
+        unknown = set(options["scenarios"]) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown scenario(s): {', '.join(sorted(unknown))}")
+        try:
+            report = run_benchmarks(
+                names=options["scenarios"] or None,
+                iterations=options["iterations"],
+                warmup=options["warmup"],
+                log=self.stderr.write,
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        content = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(content)
+            self.stderr.write(f"Report written to {options['output']}")
+        else:
+            self.stdout.write(content)
+
+        if options["compare"]:
+            with open(options["compare"]) as f:
+                baseline = json.load(f)
+            for line in compare_reports(baseline, report):
+                self.stderr.write(line)
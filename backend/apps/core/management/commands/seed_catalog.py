@@ -0,0 +1,43 @@
+import time
+from django.core.management.base import BaseCommand
+from apps.core.seeding import BATCH_SIZE, SIZES, Seeder
+
+
+class Command(BaseCommand):
+    """Generate a synthetic catalog with users, orders and reviews.
+
+    ``--size xl`` creates a million products; use ``--workers`` on PostgreSQL
+    to spread the product chunks over several processes.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size", choices=list(SIZES), default="small")
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Random seed; the same seed always produces the same data.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Processes generating product chunks (PostgreSQL only).",
+        )
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        Seeder(
+            size=options["size"],
+            seed=options["seed"],
+            batch_size=options["batch_size"],
+            workers=options["workers"],
+            log=self.stdout.write,
+        ).run()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Seeded {options['size']} dataset in "
+                f"{time.perf_counter() - started:.1f}s"
+            )
+        )
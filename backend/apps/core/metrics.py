@@ -0,0 +1,319 @@
+import atexit
+import logging
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import connection, connections
+from django_redis.cache import RedisCache
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+METRICS_KEY = "metrics:{name}"
+HISTOGRAMS = {
+    "http_request_duration_seconds": "Time spent handling API requests.",
+    "celery_task_duration_seconds": "Time spent running Celery tasks.",
+}
+
+
+class LocalMetricsStore:
+    """Per-process store, used when the cache is not Redis (tests, local runs)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = defaultdict(lambda: defaultdict(float))
+
+    def increment(self, values):
+        with self.lock:
+            for name, fields in values.items():
+                for field, amount in fields.items():
+                    self.values[name][field] += amount
+
+    def read(self, name):
+        with self.lock:
+            return dict(self.values[name])
+
+
+class RedisMetricsStore:
+    """Counters kept in one Redis hash per metric, shared by every web and
+    Celery worker process."""
+
+    def increment(self, values):
+        from django_redis import get_redis_connection
+
+        pipe = get_redis_connection("default").pipeline(transaction=False)
+        for name, fields in values.items():
+            key = METRICS_KEY.format(name=name)
+            for field, amount in fields.items():
+                pipe.hincrbyfloat(key, field, amount)
+        pipe.execute()
+
+    def read(self, name):
+        from django_redis import get_redis_connection
+
+        raw = get_redis_connection("default").hgetall(METRICS_KEY.format(name=name))
+        return {field.decode(): float(value) for field, value in raw.items()}
+
+
+local_store = LocalMetricsStore()
+
+
+def get_store():
+    if isinstance(caches["default"], RedisCache):
+        return RedisMetricsStore()
+    return local_store
+
+
+class MetricsBuffer:
+    """Observations of this process not written to the store yet.
+
+    They are summed per series and pushed in one pipeline at most every
+    ``METRICS_FLUSH_INTERVAL`` seconds, instead of one round trip per request
+    or task. A process that dies loses what it had not pushed.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = defaultdict(lambda: defaultdict(float))
+        self.flushed_at = time.monotonic()
+
+    def add(self, name, fields):
+        with self.lock:
+            for field, amount in fields.items():
+                self.values[name][field] += amount
+            due = (
+                time.monotonic() - self.flushed_at >= settings.METRICS_FLUSH_INTERVAL
+            )
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            values, self.values = self.values, defaultdict(lambda: defaultdict(float))
+            self.flushed_at = time.monotonic()
+        if not values:
+            return
+        try:
+            get_store().increment(values)
+        except Exception:
+            logger.warning("Could not record metrics", exc_info=True)
+            # Keep them for the next flush; there is one entry per series, so
+            # this stays small however long the store is down.
+            with self.lock:
+                for name, fields in values.items():
+                    for field, amount in fields.items():
+                        self.values[name][field] += amount
+
+
+buffer = MetricsBuffer()
+atexit.register(buffer.flush)
+
+
+task_started = {}
+
+
+def record_task_start(task_id=None, **kwargs):
+    task_started[task_id] = time.perf_counter()
+
+
+def record_task_end(task_id=None, task=None, state=None, **kwargs):
+    started = task_started.pop(task_id, None)
+    if started is not None:
+        observe(
+            "celery_task_duration_seconds",
+            time.perf_counter() - started,
+            task=task.name,
+            state=state or "UNKNOWN",
+        )
+
+
+def label_string(labels):
+    return ",".join(f'{key}="{value}"' for key, value in sorted(labels.items()))
+
+
+def observe(name, value, **labels):
+    """Add one observation of ``value`` seconds to the histogram ``name``.
+
+    Only the bucket the value falls into is incremented; buckets are made
+    cumulative when they are rendered. Observations go through ``buffer``;
+    metrics must never break the request or task they measure, so storage
+    errors are only logged.
+    """
+    bucket = next((b for b in LATENCY_BUCKETS if value <= b), "+Inf")
+    series = label_string(labels)
+    buffer.add(
+        name,
+        {
+            f"{series}|bucket|{bucket}": 1,
+            f"{series}|sum|": value,
+            f"{series}|count|": 1,
+        },
+    )
+
+
+def render_histogram(name, help_text, values):
+    series = defaultdict(lambda: {"buckets": defaultdict(float), "sum": 0, "count": 0})
+    for field, value in values.items():
+        labels, kind, bucket = field.split("|")
+        if kind == "bucket":
+            series[labels]["buckets"][bucket] += value
+        else:
+            series[labels][kind] = value
+
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for labels, data in sorted(series.items()):
+        prefix = f"{labels}," if labels else ""
+        cumulative = 0
+        for bucket in [*LATENCY_BUCKETS, "+Inf"]:
+            cumulative += data["buckets"].get(str(bucket), 0)
+            lines.append(f'{name}_bucket{{{prefix}le="{bucket}"}} {cumulative:g}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {data['sum']:g}")
+        lines.append(f"{name}_count{suffix} {data['count']:g}")
+    return lines
+
+
+def render_gauge(name, help_text, samples):
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+    for labels, value in samples:
+        suffix = f"{{{label_string(labels)}}}" if labels else ""
+        lines.append(f"{name}{suffix} {value:g}")
+    return lines
+
+
+def run_with_timeout(func, timeout):
+    """Run ``func`` in a worker thread and give up after ``timeout`` seconds."""
+
+    def run():
+        try:
+            return func()
+        finally:
+            # Database connections are per thread; don't leave this one open.
+            connections.close_all()
+
+    executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        return executor.submit(run).result(timeout=timeout)
+    finally:
+        executor.shutdown(wait=False)
+
+
+# Last results of the dependency probes and gauges, per process.
+recent = {}
+recent_lock = threading.Lock()
+
+
+def cached(key, compute):
+    """``compute()``, reused for ``HEALTH_CHECK_CACHE_SECONDS`` so frequent
+    probes and scrapes cannot be used to load the database and the broker.
+    Requests arriving while it runs wait for its result."""
+    with recent_lock:
+        hit = recent.get(key)
+        if hit and time.monotonic() - hit[0] < settings.HEALTH_CHECK_CACHE_SECONDS:
+            return hit[1]
+        value = compute()
+        recent[key] = (time.monotonic(), value)
+        return value
+
+
+def probe_database():
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            timeout_ms = int(settings.HEALTH_CHECK_TIMEOUT * 1000)
+            cursor.execute(f"SET statement_timeout = {timeout_ms}")
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+
+
+def probe_cache():
+    cache.set("health:probe", 1, 10)
+    if cache.get("health:probe") != 1:
+        raise RuntimeError("cache did not return the probe value")
+
+
+def check(probe):
+    """Return ``(ok, seconds, error)`` for one dependency probe."""
+    started = time.perf_counter()
+    try:
+        run_with_timeout(probe, settings.HEALTH_CHECK_TIMEOUT)
+    except FutureTimeout:
+        return False, time.perf_counter() - started, "timed out"
+    except Exception as e:
+        return False, time.perf_counter() - started, str(e)
+    return True, time.perf_counter() - started, None
+
+
+def database_connections():
+    if connection.vendor != "postgresql":
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT coalesce(state, 'unknown'), count(*) FROM pg_stat_activity "
+            "WHERE datname = current_database() GROUP BY 1"
+        )
+        return [({"state": state}, count) for state, count in cursor.fetchall()]
+
+
+def celery_queue_depths():
+    from config.celery import app
+
+    depths = []
+    with app.connection_for_read() as conn:
+        conn.ensure_connection(max_retries=1, timeout=settings.HEALTH_CHECK_TIMEOUT)
+        channel = conn.default_channel
+        for queue in settings.METRICS_CELERY_QUEUES:
+            _, count, _ = channel.queue_declare(queue=queue, passive=True)
+            depths.append(({"queue": queue}, count))
+    return depths
+
+
+def collect_gauges():
+    """Values read from the dependencies themselves at scrape time."""
+    lines = []
+    for name, help_text, collect in [
+        (
+            "db_connections",
+            "Connections to the application database by state.",
+            database_connections,
+        ),
+        (
+            "celery_queue_length",
+            "Messages waiting in each Celery queue.",
+            celery_queue_depths,
+        ),
+    ]:
+        try:
+            samples = run_with_timeout(collect, settings.HEALTH_CHECK_TIMEOUT)
+        except Exception:
+            logger.warning("Could not collect %s", name, exc_info=True)
+            continue
+        lines += render_gauge(name, help_text, samples)
+
+    ok, seconds, _ = check(probe_cache)
+    lines += render_gauge(
+        "cache_up", "Whether the cache answered the probe.", [({}, int(ok))]
+    )
+    lines += render_gauge(
+        "cache_probe_seconds", "Round trip of a cache set and get.", [({}, seconds)]
+    )
+    return lines
+
+
+def render_metrics():
+    """Other processes' observations show up once they flush, within
+    ``METRICS_FLUSH_INTERVAL`` seconds."""
+    buffer.flush()
+    lines = []
+    store = get_store()
+    for name, help_text in HISTOGRAMS.items():
+        try:
+            values = store.read(name)
+        except Exception:
+            logger.warning("Could not read metric %s", name, exc_info=True)
+            continue
+        lines += render_histogram(name, help_text, values)
+    lines += cached("gauges", collect_gauges)
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,314 @@
+import json
+import logging
+import random
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+from django.db import DatabaseError, connection
+from django.utils.cache import patch_vary_headers
+from apps.core.compression import choose_encoding, compress, is_compressible
+from apps.core.db_router import is_pinned, pin_to_primary, replica_reads
+from apps.core.metrics import observe
+from apps.core.profiling import RequestProfile, current_profile
+
+logger = logging.getLogger("apps.profiling")
+
+
+def get_view_name(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return None
+    if match.view_name:
+        return match.view_name
+    view = getattr(match.func, "view_class", match.func)
+    return f"{view.__module__}.{view.__name__}"
+
+
+class HybridMiddleware:
+    """Base for middleware that runs under both WSGI and ASGI without Django
+    adapting it, which would move every request to a worker thread.
+
+    ``__call__`` hands async requests to ``__acall__`` and sync ones to
+    ``handle``; both pass the request straight through, so subclasses only
+    override the ones they need.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self.handle(request)
+
+    def handle(self, request):
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        return await self.get_response(request)
+
+
+class RequestProfilingMiddleware(HybridMiddleware):
+    """Measure queries, SQL time, cache hits, serializer time and total time of
+    a sample of requests.
+
+    The numbers are sent back in a ``Server-Timing`` header and logged as one
+    JSON line per request; requests running more queries than
+    ``REQUEST_QUERY_BUDGET`` are logged as warnings and get an
+    ``X-Query-Budget-Exceeded`` header.
+    """
+
+    def handle(self, request):
+        if random.random() >= settings.REQUEST_PROFILING_SAMPLE_RATE:
+            return self.get_response(request)
+
+        profile = RequestProfile()
+        token = current_profile.set(profile)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_profile.reset(token)
+
+        self.report(request, response, profile)
+        return response
+
+    async def __acall__(self, request):
+        if random.random() >= settings.REQUEST_PROFILING_SAMPLE_RATE:
+            return await self.get_response(request)
+
+        profile = RequestProfile()
+        token = current_profile.set(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_profile.reset(token)
+
+        self.report(request, response, profile)
+        return response
+
+    def report(self, request, response, profile):
+        total_ms = profile.total_time * 1000
+        sql_ms = profile.sql_time * 1000
+        serializer_ms = profile.serializer_time * 1000
+        response["Server-Timing"] = ", ".join(
+            [
+                f'db;dur={sql_ms:.1f};desc="{profile.queries} queries"',
+                f'cache;desc="{profile.cache_hits} hits, '
+                f'{profile.cache_misses} misses"',
+                f"serializer;dur={serializer_ms:.1f}",
+                f"total;dur={total_ms:.1f}",
+            ]
+        )
+
+        budget = settings.REQUEST_QUERY_BUDGET
+        over_budget = profile.queries > budget
+        if over_budget:
+            response["X-Query-Budget-Exceeded"] = f"{profile.queries}/{budget}"
+
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "view": get_view_name(request),
+            "status": response.status_code,
+            "queries": profile.queries,
+            "sql_ms": round(sql_ms, 2),
+            "cache_hits": profile.cache_hits,
+            "cache_misses": profile.cache_misses,
+            "serializer_ms": round(serializer_ms, 2),
+            "total_ms": round(total_ms, 2),
+            "over_query_budget": over_budget,
+        }
+        if over_budget:
+            logger.warning(json.dumps(record))
+        else:
+            logger.info(json.dumps(record))
+
+
+def observe_request(request, response, duration):
+    observe(
+        "http_request_duration_seconds",
+        duration,
+        view=get_view_name(request) or "unmatched",
+        method=request.method,
+        status=f"{response.status_code // 100}xx",
+    )
+
+
+class RequestMetricsMiddleware(HybridMiddleware):
+    """Feed the ``http_request_duration_seconds`` histogram served at /metrics."""
+
+    def handle(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        observe_request(request, response, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        await sync_to_async(observe_request)(
+            request, response, time.perf_counter() - started
+        )
+        return response
+
+
+class CompressionMiddleware(HybridMiddleware):
+    """Compress responses of at least ``COMPRESSION_MIN_SIZE`` bytes with
+    brotli (when installed) or gzip.
+
+    Responses carrying ``precompressed`` bytes, like cached catalog
+    responses, are sent as they are instead of being compressed again.
+    """
+
+    def handle(self, request):
+        return self.compress_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.compress_response(request, await self.get_response(request))
+
+    def compress_response(self, request, response):
+        if (
+            response.streaming
+            or response.has_header("Content-Encoding")
+            or not is_compressible(response.get("Content-Type", ""))
+            or len(response.content) < settings.COMPRESSION_MIN_SIZE
+        ):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = choose_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if encoding is None:
+            return response
+        content = getattr(response, "precompressed", {}).get(encoding)
+        if content is None:
+            content = compress(response.content, encoding)
+        if len(content) >= len(response.content):
+            return response
+
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.content = content
+        response.headers["Content-Length"] = str(len(content))
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+
+class StatementTimeoutMiddleware(HybridMiddleware):
+    """Give views with a ``statement_timeout`` attribute naming another class
+    of ``DB_STATEMENT_TIMEOUTS`` that timeout for the length of the request.
+
+    Connections of the web server start with the default timeout (see
+    ``DB_WEB_PROCESS``); it is restored once the response is done, for
+    streaming responses once the stream is consumed or closed. Skipped
+    outside Postgres and behind pgbouncer in transaction mode, where session
+    settings would leak to other clients.
+    """
+
+    def handle(self, request):
+        request.statement_timeout_set = False
+        response = self.get_response(request)
+        if request.statement_timeout_set:
+            if response.streaming:
+                response.streaming_content = self.reset_after(
+                    response.streaming_content
+                )
+            else:
+                self.reset()
+        return response
+
+    async def __acall__(self, request):
+        request.statement_timeout_set = False
+        response = await self.get_response(request)
+        if request.statement_timeout_set:
+            if response.streaming and response.is_async:
+                response.streaming_content = self.areset_after(
+                    response.streaming_content
+                )
+            elif response.streaming:
+                response.streaming_content = self.reset_after(
+                    response.streaming_content
+                )
+            else:
+                await sync_to_async(self.reset)()
+        return response
+
+    def reset_after(self, content):
+        try:
+            yield from content
+        finally:
+            self.reset()
+
+    async def areset_after(self, content):
+        try:
+            async for chunk in content:
+                yield chunk
+        finally:
+            await sync_to_async(self.reset)()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, "view_class", None)
+        name = getattr(view_class, "statement_timeout", "default")
+        if (
+            name == "default"
+            or connection.vendor != "postgresql"
+            or settings.DB_PGBOUNCER
+        ):
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT set_config('statement_timeout', %s, false)",
+                [str(settings.DB_STATEMENT_TIMEOUTS[name])],
+            )
+        request.statement_timeout_set = True
+        return None
+
+    def reset(self):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("RESET statement_timeout")
+        except DatabaseError:
+            # Never hand a connection with the longer timeout to the next
+            # request.
+            connection.close()
+
+
+class ReplicaRoutingMiddleware(HybridMiddleware):
+    """Let GET requests to views with ``read_replica = True`` read from a
+    replica, unless the client wrote something in the last
+    ``DB_REPLICA_PIN_SECONDS`` seconds and so has to see its own writes.
+    """
+
+    def handle(self, request):
+        response = self.get_response(request)
+        # Under ASGI process_view runs in a worker thread and its context is
+        # copied back, so the flag is cleared rather than reset to a token.
+        replica_reads.set(False)
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            pin_to_primary(request)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        replica_reads.set(False)
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            await sync_to_async(pin_to_primary)(request)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, "view_class", None)
+        if (
+            settings.DB_REPLICAS
+            and request.method in ("GET", "HEAD")
+            and getattr(view_class, "read_replica", False)
+            and not is_pinned(request)
+        ):
+            replica_reads.set(True)
+        return None
@@ -37,3 +37,38 @@ class SoftDeleteModel(BaseModel):
 
     def hard_delete(self, using=None, keep_parents=False):
         super().delete(using=using, keep_parents=keep_parents)
+
+
+class MediaBlob(BaseModel):
+    """A stored media file and the number of rows that point at it."""
+
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField(default=0)
+    ref_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count})"
+
+    @classmethod
+    def acquire(cls, name, size):
+        blob, created = cls.objects.select_for_update().get_or_create(
+            name=name, defaults={"size": size, "ref_count": 1}
+        )
+        if not created:
+            blob.ref_count = models.F("ref_count") + 1
+            blob.save(update_fields=["ref_count", "updated_at"])
+        return blob
+
+    @classmethod
+    def release(cls, name):
+        """Drop one reference to ``name``. Returns True when it was the last one
+        and the file can be removed. Unknown names are never reported as free."""
+        blob = cls.objects.select_for_update().filter(name=name).first()
+        if blob is None:
+            return False
+        if blob.ref_count > 1:
+            blob.ref_count = models.F("ref_count") - 1
+            blob.save(update_fields=["ref_count", "updated_at"])
+            return False
+        blob.delete()
+        return True
@@ -0,0 +1,98 @@
+import time
+from contextvars import ContextVar
+from django_redis.cache import RedisCache
+from rest_framework.serializers import BaseSerializer
+
+# Profile of the request being handled, or None when it is not sampled.
+current_profile = ContextVar("current_profile", default=None)
+MISSING = object()
+
+
+class RequestProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+
+    @property
+    def total_time(self):
+        return time.perf_counter() - self.started
+
+
+def record_query(execute, sql, params, many, context):
+    profile = current_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.queries += 1
+        profile.sql_time += time.perf_counter() - started
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """Count the queries of profiled requests on every new connection.
+
+    Under ASGI the queries of a request run in worker threads, each with its
+    own connections, so the recorder is installed on all of them once rather
+    than on the current thread's connections per request.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def record_cache(hits, misses):
+    profile = current_profile.get()
+    if profile is not None:
+        profile.cache_hits += hits
+        profile.cache_misses += misses
+
+
+class ProfiledRedisCache(RedisCache):
+    """``RedisCache`` that counts hits and misses into the current profile."""
+
+    def get(self, key, default=None, version=None, client=None):
+        value = super().get(key, default=MISSING, version=version, client=client)
+        if value is MISSING:
+            record_cache(0, 1)
+            return default
+        record_cache(1, 0)
+        return value
+
+    def get_many(self, keys, version=None, client=None):
+        keys = list(keys)
+        values = super().get_many(keys, version=version, client=client)
+        record_cache(len(values), len(keys) - len(values))
+        return values
+
+
+def instrument_serializers():
+    """Time ``serializer.data`` for profiled requests.
+
+    Only the outermost call is measured, so serializers that build nested
+    serializers' data are not counted twice.
+    """
+    data = BaseSerializer.data
+    if getattr(data.fget, "profiled", False):
+        return
+
+    def profiled_data(serializer):
+        profile = current_profile.get()
+        if profile is None:
+            return data.fget(serializer)
+        profile.serializer_depth += 1
+        started = time.perf_counter()
+        try:
+            return data.fget(serializer)
+        finally:
+            profile.serializer_depth -= 1
+            if not profile.serializer_depth:
+                profile.serializer_time += time.perf_counter() - started
+
+    profiled_data.profiled = True
+    BaseSerializer.data = property(profiled_data)
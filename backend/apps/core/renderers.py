@@ -0,0 +1,111 @@
+import io
+import math
+import re
+from decimal import Decimal
+from django.conf import settings
+from rest_framework import renderers
+from rest_framework.parsers import JSONParser
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+
+# orjson and the stdlib print floats the same way except in exponent notation
+# (1e16 vs 1e+16), which the stdlib switches to outside this range, and
+# orjson writes NaN and infinity as null.
+SMALLEST_PLAIN_FLOAT, LARGEST_PLAIN_FLOAT = 1e-4, 1e16
+# orjson reads integers beyond 64 bits as floats instead of failing.
+LONG_NUMBER = re.compile(rb"\d{19}")
+# Output that may hold such a float: a null, an exponent or a tiny fraction.
+# Strings can match too; the data is then checked before falling back.
+FLOAT_HINT = re.compile(rb"null|\d[eE][-+]?\d|0\.0000")
+
+
+def is_plain_float(value):
+    """Whether orjson prints ``value`` exactly like the stdlib encoder."""
+    return math.isfinite(value) and (
+        not value or SMALLEST_PLAIN_FLOAT <= abs(value) < LARGEST_PLAIN_FLOAT
+    )
+
+
+def has_other_floats(data):
+    """Whether ``data`` holds a float orjson would print differently."""
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, float):
+            if not is_plain_float(value):
+                return True
+        elif isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+    return False
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """``JSONRenderer`` backed by orjson.
+
+    The output is byte-identical to DRF's renderer: compact separators,
+    unescaped unicode, ``\\u2028``/``\\u2029`` escaped, Decimals as numbers
+    and datetimes cut to milliseconds with a ``Z`` suffix (both through DRF's
+    own encoder). Anything orjson cannot produce the same way (indented
+    output, huge integers, Decimals and floats that would need an exponent,
+    NaN and infinity) is rendered by DRF's renderer instead.
+    """
+
+    options = (
+        orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME if orjson else 0
+    )
+
+    def default(self, obj):
+        if isinstance(obj, Decimal):
+            value = float(obj)
+            if not is_plain_float(value):
+                raise TypeError("rendered by the stdlib encoder")
+            return value
+        return self.encoder_class().default(obj)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if (
+            orjson is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+            is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.default, option=self.options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Most responses give no hint of such floats and skip the walk.
+        if FLOAT_HINT.search(ret) and has_other_floats(data):
+            return super().render(data, accepted_media_type, renderer_context)
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
+
+
+class FastJSONParser(JSONParser):
+    """``JSONParser`` backed by orjson. Bodies orjson would read differently
+    (other encodings, integers beyond 64 bits) or rejects go through DRF's
+    parser, so results and error messages stay the same."""
+
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace("_", "-") != "utf-8":
+            return super().parse(stream, media_type, parser_context)
+        body = stream.read()
+        if LONG_NUMBER.search(body):
+            return super().parse(io.BytesIO(body), media_type, parser_context)
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            return super().parse(io.BytesIO(body), media_type, parser_context)
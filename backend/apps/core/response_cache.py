@@ -0,0 +1,99 @@
+import hashlib
+import time
+from functools import wraps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from apps.core.compression import compress_all
+
+CATALOG_VERSION_KEY = "catalog:version"
+CATALOG_RESPONSE_KEY = "catalog:{version}:{digest}"
+
+
+def catalog_version():
+    return cache.get_or_set(CATALOG_VERSION_KEY, time.time_ns, None)
+
+
+def bump_catalog_version():
+    cache.set(CATALOG_VERSION_KEY, time.time_ns(), None)
+
+
+def invalidate_catalog(**kwargs):
+    """Drop every cached catalog response.
+
+    The version is bumped right away and again after the commit, so a request
+    that cached the old rows while the transaction was open is dropped too.
+    """
+    bump_catalog_version()
+    transaction.on_commit(bump_catalog_version)
+
+
+def track_catalog(*models):
+    """Invalidate the catalog cache whenever one of ``models`` is saved or
+    deleted. Queryset ``update()`` calls send no signals; the entries they
+    leave behind expire after ``CATALOG_CACHE_TIMEOUT`` seconds."""
+    for model in models:
+        post_save.connect(invalidate_catalog, sender=model, weak=False)
+        post_delete.connect(invalidate_catalog, sender=model, weak=False)
+
+
+def catalog_cache_key(request):
+    # Host and Accept are part of the key: image URLs are absolute and the
+    # browsable API renders HTML.
+    source = "\n".join(
+        [request.get_host(), request.get_full_path(), request.META.get("HTTP_ACCEPT", "")]
+    )
+    digest = hashlib.sha256(source.encode()).hexdigest()
+    return CATALOG_RESPONSE_KEY.format(version=catalog_version(), digest=digest)
+
+
+def store_response(key, response):
+    if response.status_code != 200 or not response.get(
+        "Content-Type", ""
+    ).startswith("application/json"):
+        return
+    content = response.content
+    encoded = (
+        compress_all(content) if len(content) >= settings.COMPRESSION_MIN_SIZE else {}
+    )
+    # CompressionMiddleware sends these instead of compressing again.
+    response.precompressed = encoded
+    cache.set(
+        key,
+        {
+            "content": content,
+            "content_type": response["Content-Type"],
+            "encoded": encoded,
+        },
+        settings.CATALOG_CACHE_TIMEOUT,
+    )
+
+
+def cached_response(entry):
+    response = HttpResponse(entry["content"], content_type=entry["content_type"])
+    response.precompressed = entry["encoded"]
+    patch_vary_headers(response, ("Accept",))
+    return response
+
+
+def cache_catalog_response(get):
+    """Cache the rendered JSON of an anonymous ``get`` handler, together with
+    its compressed forms, for ``CATALOG_CACHE_TIMEOUT`` seconds."""
+
+    @wraps(get)
+    def wrapper(view, request, *args, **kwargs):
+        if not settings.CATALOG_CACHE_TIMEOUT or "HTTP_AUTHORIZATION" in request.META:
+            return get(view, request, *args, **kwargs)
+        key = catalog_cache_key(request)
+        entry = cache.get(key)
+        if entry is not None:
+            return cached_response(entry)
+        response = get(view, request, *args, **kwargs)
+        if hasattr(response, "add_post_render_callback"):
+            response.add_post_render_callback(lambda r: store_response(key, r))
+        return response
+
+    return wrapper
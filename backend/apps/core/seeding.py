@@ -0,0 +1,452 @@
+import csv
+import io
+import json
+import random
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from decimal import Decimal
+from multiprocessing import get_context
+from django.contrib.auth.hashers import make_password
+from django.db import connection, connections, transaction
+from django.db.backends.postgresql.psycopg_any import is_psycopg3
+from django.db.models import JSONField, prefetch_related_objects
+from apps.addresses.models import Address
+from apps.cart.models import Cart, CartItem
+from apps.categories.models import Category
+from apps.orders.models import Order, OrderItem, StoreOrder
+from apps.payments.models import Payment
+from apps.products.models import Product
+from apps.reviews.models import Review
+from apps.stores.models import Store, StoreItem
+from apps.users.models import User
+
+SEED_EMAIL_DOMAIN = "seed.example"
+SEED_PASSWORD = "seed-password"
+BATCH_SIZE = 5000
+# Products are generated in independent chunks, each with its own random
+# stream, so the data does not depend on how many processes are used.
+CHUNK_PRODUCTS = 20000
+SIZES = {
+    "small": {
+        "users": 200,
+        "stores": 20,
+        "category_depth": 3,
+        "category_children": 4,
+        "products": 2000,
+        "items_per_product": 2,
+        "cart_items": 3,
+        "orders": 1000,
+        "reviews": 2000,
+    },
+    "medium": {
+        "users": 2000,
+        "stores": 100,
+        "category_depth": 4,
+        "category_children": 5,
+        "products": 20000,
+        "items_per_product": 3,
+        "cart_items": 3,
+        "orders": 10000,
+        "reviews": 20000,
+    },
+    "large": {
+        "users": 20000,
+        "stores": 500,
+        "category_depth": 4,
+        "category_children": 6,
+        "products": 200000,
+        "items_per_product": 3,
+        "cart_items": 3,
+        "orders": 100000,
+        "reviews": 200000,
+    },
+    "xl": {
+        "users": 100000,
+        "stores": 2000,
+        "category_depth": 5,
+        "category_children": 6,
+        "products": 1000000,
+        "items_per_product": 3,
+        "cart_items": 3,
+        "orders": 500000,
+        "reviews": 1000000,
+    },
+}
+WORDS = (
+    "classic smart soft urban compact deluxe eco light pro travel wooden steel "
+    "cotton leather silk wireless digital vintage mini mega"
+).split()
+NOUNS = (
+    "shirt shoe bag lamp chair phone watch mug kettle jacket desk scarf "
+    "blender speaker backpack wallet helmet bottle notebook pillow"
+).split()
+
+
+def share(total, index, parts):
+    """Size of part ``index`` when ``total`` is split into ``parts`` parts."""
+    return total * (index + 1) // parts - total * index // parts
+
+
+def copy_value(field, value):
+    if value is None:
+        return None
+    if isinstance(field, JSONField):
+        return json.dumps(value, cls=field.encoder)
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def copy_rows(model, objects):
+    """Insert ``objects`` with PostgreSQL ``COPY``, several times faster than
+    ``INSERT`` for big batches. Primary keys are not returned. Works with
+    both psycopg 3 and psycopg2, whichever Django picked."""
+    fields = [
+        field
+        for field in model._meta.concrete_fields
+        if not field.primary_key or not field.auto_created
+    ]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for obj in objects:
+        writer.writerow(
+            [copy_value(field, field.pre_save(obj, add=True)) for field in fields]
+        )
+    buffer.seek(0)
+    quote = connection.ops.quote_name
+    columns = ", ".join(quote(field.column) for field in fields)
+    # Empty unquoted values mean NULL in CSV mode; keep them as empty strings
+    # in NOT NULL columns.
+    not_null = ", ".join(quote(field.column) for field in fields if not field.null)
+    sql = (
+        f"COPY {quote(model._meta.db_table)} ({columns}) FROM STDIN "
+        f"WITH (FORMAT csv, FORCE_NOT_NULL ({not_null}))"
+    )
+    with connection.cursor() as cursor:
+        if is_psycopg3:
+            with cursor.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+        else:
+            cursor.copy_expert(sql, buffer)
+    return objects
+
+
+class Seeder:
+    """Fill the database with a deterministic, realistic-looking dataset.
+
+    Users, stores and categories are created first; products and everything
+    hanging off them (store items, carts, orders, reviews) are then generated
+    in chunks of ``CHUNK_PRODUCTS``, optionally by several processes. Tables
+    whose ids are needed later go through ``bulk_create``; the others use
+    ``COPY`` on PostgreSQL. Signals and ``save()`` overrides are skipped on
+    purpose. Seeded users get ``@seed.example`` emails and numbering continues
+    after previous runs, so seeding twice adds a second dataset instead of
+    failing on unique fields.
+    """
+
+    def __init__(
+        self, size="small", seed=0, batch_size=BATCH_SIZE, workers=1, log=None
+    ):
+        self.counts = SIZES[size] if isinstance(size, str) else size
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.batch_size = batch_size
+        self.workers = workers
+        self.log = log or (lambda message: None)
+
+    def create(self, model, objects):
+        created = model.objects.bulk_create(objects, batch_size=self.batch_size)
+        self.log(f"{model._meta.label}: {len(created)}")
+        return created
+
+    def insert(self, model, objects):
+        """Write rows nothing else needs the ids of."""
+        if connection.vendor != "postgresql":
+            return model.objects.bulk_create(objects, batch_size=self.batch_size)
+        for start in range(0, len(objects), self.batch_size):
+            copy_rows(model, objects[start : start + self.batch_size])
+        return objects
+
+    def name(self):
+        return f"{self.random.choice(WORDS).title()} {self.random.choice(NOUNS)}"
+
+    def price(self):
+        return Decimal(self.random.randint(100, 50000)) / 100
+
+    def seed_users(self):
+        start = User.all_objects.filter(email__endswith=f"@{SEED_EMAIL_DOMAIN}").count()
+        password = make_password(SEED_PASSWORD)
+        users = [
+            User(
+                email=f"user{start + i}@{SEED_EMAIL_DOMAIN}",
+                phone=f"00{start + i:013d}",
+                first_name=f"User{start + i}",
+                last_name="Seed",
+                password=password,
+                is_active=True,
+                is_seller=i < self.counts["stores"],
+            )
+            for i in range(self.counts["users"])
+        ]
+        return self.create(User, users)
+
+    def seed_stores(self, sellers):
+        stores = [
+            Store(seller=seller, name=f"{seller.first_name} shop", description="")
+            for seller in sellers
+        ]
+        return self.create(Store, stores)
+
+    def seed_categories(self):
+        level = self.create(
+            Category,
+            [
+                Category(name=f"{noun.title()}s", description="")
+                for noun in NOUNS[: self.counts["category_children"]]
+            ],
+        )
+        for _ in range(self.counts["category_depth"] - 1):
+            level = self.create(
+                Category,
+                [
+                    Category(name=self.name(), description="", parent=parent)
+                    for parent in level
+                    for _ in range(self.counts["category_children"])
+                ],
+            )
+        return level
+
+    def seed_addresses(self, users):
+        addresses = [
+            Address(
+                user=user,
+                label="Home",
+                city="Tehran",
+                state="Tehran",
+                postal_code=f"{self.random.randint(10**9, 10**10 - 1)}",
+                country="Iran",
+                is_default=True,
+            )
+            for user in users
+        ]
+        return self.create(Address, addresses)
+
+    def seed_products(self, count, leaf_ids):
+        products = [
+            Product(
+                name=self.name(),
+                description="Seeded product",
+                category_id=self.random.choice(leaf_ids),
+                stock=1000,
+                rating=Decimal(self.random.randint(100, 500)) / 100,
+            )
+            for _ in range(count)
+        ]
+        return self.create(Product, products)
+
+    def seed_store_items(self, products, stores):
+        per_product = min(self.counts["items_per_product"], len(stores))
+        items = []
+        for product in products:
+            for store in self.random.sample(stores, per_product):
+                items.append(
+                    StoreItem(
+                        product=product,
+                        store=store,
+                        price=self.price(),
+                        discount=self.random.choice([None, Decimal("10"), None]),
+                        stock=self.random.randint(50, 500),
+                    )
+                )
+        for item in items:
+            item.effective_price = item.total_price
+        return self.create(StoreItem, items)
+
+    def seed_cart_items(self, cart_ids, store_items):
+        cart_items = [
+            CartItem(
+                cart_id=cart_id,
+                store_item=store_item,
+                quantity=self.random.randint(1, 3),
+            )
+            for cart_id in cart_ids
+            for store_item in self.random.sample(
+                store_items, min(self.counts["cart_items"], len(store_items))
+            )
+        ]
+        self.insert(CartItem, cart_items)
+        self.log(f"cart.CartItem: {len(cart_items)}")
+
+    def seed_orders(self, count, addresses, store_items):
+        prefetch_related_objects(
+            list({item.product for item in store_items}), "images"
+        )
+        statuses = [
+            Order.OrderStatus.PROCESSING,
+            Order.OrderStatus.DELIVERED,
+            Order.OrderStatus.DELIVERED,
+            Order.OrderStatus.PENDING,
+            Order.OrderStatus.CANCELLED,
+        ]
+        orders, lines = [], []
+        for _ in range(count):
+            customer_id, address_id = self.random.choice(addresses)
+            picked = self.random.sample(
+                store_items, min(self.random.randint(1, 3), len(store_items))
+            )
+            order_lines = [(item, self.random.randint(1, 3)) for item in picked]
+            orders.append(
+                Order(
+                    customer_id=customer_id,
+                    address_id=address_id,
+                    status=self.random.choice(statuses),
+                    total_price=sum(
+                        item.total_price * quantity for item, quantity in order_lines
+                    ),
+                )
+            )
+            lines.append(order_lines)
+        orders = self.create(Order, orders)
+
+        order_items, store_orders, payments = [], [], []
+        for order, order_lines in zip(orders, lines):
+            totals = {}
+            for item, quantity in order_lines:
+                order_items.append(
+                    OrderItem(
+                        order=order,
+                        store_item=item,
+                        quantity=quantity,
+                        price=item.price,
+                        total_price=item.total_price * quantity,
+                        snapshot=OrderItem.build_snapshot(item),
+                    )
+                )
+                subtotal, count = totals.get(item.store_id, (0, 0))
+                totals[item.store_id] = (subtotal + item.total_price * quantity, count + 1)
+            store_orders += [
+                StoreOrder(
+                    store_id=store_id,
+                    order=order,
+                    status=order.status,
+                    subtotal=subtotal,
+                    items_count=count,
+                )
+                for store_id, (subtotal, count) in totals.items()
+            ]
+            payments.append(
+                Payment(
+                    order=order,
+                    status=Payment.PaymentStatus.DONE
+                    if order.status != Order.OrderStatus.PENDING
+                    else Payment.PaymentStatus.PROGRESS,
+                    transaction_id=f"SEED{order.pk}",
+                    amount=order.total_price,
+                )
+            )
+        for model, objects in [
+            (OrderItem, order_items),
+            (StoreOrder, store_orders),
+            (Payment, payments),
+        ]:
+            self.insert(model, objects)
+            self.log(f"{model._meta.label}: {len(objects)}")
+        return orders
+
+    def seed_reviews(self, count, customer_ids, products, stores):
+        reviews = []
+        for i in range(count):
+            # Roughly one review in five is about a store, the rest about products.
+            target = (
+                {"store": self.random.choice(stores)}
+                if i % 5 == 0
+                else {"product": self.random.choice(products)}
+            )
+            reviews.append(
+                Review(
+                    user_id=self.random.choice(customer_ids),
+                    rating=self.random.randint(1, 5),
+                    comment="Seeded review",
+                    **target,
+                )
+            )
+        self.insert(Review, reviews)
+        self.log(f"reviews.Review: {len(reviews)}")
+
+    def seed_chunk(self, index, chunks, shared):
+        """Products of chunk ``index`` with their store items, a share of the
+        carts, orders and reviews. Runs in its own transaction."""
+        self.random = random.Random(f"{self.seed}:{index}")
+        stores = [Store(pk=pk, name=name) for pk, name in shared["stores"]]
+        with transaction.atomic():
+            products = self.seed_products(
+                share(self.counts["products"], index, chunks), shared["leaf_ids"]
+            )
+            store_items = self.seed_store_items(products, stores)
+            self.seed_cart_items(shared["cart_ids"][index::chunks], store_items)
+            self.seed_orders(
+                share(self.counts["orders"], index, chunks),
+                shared["addresses"],
+                store_items,
+            )
+            self.seed_reviews(
+                share(self.counts["reviews"], index, chunks),
+                [customer_id for customer_id, _ in shared["addresses"]],
+                products,
+                stores,
+            )
+        return index
+
+    def run(self):
+        with transaction.atomic():
+            users = self.seed_users()
+            sellers = users[: self.counts["stores"]]
+            customers = users[self.counts["stores"] :]
+            stores = self.seed_stores(sellers)
+            leaves = self.seed_categories()
+            addresses = self.seed_addresses(customers)
+            carts = self.create(Cart, [Cart(user=user) for user in customers])
+
+        shared = {
+            "stores": [(store.pk, store.name) for store in stores],
+            "leaf_ids": [leaf.pk for leaf in leaves],
+            "addresses": [(a.user_id, a.pk) for a in addresses],
+            "cart_ids": [cart.pk for cart in carts],
+        }
+        chunks = max(1, -(-self.counts["products"] // CHUNK_PRODUCTS))
+        workers = self.workers if connection.vendor == "postgresql" else 1
+        if workers > 1 and chunks > 1:
+            # Children must open their own connections instead of sharing the
+            # parent's socket.
+            connections.close_all()
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=get_context("fork")
+            ) as pool:
+                futures = [
+                    pool.submit(
+                        seed_chunk_in_worker,
+                        self.counts,
+                        self.seed,
+                        self.batch_size,
+                        index,
+                        chunks,
+                        shared,
+                    )
+                    for index in range(chunks)
+                ]
+                for future in futures:
+                    self.log(f"chunk {future.result() + 1}/{chunks} done")
+        else:
+            for index in range(chunks):
+                self.seed_chunk(index, chunks, shared)
+                self.log(f"chunk {index + 1}/{chunks} done")
+        return {"users": users, "stores": stores}
+
+
+def seed_chunk_in_worker(counts, seed, batch_size, index, chunks, shared):
+    try:
+        return Seeder(counts, seed, batch_size).seed_chunk(index, chunks, shared)
+    finally:
+        connections.close_all()
@@ -0,0 +1,135 @@
+import hashlib
+import posixpath
+from django.core.files.base import File
+from django.core.files.storage import FileSystemStorage, storages
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from apps.core.images import variants_field_name
+
+BLOB_DIR = "blobs"
+# Blob names change whenever their content does, so clients and CDNs can keep
+# them forever.
+BLOB_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def media_storage():
+    return storages["media"]
+
+
+def blob_name(digest, extension):
+    return posixpath.join(BLOB_DIR, digest[:2], digest[2:4], digest + extension)
+
+
+def is_blob(name):
+    return bool(name) and name.startswith(BLOB_DIR + "/")
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """File system storage that keeps every distinct file once.
+
+    Uploads are saved under the SHA-256 of their content, so the same photo
+    uploaded for many rows ends up as a single file. ``MediaBlob`` counts the
+    references to each file and ``delete`` only removes it from disk once the
+    last one is released.
+    """
+
+    def __init__(self, **kwargs):
+        # Two writers of the same name always write the same bytes.
+        kwargs.setdefault("allow_overwrite", True)
+        super().__init__(**kwargs)
+
+    def save(self, name, content, max_length=None):
+        from apps.core.models import MediaBlob
+
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        extension = posixpath.splitext(name)[1].lower()
+        name = blob_name(digest.hexdigest(), extension)
+
+        with transaction.atomic():
+            MediaBlob.acquire(name, content.size)
+            if not self.exists(name):
+                name = super().save(name, content, max_length=max_length)
+        return name
+
+    def delete(self, name):
+        from apps.core.models import MediaBlob
+
+        with transaction.atomic():
+            if MediaBlob.release(name):
+                super().delete(name)
+
+
+def release_media(storage, names):
+    for name in names:
+        if is_blob(name):
+            storage.delete(name)
+
+
+def media_names(instance, field_name):
+    """Names of the file in ``field_name`` and of its generated variants."""
+    name = instance.__dict__.get(field_name)
+    name = getattr(name, "name", name)
+    if not name:
+        return set()
+    variants = instance.__dict__.get(variants_field_name(field_name)) or {}
+    return {name} | {v for key, v in variants.items() if key != "source"}
+
+
+def track_media(model, *field_names):
+    """Release the blobs of ``field_names`` when they are replaced or their row
+    is deleted, including deletes that cascade or go through a queryset.
+    Saves record the fields they put a new file in on ``_media_changed``."""
+
+    def remember(sender, instance, **kwargs):
+        instance._media_names = {
+            field_name: media_names(instance, field_name)
+            for field_name in field_names
+            if field_name in instance.__dict__
+        }
+
+    def release_replaced(sender, instance, created=False, raw=False, **kwargs):
+        if raw:
+            return
+        loaded = getattr(instance, "_media_names", {})
+        # Fields this save put a new file in, for ``schedule_image_variants``.
+        instance._media_changed = set()
+        for field_name in field_names:
+            if field_name not in instance.__dict__:
+                continue
+            name = getattr(instance, field_name).name
+            old = loaded.get(field_name, set())
+            if name and (created or name not in old):
+                instance._media_changed.add(field_name)
+            if name in old:
+                continue
+            # The variants of the old file go with it; the new file gets its
+            # own once they are generated.
+            stale = old - {name}
+            if stale:
+                storage = model._meta.get_field(field_name).storage
+                transaction.on_commit(
+                    lambda storage=storage, stale=stale: release_media(storage, stale)
+                )
+            loaded[field_name] = {name} if name else set()
+        instance._media_names = loaded
+
+    def release_deleted(sender, instance, **kwargs):
+        for field_name in field_names:
+            storage = model._meta.get_field(field_name).storage
+            names = media_names(instance, field_name)
+            if names:
+                transaction.on_commit(
+                    lambda storage=storage, names=names: release_media(storage, names)
+                )
+
+    post_init.connect(remember, sender=model, weak=False)
+    post_save.connect(release_replaced, sender=model, weak=False)
+    post_delete.connect(release_deleted, sender=model, weak=False)
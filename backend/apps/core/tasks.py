@@ -0,0 +1,43 @@
+from celery import shared_task
+from django.apps import apps
+from apps.core.images import (
+    build_image_variants,
+    variants_field_name,
+    placeholder_field_name,
+)
+from apps.core.storage import release_media
+
+
+@shared_task
+def generate_image_variants(model_label, pk, field_name):
+    model = apps.get_model(model_label)
+    instance = model._base_manager.filter(pk=pk).first()
+    if instance is None:
+        return "instance is gone"
+    field_file = getattr(instance, field_name)
+    if not field_file:
+        return "no image"
+    variants, placeholder = build_image_variants(field_file)
+    # Only store the result if the image was not replaced in the meantime.
+    updated = model._base_manager.filter(
+        pk=pk, **{field_name: field_file.name}
+    ).update(
+        **{
+            variants_field_name(field_name): variants,
+            placeholder_field_name(field_name): placeholder,
+        }
+    )
+    if not updated:
+        release_media(
+            field_file.storage,
+            [name for key, name in variants.items() if key != "source"],
+        )
+        return "image was replaced"
+    return f"{len(variants) - 1} variant(s) for {model_label} {pk}"
+
+
+@shared_task
+def generate_image_variants_batch(model_label, pks, field_name):
+    for pk in pks:
+        generate_image_variants(model_label, pk, field_name)
+    return f"processed {len(pks)} {model_label} image(s)"
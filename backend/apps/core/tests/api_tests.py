@@ -0,0 +1,438 @@
+import asyncio
+import gzip
+import io
+import json
+import uuid
+from unittest import mock, skipUnless
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+from apps.core.benchmarks import SCENARIOS, run_benchmarks
+from apps.core.middleware import HybridMiddleware
+from apps.core.renderers import FastJSONParser, FastJSONRenderer
+from apps.core.compression import choose_encoding
+from apps.core.db_router import ReplicaRouter, replica_reads
+from apps.core import metrics, seeding
+from apps.core.seeding import Seeder, copy_rows
+from apps.addresses.models import Address
+from apps.cart.models import Cart, CartItem
+from apps.categories.models import Category
+from apps.orders.models import Order
+from apps.payments.gateway import FakeGateway, PaymentGatewayError, http_client
+from apps.payments.models import Payment
+from apps.products.models import Product
+from apps.stores.models import Store, StoreItem
+from apps.users.models import User
+
+
+class HealthAndMetricsTest(APITestCase):
+    def setUp(self):
+        metrics.recent.clear()
+
+    def test_readiness_probes_database_and_cache(self):
+        response = self.client.get("/ready/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.json()["checks"]["database"]["ok"])
+        self.assertTrue(response.json()["checks"]["cache"]["ok"])
+        with mock.patch("apps.core.metrics.run_with_timeout") as run:
+            self.assertEqual(self.client.get("/ready/").status_code, 200)
+        run.assert_not_called()
+
+    @override_settings(METRICS_TOKEN="scrape-token")
+    @mock.patch("apps.core.metrics.probe_cache")
+    @mock.patch(
+        "apps.core.metrics.celery_queue_depths",
+        return_value=[({"queue": "celery"}, 3)],
+    )
+    def test_metrics_include_request_latency(self, queue_depths, probe_cache):
+        self.client.get(reverse("products_list_create"))
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        auth = {"HTTP_AUTHORIZATION": "Bearer scrape-token"}
+        response = self.client.get("/metrics", **auth)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        body = response.content.decode()
+        self.assertIn("# TYPE http_request_duration_seconds histogram", body)
+        self.assertIn('view="products_list_create"', body)
+        self.assertIn('celery_queue_length{queue="celery"} 3', body)
+        self.assertIn("cache_up 1", body)
+        # Gauges are reused by the next scrape.
+        self.client.get("/metrics", **auth)
+        queue_depths.assert_called_once_with()
+        probe_cache.assert_called_once_with()
+
+    def test_metrics_are_closed_without_a_token(self):
+        response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer ")
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(METRICS_FLUSH_INTERVAL=60)
+    def test_observations_are_pushed_in_batches(self):
+        metrics.buffer.flush()
+        with mock.patch.object(metrics.local_store, "increment") as increment:
+            for _ in range(3):
+                metrics.observe("celery_task_duration_seconds", 0.2, task="t")
+            increment.assert_not_called()
+            metrics.buffer.flush()
+        (values,) = increment.call_args.args
+        self.assertEqual(
+            values["celery_task_duration_seconds"]['task="t"|count|'], 3
+        )
+
+
+class FastJSONTest(APITestCase):
+    def test_output_matches_drf_renderer(self):
+        payloads = [
+            {
+                "price": Decimal("1250000.50"),
+                "discount": Decimal("0.10"),
+                "tiny": Decimal("0.00001"),
+                "huge": Decimal("12345678901234567890"),
+                "big_int": 2**70,
+                "created_at": datetime(2025, 1, 2, 3, 4, 5, 678901, dt_timezone.utc),
+                "day": date(2025, 1, 2),
+                "wait": timedelta(minutes=2),
+                "id": uuid.UUID(int=1),
+                "text": "فروشگاه \u2028 \u2029 \x1f \"quoted\" </script>",
+                "nested": [{1: None, "ok": True}, (1.5, 0.1)],
+            },
+            {"floats": [1e16, 1.5e17, 1e-05, -2e-07, 9.9e15, 0.0001, 0.0]},
+            [],
+            "plain",
+        ]
+        for data in payloads:
+            self.assertEqual(
+                FastJSONRenderer().render(data), JSONRenderer().render(data)
+            )
+        self.assertEqual(FastJSONRenderer().render(None), b"")
+
+    def test_non_finite_floats_fail_like_drf_renderer(self):
+        for data in [{"rating": float("nan")}, [1, {"x": (float("-inf"),)}]]:
+            with self.assertRaises(ValueError):
+                JSONRenderer().render(data)
+            with self.assertRaises(ValueError):
+                FastJSONRenderer().render(data)
+        renderer = FastJSONRenderer()
+        renderer.strict = False
+        self.assertEqual(renderer.render([float("inf")]), b"[Infinity]")
+
+    def test_indent_falls_back_to_drf_renderer(self):
+        data = {"a": [1, 2]}
+        self.assertEqual(
+            FastJSONRenderer().render(data, "application/json; indent=4"),
+            JSONRenderer().render(data, "application/json; indent=4"),
+        )
+
+    def test_parser_matches_drf_parser(self):
+        body = '{"address_id": 3, "note": "سلام", "n": 123456789012345678901234}'
+        for parser in (FastJSONParser(), JSONParser()):
+            self.assertEqual(
+                parser.parse(io.BytesIO(body.encode())),
+                {"address_id": 3, "note": "سلام", "n": 123456789012345678901234},
+            )
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b'{"a": NaN}'))
+
+    def test_api_responses_use_fast_renderer(self):
+        response = self.client.get(reverse("products_list_create"))
+        self.assertIsInstance(response.accepted_renderer, FastJSONRenderer)
+
+
+@override_settings(COMPRESSION_MIN_SIZE=200, CATALOG_CACHE_TIMEOUT=60)
+class CompressionAndCatalogCacheTest(APITestCase):
+    def setUp(self):
+        category = Category.objects.create(name="Phones", description="Phones")
+        for i in range(5):
+            Product.objects.create(
+                name=f"Phone {i}", description="A phone " * 10, category=category
+            )
+        self.url = reverse("products_list_create")
+
+    def test_choose_encoding(self):
+        self.assertEqual(choose_encoding("gzip, deflate"), "gzip")
+        self.assertEqual(choose_encoding("*"), choose_encoding("br, gzip"))
+        self.assertIsNone(choose_encoding("gzip;q=0, identity"))
+        self.assertIsNone(choose_encoding(""))
+
+    def test_large_responses_are_gzipped(self):
+        plain = self.client.get(self.url)
+        self.assertNotIn("Content-Encoding", plain)
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+
+    def test_catalog_response_is_served_from_cache(self):
+        first = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip")
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second["Content-Encoding"], "gzip")
+
+    def test_saving_a_product_invalidates_the_cache(self):
+        self.client.get(self.url)
+        Product.objects.filter(name="Phone 0").get().delete()
+        response = self.client.get(self.url)
+        self.assertEqual(json.loads(response.content)["count"], 4)
+
+    def test_authenticated_requests_are_not_cached(self):
+        user = User.objects.create_user(  # type: ignore
+            email="reader@example.com", password="password123", phone="09120000001"
+        )
+        token = RefreshToken.for_user(user).access_token
+        self.client.get(self.url)
+        # update() sends no signal, so the anonymous entry stays stale.
+        Product.objects.update(name="Renamed")
+        anonymous = self.client.get(self.url)
+        authenticated = self.client.get(self.url, HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.assertNotIn(b"Renamed", anonymous.content)
+        self.assertIn(b"Renamed", authenticated.content)
+
+
+class ReplicaRoutingTest(APITestCase):
+    def setUp(self):
+        user = User.objects.create_user(  # type: ignore
+            email="buyer@example.com", password="password123", phone="09120000002"
+        )
+        token = RefreshToken.for_user(user).access_token
+        self.auth = {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+
+    @override_settings(DB_REPLICAS=["replica_1"])
+    def test_router_reads_from_replica_only_when_allowed(self):
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_read(Product), "default")
+        token = replica_reads.set(True)
+        try:
+            self.assertEqual(router.db_for_read(Product), "replica_1")
+            self.assertEqual(router.db_for_read(User), "default")
+            self.assertEqual(router.db_for_write(Product), "default")
+        finally:
+            replica_reads.reset(token)
+        self.assertFalse(router.allow_migrate("replica_1", "products"))
+
+    # The primary doubles as the replica, so the queries run; what is
+    # checked is whether reads were allowed to go to a replica.
+    @override_settings(DB_REPLICAS=["default"])
+    def test_clients_are_pinned_to_primary_after_writing(self):
+        seen = []
+        read = ReplicaRouter.db_for_read
+
+        def spy(router, model, **hints):
+            seen.append(replica_reads.get())
+            return read(router, model, **hints)
+
+        url = reverse("products_list_create")
+        with mock.patch.object(ReplicaRouter, "db_for_read", spy):
+            self.client.get(url, **self.auth)
+            self.assertTrue(seen and all(seen))
+
+            response = self.client.post(
+                reverse("address_list_create"),
+                {
+                    "label": "Home",
+                    "city": "Tehran",
+                    "state": "Tehran",
+                    "postal_code": "12345",
+                    "country": "Iran",
+                },
+                **self.auth,
+            )
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            seen.clear()
+            self.client.get(url, **self.auth)
+            self.assertTrue(seen and not any(seen))
+
+            seen.clear()
+            self.client.get(url)
+            self.assertTrue(seen and all(seen))
+
+
+class DownGateway(FakeGateway):
+    async def request_payment(self, amount, description, mobile="", email=""):
+        raise PaymentGatewayError("Payment gateway unreachable")
+
+
+class HybridMiddlewareTest(SimpleTestCase):
+    def test_base_passes_requests_through_in_both_modes(self):
+        request = object()
+        self.assertIs(HybridMiddleware(lambda r: r)(request), request)
+
+        async def get_response(r):
+            return r
+
+        middleware = HybridMiddleware(get_response)
+        self.assertIs(asyncio.run(middleware(request)), request)
+
+
+class GatewayClientTest(SimpleTestCase):
+    async def use_twice(self):
+        async with http_client() as first:
+            pass
+        async with http_client() as second:
+            pass
+        return first, second
+
+    def test_client_is_closed_unless_the_loop_outlives_the_request(self):
+        first, second = asyncio.run(self.use_twice())
+        self.assertIsNot(first, second)
+        self.assertTrue(first.is_closed and second.is_closed)
+        with override_settings(ASGI_SERVER=True):
+            first, second = asyncio.run(self.use_twice())
+        self.assertIs(first, second)
+        self.assertFalse(first.is_closed)
+
+
+@override_settings(PAYMENT_GATEWAY="apps.payments.gateway.FakeGateway")
+class AsyncViewTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(  # type: ignore
+            email="buyer@example.com", password="password123", phone="09120000003"
+        )
+        token = RefreshToken.for_user(self.user).access_token
+        self.auth = {"AUTHORIZATION": f"Bearer {token}"}
+        category = Category.objects.create(name="Phones", description="Phones")
+        product = Product.objects.create(
+            name="Phone X", description="A phone", category=category
+        )
+        store = Store.objects.create(seller=self.user, name="Shop", description="")
+        self.store_item = StoreItem.objects.create(
+            store=store, product=product, price=Decimal("100.00"), stock=5
+        )
+        cart, _ = Cart.objects.get_or_create(user=self.user)
+        CartItem.objects.create(cart=cart, store_item=self.store_item, quantity=2)
+        self.address = Address.objects.create(
+            user=self.user,
+            label="Home",
+            city="Tehran",
+            state="Tehran",
+            postal_code="12345",
+            country="Iran",
+        )
+
+    async def checkout(self):
+        return await self.async_client.post(
+            reverse("user_create_order"),
+            {"address_id": self.address.pk},
+            content_type="application/json",
+            headers=self.auth,
+        )
+
+    @override_settings(REQUEST_PROFILING_SAMPLE_RATE=1.0)
+    async def test_checkout_runs_under_asgi(self):
+        with self.assertLogs("apps.profiling", "INFO") as logs:
+            response = await self.checkout()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(response.json()["payment_url"])
+        # The profiling middleware still sees the queries run in threads.
+        self.assertGreater(json.loads(logs.records[0].getMessage())["queries"], 0)
+
+        payment = await Payment.objects.select_related("order").aget()
+        self.assertEqual(payment.status, Payment.PaymentStatus.PROGRESS)
+        await self.store_item.arefresh_from_db()
+        self.assertEqual(self.store_item.stock, 3)
+
+    @override_settings(PAYMENT_GATEWAY="apps.core.tests.api_tests.DownGateway")
+    async def test_gateway_failure_gives_stock_back(self):
+        response = await self.checkout()
+        self.assertEqual(response.status_code, 500)
+
+        order = await Order.objects.aget()
+        self.assertEqual(order.status, Order.OrderStatus.FAILED)
+        await self.store_item.arefresh_from_db()
+        self.assertEqual(self.store_item.stock, 5)
+
+    async def test_otp_round_trip(self):
+        with mock.patch("apps.accounts.views.send_otp_email_task") as task:
+            response = await self.async_client.post(
+                reverse("request_otp"),
+                {"email": self.user.email},
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        otp = task.delay.call_args.args[1]
+
+        response = await self.async_client.post(
+            reverse("verify_otp"),
+            {"email": self.user.email, "otp": otp},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("access", response.json())
+
+
+class BenchmarkTest(APITestCase):
+    def test_seed_and_run_every_scenario(self):
+        size = {
+            "users": 12,
+            "stores": 2,
+            "category_depth": 2,
+            "category_children": 2,
+            "products": 10,
+            "items_per_product": 2,
+            "cart_items": 2,
+            "orders": 5,
+            "reviews": 10,
+        }
+        Seeder(size=size, seed=1).run()
+        self.assertEqual(Product.objects.count(), 10)
+        self.assertEqual(Order.objects.count(), 5)
+
+        report = run_benchmarks(iterations=2, warmup=0)
+        self.assertEqual(set(report["scenarios"]), set(SCENARIOS))
+        for name, result in report["scenarios"].items():
+            self.assertEqual(result["errors"], 0, name)
+            self.assertEqual(result["requests"], 2)
+        for name, result in report["rendering"].items():
+            self.assertTrue(result["identical"], name)
+
+
+class CopyRowsTest(APITestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name="Books", description="Books")
+
+    def products(self):
+        return [
+            Product(name=name, description="", category=self.category)
+            for name in ("First", "Second")
+        ]
+
+    def test_copy_is_written_through_either_driver(self):
+        for psycopg3 in (True, False):
+            cursor = mock.MagicMock()
+            with mock.patch.object(seeding, "is_psycopg3", psycopg3), mock.patch(
+                "apps.core.seeding.connection"
+            ) as patched:
+                patched.ops.quote_name = connection.ops.quote_name
+                patched.cursor.return_value.__enter__.return_value = cursor
+                copy_rows(Product, self.products())
+            if psycopg3:
+                sql = cursor.copy.call_args.args[0]
+                copy = cursor.copy.return_value.__enter__.return_value
+                data = copy.write.call_args.args[0]
+                cursor.copy_expert.assert_not_called()
+            else:
+                sql, buffer = cursor.copy_expert.call_args.args
+                data = buffer.read()
+                cursor.copy.assert_not_called()
+            self.assertTrue(sql.startswith('COPY "products_product" ('), sql)
+            self.assertIn("FORMAT csv", sql)
+            rows = data.splitlines()
+            self.assertEqual(len(rows), 2)
+            self.assertIn(",First,", rows[0])
+            self.assertIn(",Second,", rows[1])
+
+    @skipUnless(connection.vendor == "postgresql", "COPY needs PostgreSQL")
+    def test_copy_inserts_the_rows(self):
+        copy_rows(Product, self.products())
+        self.assertEqual(
+            sorted(Product.objects.values_list("name", flat=True)),
+            ["First", "Second"],
+        )
@@ -0,0 +1,192 @@
+import json
+from decimal import Decimal
+from pathlib import Path
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.urls.resolvers import URLResolver
+from rest_framework.test import APITestCase
+from apps.addresses.models import Address
+from apps.cart.models import Cart, CartItem
+from apps.categories.models import Category
+from apps.orders.models import Order, OrderItem, StoreOrder
+from apps.payments.models import Payment
+from apps.products.models import Product
+from apps.reviews.models import Review
+from apps.stores.models import Store, StoreItem, StoreItemImport
+from apps.users.models import User
+import apps.urls
+
+BUDGET_FILE = Path(__file__).with_name("query_budgets.json")
+SMALL, LARGE = 1, 50
+
+
+def url_names(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from url_names(pattern.url_patterns)
+        elif pattern.name:
+            yield pattern.name
+
+
+class QueryBudgetData:
+    """Rows behind every list endpoint, grown ``n`` at a time, so the same
+    requests can be measured against 1 and 50 results."""
+
+    def __init__(self):
+        self.users = 0
+        self.customer = self.user(is_seller=False)
+        self.cart = Cart.objects.create(user=self.customer)
+        self.seller = self.user(is_seller=True)
+        self.store = Store.objects.create(seller=self.seller, name="Main", description="")
+        self.store_address = self.address(self.seller, store=self.store)
+        self.category = Category.objects.create(name="Root", description="Root")
+        self.product = Product.objects.create(
+            name="Target", description="", category=self.category
+        )
+        self.store_item = self.item(self.product, self.store)
+        self.store_import = StoreItemImport.objects.create(
+            store=self.store, file_format="csv"
+        )
+        self.orders = []
+
+    def user(self, is_seller):
+        self.users += 1
+        return User.objects.create_user(  # type: ignore
+            email=f"budget{self.users}@example.com",
+            password="password123",
+            phone=f"0912{self.users:07d}",
+            is_seller=is_seller,
+        )
+
+    def address(self, user, store=None):
+        return Address.objects.create(
+            user=user,
+            store=store,
+            label="Home",
+            city="Tehran",
+            state="Tehran",
+            postal_code="12345",
+            country="Iran",
+        )
+
+    def item(self, product, store):
+        return StoreItem.objects.create(
+            product=product, store=store, price=Decimal("100"), stock=100
+        )
+
+    def order(self, items):
+        total = sum(item.total_price for item in items)
+        order = Order.objects.create(
+            customer=self.customer,
+            address=self.customer_address,
+            total_price=total,
+        )
+        for item in items:
+            OrderItem.objects.create(
+                order=order,
+                store_item=item,
+                quantity=1,
+                price=item.price,
+                total_price=item.total_price,
+                snapshot=OrderItem.build_snapshot(item),
+            )
+            StoreOrder.objects.create(
+                store=item.store,
+                order=order,
+                status=order.status,
+                subtotal=item.total_price,
+                items_count=1,
+            )
+        Payment.objects.create(
+            order=order, transaction_id=f"T{order.pk}", amount=order.total_price
+        )
+        self.orders.append(order)
+        return order
+
+    def grow(self, n):
+        for _ in range(n):
+            category = Category.objects.create(
+                name="Child", description="Child", parent=self.category
+            )
+            product = Product.objects.create(
+                name="Product", description="", category=category
+            )
+            item = self.item(product, self.store)
+            other_store = Store.objects.create(
+                seller=self.user(is_seller=True), name="Other", description=""
+            )
+            other_item = self.item(self.product, other_store)
+            self.customer_address = self.address(self.customer)
+            CartItem.objects.create(cart=self.cart, store_item=item)
+            Review.objects.create(user=self.customer, product=self.product, rating=4)
+            Review.objects.create(user=self.customer, store=self.store, rating=5)
+            self.order([item, other_item])
+
+    def kwargs(self, names):
+        objects = {
+            "product": self.product.pk,
+            "store": self.store.pk,
+            "category": self.category.pk,
+            "store_item": self.store_item.pk,
+            "store_import": self.store_import.pk,
+            "store_address": self.store_address.pk,
+            "address": self.customer_address.pk,
+            "order": self.orders[0].pk,
+            "cart_item": self.cart.items.first().pk,
+        }
+        return {kwarg: objects[name] for kwarg, name in names.items()}
+
+
+class QueryBudgetTest(APITestCase):
+    """Every endpoint in ``apps/urls.py`` must have an entry in
+    ``query_budgets.json``. GET endpoints are requested with 1 and then 50
+    rows behind them: the query count may not grow with the number of rows
+    and may not exceed the endpoint's budget."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        with open(BUDGET_FILE) as f:
+            cls.budgets = json.load(f)
+
+    def test_every_endpoint_has_a_budget(self):
+        missing = sorted(set(url_names(apps.urls.urlpatterns)) - set(self.budgets))
+        self.assertEqual(missing, [], "add these endpoints to query_budgets.json")
+
+    def measure(self, data, name, spec):
+        user = {"customer": data.customer, "seller": data.seller}.get(spec["role"])
+        # A fresh instance per request, as authentication would give, so no
+        # relation cache carries over from the previous measurement.
+        self.client.force_authenticate(
+            user=User.objects.get(pk=user.pk) if user else None
+        )
+        url = reverse(name, kwargs=data.kwargs(spec.get("kwargs", {})))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {"page_size": LARGE})
+        self.assertLess(response.status_code, 400, f"{name}: {response.status_code}")
+        return len(queries)
+
+    def test_query_counts_stay_within_budget(self):
+        data = QueryBudgetData()
+        endpoints = {
+            name: spec for name, spec in self.budgets.items() if "skip" not in spec
+        }
+
+        data.grow(SMALL)
+        small = {name: self.measure(data, name, spec) for name, spec in endpoints.items()}
+        data.grow(LARGE - SMALL)
+        large = {name: self.measure(data, name, spec) for name, spec in endpoints.items()}
+
+        problems = []
+        for name, spec in endpoints.items():
+            if large[name] > small[name]:
+                problems.append(
+                    f"{name}: {small[name]} queries for {SMALL} row(s), "
+                    f"{large[name]} for {LARGE}"
+                )
+            if large[name] > spec["budget"]:
+                problems.append(
+                    f"{name}: {large[name]} queries, budget is {spec['budget']}"
+                )
+        self.assertEqual(problems, [], "\n".join(problems))
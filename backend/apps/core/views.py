@@ -0,0 +1,39 @@
+import asyncio
+from asgiref.sync import sync_to_async
+from rest_framework.views import APIView
+
+
+class AsyncAPIView(APIView):
+    """``APIView`` whose handlers are coroutines.
+
+    Authentication, permission and throttle checks and exception handling
+    touch the database and the cache, so they run in a worker thread. The
+    handler runs on the event loop: under ASGI, awaiting a payment gateway or
+    the cache does not hold a thread. Handlers wrap ORM work in
+    ``sync_to_async`` or use the async ORM methods. Under WSGI Django runs
+    the view in an event loop of its own, so nothing changes for clients.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(
+                    self, request.method.lower(), self.http_method_not_allowed
+                )
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            if asyncio.iscoroutine(response):
+                response = await response
+        except Exception as exc:
+            response = await sync_to_async(self.handle_exception)(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:26
+
+from decimal import Decimal
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+def backfill_snapshots(apps, schema_editor):
+    OrderItem = apps.get_model("orders", "OrderItem")
+    ProductImage = apps.get_model("products", "ProductImage")
+    cent = Decimal("0.01")
+    items = OrderItem._base_manager.select_related(
+        "store_item__product", "store_item__store"
+    ).filter(snapshot={})
+    for item in items.iterator(chunk_size=500):
+        store_item = item.store_item
+        product = store_item.product
+        image = ProductImage.objects.filter(product=product).order_by("pk").first()
+        discount = store_item.discount or Decimal("0")
+        item.snapshot = {
+            "product_id": product.pk,
+            "product_name": product.name,
+            "image_url": image.image.url if image and image.image else None,
+            "store_id": store_item.store_id,
+            "store_name": store_item.store.name,
+            "unit_price": item.price.quantize(cent),
+            "discount": discount.quantize(cent),
+            "discount_price": (
+                item.price * (Decimal("1") - discount / Decimal("100"))
+            ).quantize(cent),
+        }
+        item.save(update_fields=["snapshot"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_initial'),
+        ('products', '0001_initial'),
+        ('stores', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='snapshot',
+            field=models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder),
+        ),
+        migrations.RunPython(backfill_snapshots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+
+
+def backfill_store_orders(apps, schema_editor):
+    Order = apps.get_model("orders", "Order")
+    OrderItem = apps.get_model("orders", "OrderItem")
+    StoreOrder = apps.get_model("orders", "StoreOrder")
+    rows = (
+        OrderItem._base_manager.filter(is_deleted=False)
+        .values("order_id", "store_item__store_id", "order__status")
+        .annotate(subtotal=Sum("total_price"), items_count=Count("id"))
+        .order_by()
+    )
+    batch = []
+    for row in rows.iterator(chunk_size=1000):
+        batch.append(
+            StoreOrder(
+                order_id=row["order_id"],
+                store_id=row["store_item__store_id"],
+                status=row["order__status"],
+                subtotal=row["subtotal"],
+                items_count=row["items_count"],
+            )
+        )
+        if len(batch) >= 1000:
+            StoreOrder.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    StoreOrder.objects.bulk_create(batch, ignore_conflicts=True)
+    StoreOrder.objects.update(
+        created_at=Subquery(
+            Order._base_manager.filter(pk=OuterRef("order_id")).values("created_at")[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_orderitem_snapshot'),
+        ('stores', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoreOrder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('status', models.IntegerField(choices=[(1, 'PENDING'), (2, 'PROCESSING'), (3, 'DELIVERED'), (4, 'CANCELLED'), (5, 'FAILED')], default=1)),
+                ('subtotal', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('items_count', models.PositiveIntegerField(default=0)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='store_orders', to='orders.order')),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='store_orders', to='stores.store')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['store', '-created_at'], name='orders_stor_store_i_45190b_idx'), models.Index(fields=['store', 'status', '-created_at'], name='orders_stor_store_i_c33544_idx')],
+                'constraints': [models.UniqueConstraint(fields=('store', 'order'), name='unique_store_order')],
+            },
+        ),
+        migrations.RunPython(backfill_store_orders, migrations.RunPython.noop),
+    ]
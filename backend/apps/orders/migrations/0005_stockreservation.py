@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-19 15:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_storeorder'),
+        ('stores', '0004_storeitemimport'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('quantity', models.PositiveIntegerField()),
+                ('status', models.IntegerField(choices=[(1, 'HELD'), (2, 'COMMITTED'), (3, 'RELEASED')], default=1)),
+                ('expires_at', models.DateTimeField()),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='orders.order')),
+                ('store_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='stores.storeitem')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'expires_at'], name='orders_stoc_status_e8aa04_idx')],
+            },
+        ),
+    ]
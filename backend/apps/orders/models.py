@@ -1,7 +1,9 @@
+from decimal import Decimal
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
-from apps.core.models import SoftDeleteModel, HardDeleteManager
+from apps.core.models import BaseModel, SoftDeleteModel, HardDeleteManager
 from apps.addresses.models import Address
-from apps.stores.models import StoreItem
+from apps.stores.models import Store, StoreItem
 from django.conf import settings
 
 
@@ -24,6 +26,15 @@ class Order(SoftDeleteModel):
     )
     total_price = models.DecimalField(max_digits=10, decimal_places=2)
 
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        if not adding:
+            # The only place StoreOrder.status is kept in step: code changing
+            # the status with QuerySet.update() has to update the store
+            # orders too.
+            self.store_orders.exclude(status=self.status).update(status=self.status)  # type: ignore
+
     def delete(self, *args, **kwargs):
         for item in self.items.all():  # type: ignore
             item.delete()
@@ -50,10 +61,31 @@ class OrderItem(SoftDeleteModel):
     quantity = models.PositiveIntegerField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
     total_price = models.DecimalField(max_digits=10, decimal_places=2)
+    snapshot = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
 
     def __str__(self) -> str:
         return f"{self.order.customer} order item in order {self.order}"
 
+    @staticmethod
+    def build_snapshot(store_item):
+        """Freeze what the customer saw at checkout, so order history never
+        has to join back to the live (mutable, soft-deletable) catalog rows."""
+        product = store_item.product
+        # Sorted here rather than with order_by(), which would bypass the
+        # prefetched images; migration 0003 picks the lowest pk too.
+        images = sorted(product.images.all(), key=lambda image: image.pk)
+        cent = Decimal("0.01")
+        return {
+            "product_id": product.pk,
+            "product_name": product.name,
+            "image_url": images[0].image.url if images and images[0].image else None,
+            "store_id": store_item.store_id,
+            "store_name": store_item.store.name,
+            "unit_price": store_item.price.quantize(cent),
+            "discount": (store_item.discount or Decimal("0")).quantize(cent),
+            "discount_price": store_item.total_price.quantize(cent),
+        }
+
 
 class HardDeleteOrderItem(OrderItem):
     objects = HardDeleteManager()
@@ -62,3 +94,67 @@ class HardDeleteOrderItem(OrderItem):
         proxy = True
         verbose_name = "deleted Order item"
         verbose_name_plural = "deleted Order items"
+
+
+class StoreOrder(BaseModel):
+    """Per-store slice of an order, written at checkout so seller dashboards
+    can list, filter and total their orders without joining order items.
+    ``status`` mirrors the order's and is copied by ``Order.save()``."""
+
+    store = models.ForeignKey(
+        Store, on_delete=models.CASCADE, related_name="store_orders"
+    )
+    order = models.ForeignKey(
+        Order, on_delete=models.CASCADE, related_name="store_orders"
+    )
+    status = models.IntegerField(
+        choices=Order.OrderStatus.choices, default=Order.OrderStatus.PENDING
+    )
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2)
+    items_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["store", "order"], name="unique_store_order"
+            )
+        ]
+        indexes = [
+            models.Index(fields=["store", "-created_at"]),
+            models.Index(fields=["store", "status", "-created_at"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"order {self.order_id} in {self.store}"  # type: ignore
+
+
+class StockReservation(BaseModel):
+    """Stock of a store item held for a pending order.
+
+    The quantity is taken out of ``StoreItem.stock`` when the hold is made.
+    A paid order commits its holds; a failed, cancelled or expired one
+    releases them and the stock goes back on sale.
+    """
+
+    class ReservationStatus(models.IntegerChoices):
+        HELD = 1, "HELD"
+        COMMITTED = 2, "COMMITTED"
+        RELEASED = 3, "RELEASED"
+
+    order = models.ForeignKey(
+        Order, on_delete=models.CASCADE, related_name="reservations"
+    )
+    store_item = models.ForeignKey(
+        StoreItem, on_delete=models.CASCADE, related_name="reservations"
+    )
+    quantity = models.PositiveIntegerField()
+    status = models.IntegerField(
+        choices=ReservationStatus.choices, default=ReservationStatus.HELD
+    )
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "expires_at"])]
+
+    def __str__(self) -> str:
+        return f"{self.quantity} x {self.store_item_id} held for order {self.order_id}"  # type: ignore
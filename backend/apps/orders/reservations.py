@@ -0,0 +1,129 @@
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from apps.orders.models import Order, StockReservation
+from apps.stores.models import StoreItem
+
+logger = logging.getLogger(__name__)
+
+HELD = StockReservation.ReservationStatus.HELD
+
+
+class OutOfStock(Exception):
+    def __init__(self, store_item):
+        super().__init__(f"Not enough stock for {store_item.product.name}")
+        self.store_item = store_item
+
+
+def take_stock(store_item_id, quantity):
+    """Take ``quantity`` out of stock if that much is left, in one
+    conditional UPDATE, so concurrent checkouts can never oversell.
+
+    Stock moves with every checkout, so it does not invalidate the catalog
+    cache; cached responses show it once they expire.
+    """
+    return bool(
+        StoreItem.objects.filter(pk=store_item_id, stock__gte=quantity).update(
+            stock=F("stock") - quantity
+        )
+    )
+
+
+def give_back_stock(store_item_id, quantity):
+    StoreItem.objects.filter(pk=store_item_id).update(stock=F("stock") + quantity)
+
+
+def reserve_stock(order, items):
+    """Hold ``(store_item, quantity)`` pairs for ``order`` for
+    ``STOCK_RESERVATION_TTL`` seconds.
+
+    Must run inside the transaction creating the order: ``OutOfStock`` is
+    raised on the first item that cannot be covered and the rollback gives
+    back what was already taken.
+    """
+    expires_at = timezone.now() + timedelta(seconds=settings.STOCK_RESERVATION_TTL)
+    # A fixed locking order keeps two checkouts of the same items from
+    # deadlocking.
+    items = sorted(items, key=lambda pair: pair[0].pk)
+    for store_item, quantity in items:
+        if not take_stock(store_item.pk, quantity):
+            raise OutOfStock(store_item)
+    StockReservation.objects.bulk_create(
+        [
+            StockReservation(
+                order=order,
+                store_item=store_item,
+                quantity=quantity,
+                expires_at=expires_at,
+            )
+            for store_item, quantity in items
+        ]
+    )
+
+
+def release_order(order, status=Order.OrderStatus.FAILED):
+    """Give the held stock of a pending ``order`` back and move the order to
+    ``status``. Returns ``False`` when the order was no longer pending, e.g.
+    because its payment was verified first."""
+    with transaction.atomic():
+        locked = Order.objects.select_for_update().get(pk=order.pk)
+        if locked.status != Order.OrderStatus.PENDING:
+            return False
+        held = list(locked.reservations.filter(status=HELD))  # type: ignore
+        if held:
+            for reservation in held:
+                give_back_stock(reservation.store_item_id, reservation.quantity)
+            StockReservation.objects.filter(
+                pk__in=[reservation.pk for reservation in held]
+            ).update(status=StockReservation.ReservationStatus.RELEASED)
+        elif not locked.reservations.exists():  # type: ignore
+            # Orders placed before reservations took their stock directly.
+            for item in locked.items.all():  # type: ignore
+                give_back_stock(item.store_item_id, item.quantity)
+        locked.status = order.status = status
+        locked.save()
+    return True
+
+
+def commit_order(order):
+    """Keep the stock of a paid ``order`` for good.
+
+    Holds the sweeper released because the payment came back late are taken
+    again; stock that was sold in the meantime is logged for the seller.
+    """
+    with transaction.atomic():
+        # Waits for a sweeper releasing the same order.
+        Order.objects.select_for_update().get(pk=order.pk)
+        reservations = order.reservations.exclude(  # type: ignore
+            status=StockReservation.ReservationStatus.COMMITTED
+        )
+        for reservation in reservations:
+            if reservation.status == HELD:
+                continue
+            if not take_stock(reservation.store_item_id, reservation.quantity):
+                logger.warning(
+                    "Order %s was paid after its hold expired; store item %s "
+                    "is short of %s unit(s)",
+                    order.pk,
+                    reservation.store_item_id,
+                    reservation.quantity,
+                )
+        reservations.update(status=StockReservation.ReservationStatus.COMMITTED)
+
+
+def release_expired_reservations(batch_size=500):
+    """Release the orders whose holds expired. Returns the released orders."""
+    order_ids = (
+        StockReservation.objects.filter(status=HELD, expires_at__lte=timezone.now())
+        .order_by()
+        .values_list("order_id", flat=True)
+        .distinct()[:batch_size]
+    )
+    return [
+        order
+        for order in Order.objects.filter(pk__in=list(order_ids))
+        if release_order(order)
+    ]
@@ -1,19 +1,35 @@
 from rest_framework import serializers
-from apps.orders.models import Order, OrderItem
+from apps.orders.models import Order, OrderItem, StoreOrder
 from apps.addresses.serializers import AddressReadSerializer
-from apps.stores.serializers import StoreItemReadSerializer
 from apps.users.serializers_base import UserSimpleSerializer
-from apps.products.serializers import ProductReadSerializer
 
 
 class OrderItemReadSerializer(serializers.ModelSerializer):
-    store_item = StoreItemReadSerializer(read_only=True)
+    store_item = serializers.SerializerMethodField()
 
     class Meta:
         model = OrderItem
         fields = ["id", "store_item", "quantity", "price", "total_price"]
         read_only_fields = fields
 
+    def get_store_item(self, obj):
+        snapshot = obj.snapshot
+        return {
+            "id": obj.store_item_id,
+            "store": {
+                "id": snapshot.get("store_id"),
+                "name": snapshot.get("store_name"),
+            },
+            "product": {
+                "id": snapshot.get("product_id"),
+                "name": snapshot.get("product_name"),
+                "image_url": snapshot.get("image_url"),
+            },
+            "price": snapshot.get("unit_price"),
+            "discount": snapshot.get("discount"),
+            "total_price": snapshot.get("discount_price"),
+        }
+
 
 class OrderReadSerializer(serializers.ModelSerializer):
     customer = UserSimpleSerializer(read_only=True)
@@ -46,14 +62,23 @@ class OrderReadSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
     def get_products(self, obj):
-        products = [item.store_item.product for item in obj.items.all()]
-        serializer = ProductReadSerializer(products, many=True, context=self.context)
-        return serializer.data
+        return [
+            {
+                "id": item.snapshot.get("product_id"),
+                "name": item.snapshot.get("product_name"),
+                "image_url": item.snapshot.get("image_url"),
+            }
+            for item in obj.items.all()
+        ]
 
     def get_store(self, obj):
-        store = [item.store_item.store for item in obj.items.all()]
-        serializer = StoreItemReadSerializer(store)
-        return serializer.data
+        stores = {}
+        for item in obj.items.all():
+            store_id = item.snapshot.get("store_id")
+            stores.setdefault(
+                store_id, {"id": store_id, "name": item.snapshot.get("store_name")}
+            )
+        return list(stores.values())
 
 
 class OrderWriteSerializer(serializers.ModelSerializer):
@@ -68,3 +93,12 @@ class OrderStatusSerializer(serializers.ModelSerializer):
     class Meta:
         model = Order
         fields = ["status"]
+
+
+class StoreOrderReadSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source="order_id", read_only=True)
+
+    class Meta:
+        model = StoreOrder
+        fields = ["id", "status", "subtotal", "items_count", "created_at", "updated_at"]
+        read_only_fields = fields
@@ -0,0 +1,12 @@
+from celery import shared_task
+from apps.orders.reservations import release_expired_reservations
+from apps.payments.models import Payment
+
+
+@shared_task
+def release_expired_reservations_task():
+    released = release_expired_reservations()
+    Payment.objects.filter(
+        order__in=released, status=Payment.PaymentStatus.PROGRESS
+    ).update(status=Payment.PaymentStatus.FAILED)
+    return f"released {len(released)} order(s)"
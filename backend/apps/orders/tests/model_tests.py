@@ -0,0 +1,244 @@
+from datetime import timedelta
+from unittest import mock
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Prefetch
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from apps.core.response_cache import catalog_version
+from apps.users.models import User
+from apps.categories.models import Category
+from apps.products.models import Product, ProductImage
+from apps.stores.models import Store, StoreItem
+from apps.addresses.models import Address
+from apps.orders.models import Order, OrderItem, StoreOrder, StockReservation
+from apps.orders.reservations import (
+    OutOfStock,
+    commit_order,
+    release_order,
+    reserve_stock,
+)
+from apps.orders.serializers import OrderReadSerializer
+from apps.orders.tasks import release_expired_reservations_task
+from apps.payments.models import Payment
+from apps.payments.views import finish_payment
+from apps.products import popularity
+from apps.stores.views import filter_store_orders
+
+
+class OrderTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(  # type: ignore
+            email="buyer@example.com", password="TestPass123", phone="09120000000"
+        )
+        category = Category.objects.create(name="Phones", description="Phones")
+        self.product = Product.objects.create(
+            name="Phone X", description="A phone", category=category
+        )
+        self.store = Store.objects.create(
+            seller=self.user, name="Phone Store", description="Store"
+        )
+        self.store_item = StoreItem.objects.create(
+            store=self.store,
+            product=self.product,
+            price=Decimal("100.00"),
+            discount=Decimal("10.00"),
+            stock=5,
+        )
+        address = Address.objects.create(
+            user=self.user,
+            label="Home",
+            city="Tehran",
+            state="Tehran",
+            postal_code="12345",
+            country="Iran",
+        )
+        self.order = Order.objects.create(
+            customer=self.user, address=address, total_price=Decimal("90.00")
+        )
+        self.order_item = OrderItem.objects.create(
+            order=self.order,
+            store_item=self.store_item,
+            quantity=1,
+            price=self.store_item.price,
+            total_price=self.store_item.total_price,
+            snapshot=OrderItem.build_snapshot(self.store_item),
+        )
+
+
+
+class OrderModelTest(OrderTestCase):
+    def test_build_snapshot(self):
+        self.order_item.refresh_from_db()
+        snapshot = self.order_item.snapshot
+        self.assertEqual(snapshot["product_name"], "Phone X")
+        self.assertEqual(snapshot["store_name"], "Phone Store")
+        self.assertEqual(snapshot["unit_price"], "100.00")
+        self.assertEqual(snapshot["discount_price"], "90.00")
+        self.assertIsNone(snapshot["image_url"])
+
+    def test_snapshot_uses_the_first_image(self):
+        ProductImage.objects.bulk_create(
+            [
+                ProductImage(product=self.product, image="products/first.jpg"),
+                ProductImage(product=self.product, image="products/second.jpg"),
+            ]
+        )
+        store_item = StoreItem.objects.prefetch_related(
+            Prefetch("product__images", ProductImage.objects.order_by("-pk"))
+        ).get(pk=self.store_item.pk)
+        snapshot = OrderItem.build_snapshot(store_item)
+        self.assertTrue(snapshot["image_url"].endswith("products/first.jpg"))
+
+    def test_order_read_survives_catalog_changes(self):
+        self.product.name = "Renamed"
+        self.product.save()
+        self.store_item.price = Decimal("500.00")
+        self.store_item.save()
+        self.store_item.delete()
+
+        order = Order.objects.prefetch_related("items").get(pk=self.order.pk)
+        data = OrderReadSerializer(order).data
+        item = data["items"][0]
+        self.assertEqual(item["store_item"]["product"]["name"], "Phone X")
+        self.assertEqual(item["store_item"]["price"], "100.00")
+        self.assertEqual(data["store"], [{"id": self.store.pk, "name": "Phone Store"}])
+
+    def test_order_read_queries_do_not_touch_catalog(self):
+        order = (
+            Order.objects.select_related("customer", "address")
+            .prefetch_related("items")
+            .get(pk=self.order.pk)
+        )
+        with self.assertNumQueries(0):
+            OrderReadSerializer(order).data
+
+    def test_status_change_is_mirrored_on_store_orders(self):
+        store_order = StoreOrder.objects.create(
+            store=self.store, order=self.order, subtotal=Decimal("90.00"), items_count=1
+        )
+        self.order.status = Order.OrderStatus.PROCESSING
+        self.order.save()
+        store_order.refresh_from_db()
+        self.assertEqual(store_order.status, Order.OrderStatus.PROCESSING)
+
+    def test_store_order_search_matches_name_and_description(self):
+        StoreOrder.objects.create(
+            store=self.store, order=self.order, subtotal=Decimal("90.00"), items_count=1
+        )
+        store_orders = StoreOrder.objects.filter(store=self.store)
+        for term, found in [("phone x", 1), ("a phone", 1), ("tablet", 0)]:
+            self.assertEqual(
+                filter_store_orders(store_orders, {"search": term}).count(),
+                found,
+                term,
+            )
+
+
+class StockReservationTest(OrderTestCase):
+    def reserve(self, quantity):
+        reserve_stock(self.order, [(self.store_item, quantity)])
+        self.store_item.refresh_from_db()
+
+    def test_reserving_takes_stock_atomically(self):
+        self.reserve(3)
+        self.assertEqual(self.store_item.stock, 2)
+        reservation = self.order.reservations.get()  # type: ignore
+        self.assertEqual(reservation.status, StockReservation.ReservationStatus.HELD)
+
+        with self.assertRaises(OutOfStock):
+            with transaction.atomic():
+                reserve_stock(self.order, [(self.store_item, 3)])
+        self.store_item.refresh_from_db()
+        self.assertEqual(self.store_item.stock, 2)
+
+    def test_release_gives_stock_back_once(self):
+        version = catalog_version()
+        self.reserve(3)
+        self.assertTrue(release_order(self.order, Order.OrderStatus.CANCELLED))
+        self.assertFalse(release_order(self.order))
+        self.store_item.refresh_from_db()
+        self.assertEqual(self.store_item.stock, 5)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, Order.OrderStatus.CANCELLED)
+        # Checkouts and releases leave the cached catalog alone.
+        self.assertEqual(catalog_version(), version)
+
+    def test_sweeper_releases_expired_holds(self):
+        self.reserve(3)
+        payment = Payment.objects.create(
+            order=self.order, transaction_id="A1", amount=Decimal("90.00")
+        )
+        release_expired_reservations_task()
+        self.store_item.refresh_from_db()
+        self.assertEqual(self.store_item.stock, 2)
+
+        StockReservation.objects.update(
+            expires_at=timezone.now() - timedelta(seconds=1)
+        )
+        release_expired_reservations_task()
+        self.store_item.refresh_from_db()
+        self.assertEqual(self.store_item.stock, 5)
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, Payment.PaymentStatus.FAILED)
+
+    def test_late_payment_takes_released_stock_again(self):
+        self.reserve(3)
+        release_order(self.order)
+        commit_order(self.order)
+        self.store_item.refresh_from_db()
+        self.assertEqual(self.store_item.stock, 2)
+        self.assertFalse(
+            self.order.reservations.exclude(  # type: ignore
+                status=StockReservation.ReservationStatus.COMMITTED
+            ).exists()
+        )
+
+    def test_replayed_payment_callback_is_applied_once(self):
+        popularity.local_backend.counts.clear()
+        self.reserve(1)
+        payment = Payment.objects.select_related("order__customer").get(
+            pk=Payment.objects.create(
+                order=self.order, transaction_id="A1", amount=Decimal("90.00")
+            ).pk
+        )
+        with mock.patch("apps.payments.views.send_payment_success_email") as email:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertTrue(finish_payment(payment, succeeded=True))
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertFalse(finish_payment(payment, succeeded=True))
+                self.assertFalse(finish_payment(payment, succeeded=False))
+        self.assertEqual(email.delay.call_count, 1)
+        self.assertEqual(
+            popularity.local_backend.counts["purchase_count"], {self.product.pk: 1}
+        )
+        self.store_item.refresh_from_db()
+        self.assertEqual(self.store_item.stock, 4)
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, Payment.PaymentStatus.DONE)
+
+    def test_cancelled_order_is_not_revived_by_a_late_payment(self):
+        self.reserve(3)
+        payment = Payment.objects.create(
+            order=self.order, transaction_id="A1", amount=Decimal("90.00")
+        )
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        response = client.delete(
+            reverse("user_order_detail", kwargs={"pk": self.order.pk})
+        )
+        self.assertEqual(response.status_code, 204)
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, Payment.PaymentStatus.FAILED)
+
+        payment = Payment.objects.select_related("order__customer").get(pk=payment.pk)
+        with mock.patch("apps.payments.views.send_payment_success_email") as email:
+            with self.assertLogs("apps.payments.views", "WARNING"):
+                self.assertFalse(finish_payment(payment, succeeded=True))
+        email.delay.assert_not_called()
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, Order.OrderStatus.CANCELLED)
+        self.store_item.refresh_from_db()
+        self.assertEqual(self.store_item.stock, 5)
@@ -1,26 +1,44 @@
+import logging
 from random import randint
-import requests
+from asgiref.sync import sync_to_async
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
 from rest_framework.pagination import PageNumberPagination
 from .serializers import OrderReadSerializer, OrderWriteSerializer
-from apps.orders.models import Order, OrderItem
+from apps.orders.models import Order, OrderItem, StoreOrder
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from apps.addresses.models import Address
 from django.db import transaction
-from django.conf import settings
-import json
 from apps.payments.models import Payment
+from apps.payments.gateway import PaymentGatewayError, get_payment_gateway
 from apps.payments.serializers import PaymentReadSerializer
+from apps.core.views import AsyncAPIView
+from apps.cart.storage import persist_cart
+from apps.orders.reservations import OutOfStock, release_order, reserve_stock
+
+logger = logging.getLogger(__name__)
 
 ORDER_ITEM_READ_SCHEMA = openapi.Schema(
     type=openapi.TYPE_OBJECT,
     properties={
         "id": openapi.Schema(type=openapi.TYPE_INTEGER, example=1),
-        "store_item": openapi.Schema(type=openapi.TYPE_INTEGER, example=5),
+        "store_item": openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            description="Snapshot of the store item taken at checkout",
+            properties={
+                "id": openapi.Schema(type=openapi.TYPE_INTEGER, example=5),
+                "store": openapi.Schema(type=openapi.TYPE_OBJECT),
+                "product": openapi.Schema(type=openapi.TYPE_OBJECT),
+                "price": openapi.Schema(type=openapi.TYPE_STRING, example="12.50"),
+                "discount": openapi.Schema(type=openapi.TYPE_STRING, example="20.00"),
+                "total_price": openapi.Schema(
+                    type=openapi.TYPE_STRING, example="10.00"
+                ),
+            },
+        ),
         "quantity": openapi.Schema(type=openapi.TYPE_INTEGER, example=2),
         "price": openapi.Schema(
             type=openapi.TYPE_NUMBER, format="float", example=10.00
@@ -112,6 +130,7 @@ PAGINATED_ORDER_RESPONSE = openapi.Response(
 
 class OrderListView(APIView):
     permission_classes = [IsAuthenticated]
+    read_replica = True
 
     @swagger_auto_schema(
         operation_summary="All Orders",
@@ -136,7 +155,12 @@ class OrderListView(APIView):
         ],
     )
     def get(self, request):
-        orders = Order.objects.filter(customer=request.user).order_by("-id")
+        orders = (
+            Order.objects.filter(customer=request.user)
+            .select_related("customer", "address")
+            .prefetch_related("items")
+            .order_by("-id")
+        )
         search_term = request.query_params.get("status", "")
         if search_term:
             try:
@@ -160,6 +184,7 @@ class OrderListView(APIView):
 
 class OrderDetailView(APIView):
     permission_classes = [IsAuthenticated]
+    read_replica = True
 
     @swagger_auto_schema(
         operation_summary="An Order",
@@ -177,7 +202,11 @@ class OrderDetailView(APIView):
     )
     def get(self, request, pk):
         try:
-            order = Order.objects.get(pk=pk, customer=request.user)
+            order = (
+                Order.objects.select_related("customer", "address")
+                .prefetch_related("items")
+                .get(pk=pk, customer=request.user)
+            )
         except Order.DoesNotExist:
             return Response(
                 {"message": "no such order for you"}, status=status.HTTP_400_BAD_REQUEST
@@ -211,15 +240,117 @@ class OrderDetailView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
         with transaction.atomic():
-            for item in order.items.all():  # type: ignore
-                item.store_item.stock += item.quantity
-                item.store_item.save()
-            order.status = Order.OrderStatus.CANCELLED
-            order.save()
+            if release_order(order, Order.OrderStatus.CANCELLED):
+                # A verify callback arriving later must not take the stock
+                # again or revive the order.
+                Payment.objects.filter(
+                    order=order, status=Payment.PaymentStatus.PROGRESS
+                ).update(status=Payment.PaymentStatus.FAILED)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class CreateUserOrder(APIView):
+class CheckoutError(Exception):
+    def __init__(self, message, status_code=status.HTTP_400_BAD_REQUEST):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def create_pending_order(user, address_id, gateway_name):
+    """Turn ``user``'s cart into an order with a payment waiting for the
+    gateway, holding its items' stock. Returns the payment."""
+    try:
+        address = Address.objects.get(id=address_id, user=user)
+    except Address.DoesNotExist:
+        raise CheckoutError("Address not found.", status.HTTP_404_NOT_FOUND)
+
+    persist_cart(user)
+    cart_items = list(
+        user.cart.items.select_related("store_item__product", "store_item__store")
+        .prefetch_related("store_item__product__images")
+        .all()
+    )
+    if not cart_items:
+        raise CheckoutError("Your cart is empty.")
+
+    with transaction.atomic():
+        total_order_price = sum(
+            item.quantity * item.store_item.total_price for item in cart_items
+        )
+        order = Order.objects.create(
+            customer=user,
+            address=address,
+            total_price=total_order_price,
+            status=Order.OrderStatus.PENDING,
+        )
+
+        store_totals = {}
+        for item in cart_items:
+            store_id = item.store_item.store_id
+            subtotal, count = store_totals.get(store_id, (0, 0))
+            store_totals[store_id] = (
+                subtotal + item.quantity * item.store_item.total_price,
+                count + 1,
+            )
+            OrderItem.objects.create(
+                order=order,
+                store_item=item.store_item,
+                quantity=item.quantity,
+                price=item.store_item.price,
+                total_price=item.quantity * item.store_item.total_price,
+                snapshot=OrderItem.build_snapshot(item.store_item),
+            )
+        try:
+            reserve_stock(
+                order, [(item.store_item, item.quantity) for item in cart_items]
+            )
+        except OutOfStock as e:
+            raise CheckoutError(str(e))
+
+        StoreOrder.objects.bulk_create(
+            [
+                StoreOrder(
+                    store_id=store_id,
+                    order=order,
+                    status=order.status,
+                    subtotal=subtotal,
+                    items_count=count,
+                )
+                for store_id, (subtotal, count) in store_totals.items()
+            ]
+        )
+
+        transaction_id = str(randint(100000, 999999))
+        payment, created = Payment.objects.get_or_create(
+            order=order,
+            defaults={
+                "transaction_id": transaction_id,
+                "amount": order.total_price,
+                "gateway": gateway_name,
+            },
+        )
+        if not created:
+            payment.transaction_id = transaction_id
+            payment.amount = order.total_price
+            payment.gateway = gateway_name
+            payment.save()
+    return payment
+
+
+def fail_pending_order(payment):
+    """Give the stock held for an order the gateway refused back and mark the
+    order and its payment failed."""
+    with transaction.atomic():
+        release_order(payment.order)
+        payment.status = Payment.PaymentStatus.FAILED
+        payment.save()
+
+
+def serialize_payment(payment):
+    return PaymentReadSerializer(payment).data
+
+
+class CreateUserOrder(AsyncAPIView):
     permission_classes = [IsAuthenticated]
 
     @swagger_auto_schema(
@@ -243,125 +374,45 @@ class CreateUserOrder(APIView):
             ),
         },
     )
-    def post(self, request):
+    async def post(self, request):
         serializer = OrderWriteSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+        gateway = get_payment_gateway()
         try:
-            address = Address.objects.get(
-                id=serializer.validated_data["address_id"],  # type: ignore
-                user=request.user,
-            )
-        except Address.DoesNotExist:
-            return Response(
-                {"message": "Address not found."}, status=status.HTTP_404_NOT_FOUND
-            )
-
-        user_cart = request.user.cart
-        cart_items = user_cart.items.select_related("store_item").all()
-        if not cart_items:
-            return Response(
-                {"message": "Your cart is empty."}, status=status.HTTP_400_BAD_REQUEST
+            payment = await sync_to_async(create_pending_order)(
+                request.user, serializer.validated_data["address_id"], gateway.name  # type: ignore
             )
-
-        try:
-            with transaction.atomic():
-                for item in cart_items:
-                    if item.quantity > item.store_item.stock:
-                        return Response(
-                            {
-                                "message": f"Not enough stock for {item.store_item.product.name}"
-                            },
-                            status=status.HTTP_400_BAD_REQUEST,
-                        )
-
-                total_order_price = sum(
-                    item.quantity * item.store_item.total_price for item in cart_items
-                )
-                order = Order.objects.create(
-                    customer=request.user,
-                    address=address,
-                    total_price=total_order_price,
-                    status=Order.OrderStatus.PENDING,
-                )
-
-                for item in cart_items:
-                    OrderItem.objects.create(
-                        order=order,
-                        store_item=item.store_item,
-                        quantity=item.quantity,
-                        price=item.store_item.price,
-                        total_price=item.quantity * item.store_item.total_price,
-                    )
-                    item.store_item.stock -= item.quantity
-                    item.store_item.save()
-
-                transaction_id = str(randint(100000, 999999))
-
-                payment, created = Payment.objects.get_or_create(
-                    order=order,
-                    defaults={
-                        "transaction_id": transaction_id,
-                        "amount": order.total_price,
-                        "gateway": "ZarinPal",
-                    },
-                )
-
-                if not created:
-                    payment.transaction_id = transaction_id
-                    payment.amount = order.total_price
-                    payment.gateway = "ZarinPal"
-                    payment.save()
-
-                payload = {
-                    "merchant_id": settings.ZARINPAL_MERCHANT_ID,
-                    "amount": int(payment.amount * 10),
-                    "description": f"Order #{order.pk}",
-                    "callback_url": settings.ZARINPAL_CALLBACK,
-                    "metadata": {
-                        "mobile": str(request.user.phone) or "",
-                        "email": request.user.email or "",
-                    },
-                }
-                headers = {"Content-Type": "application/json"}
-                response = requests.post(
-                    settings.ZARINPAL_REQUEST_URL,
-                    json=payload,
-                    headers=headers,
-                    timeout=10,
-                )
-
-                if not response.text.strip():
-                    return Response(
-                        {"message": "Empty response from payment gateway"}, status=500
-                    )
-                try:
-                    res = response.json()
-                except json.JSONDecodeError:
-                    return Response(
-                        {
-                            "message": f"Invalid response from payment gateway: {response.text}"
-                        },
-                        status=500,
-                    )
-
-                if res.get("data", {}).get("code") == 100:
-                    authority = res["data"]["authority"]
-                    payment.transaction_id = authority
-                    payment.status = Payment.PaymentStatus.PROGRESS
-                    payment.save()
-                    payment_url = f"{settings.ZARINPAL_STARTPAY}{authority}"
-                else:
-                    return Response({"message": "Payment gateway error"}, status=400)
-
+        except CheckoutError as e:
+            return Response({"message": e.message}, status=e.status_code)
         except Exception as e:
-            import traceback
-
-            traceback.print_exc()
+            logger.exception("Checkout failed")
             return Response({"message": f"Error happened: {str(e)}"}, status=500)
 
-        payment_serializer = PaymentReadSerializer(payment)
-        data = payment_serializer.data
-        data["payment_url"] = payment_url  # type: ignore
+        # The gateway is called outside the order's transaction, so no rows
+        # stay locked while it answers.
+        try:
+            res = await gateway.request_payment(
+                amount=int(payment.amount * 10),
+                description=f"Order #{payment.order_id}",
+                mobile=str(request.user.phone) or "",
+                email=request.user.email or "",
+            )
+        except PaymentGatewayError as e:
+            await sync_to_async(fail_pending_order)(payment)
+            return Response({"message": str(e)}, status=500)
+
+        if res.get("data", {}).get("code") != 100:
+            await sync_to_async(fail_pending_order)(payment)
+            return Response({"message": "Payment gateway error"}, status=400)
+
+        authority = res["data"]["authority"]
+        payment.transaction_id = authority
+        payment.status = Payment.PaymentStatus.PROGRESS
+        await payment.asave()
+
+        # The order's items are read from the database while serializing.
+        data = await sync_to_async(serialize_payment)(payment)
+        data["payment_url"] = gateway.start_url(authority)  # type: ignore
         return Response(data, status=status.HTTP_201_CREATED)
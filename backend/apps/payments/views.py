@@ -1,3 +1,5 @@
+import logging
+from asgiref.sync import sync_to_async
 from django.http import HttpResponse
 from rest_framework.response import Response
 from rest_framework import status
@@ -5,13 +7,18 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.views import APIView
 from apps.payments.models import Payment
 from .serializers import PaymentReadSerializer
-from django.conf import settings
-import requests
+from .gateway import get_payment_gateway
 from .tasks import send_payment_success_email
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from django.db import transaction
 from apps.orders.models import Order
+from apps.cart.storage import clear_cart
+from apps.orders.reservations import commit_order, release_order
+from apps.products.popularity import record_purchases
+from apps.core.views import AsyncAPIView
+
+logger = logging.getLogger(__name__)
 
 
 PAYMENT_READ_SCHEMA = openapi.Schema(
@@ -83,67 +90,94 @@ class PaymentList(APIView):
         },
     )
     def get(self, request):
-        payments = Payment.objects.filter(order__customer=request.user)
+        payments = (
+            Payment.objects.filter(order__customer=request.user)
+            .select_related("order__customer", "order__address")
+            .prefetch_related("order__items")
+        )
         serializer = PaymentReadSerializer(payments, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class ZarinPalResultPayment(APIView):
+def finish_payment(payment, succeeded):
+    """Record the gateway's verdict on ``payment`` and its order. A paid order
+    keeps its stock and empties the customer's cart; a failed one gives its
+    stock back.
+
+    The callback is a public GET that can be reloaded or replayed, and
+    ZarinPal answers 101 for a payment verified before: a payment that is
+    already DONE is left alone. A cancelled order is never revived. Returns
+    whether this call marked the payment paid.
+    """
+    with transaction.atomic():
+        # The order is locked first, like OrderDetailView.delete does.
+        order_status = (
+            Order.objects.select_for_update()
+            .values_list("status", flat=True)
+            .get(pk=payment.order_id)
+        )
+        locked = Payment.objects.select_for_update().get(pk=payment.pk)
+        if locked.status == Payment.PaymentStatus.DONE:
+            payment.status = locked.status
+            return False
+        if succeeded and order_status == Order.OrderStatus.CANCELLED:
+            # The customer cancelled before paying and the stock was given
+            # back; the money has to be refunded by hand.
+            logger.warning(
+                "Payment %s was verified for cancelled order %s",
+                payment.pk,
+                payment.order_id,
+            )
+            succeeded = False
+        if succeeded:
+            commit_order(payment.order)
+            locked.status = Payment.PaymentStatus.DONE
+            payment.order.status = Order.OrderStatus.PROCESSING
+            payment.order.save()
+            clear_cart(payment.order.customer)
+            record_purchases(payment.order)
+        else:
+            release_order(payment.order)
+            locked.status = Payment.PaymentStatus.FAILED
+        locked.save()
+        payment.status = locked.status
+    if succeeded:
+        send_payment_success_email.delay(payment.order.customer.email, payment.order.pk)
+    return succeeded
+
+
+class ZarinPalResultPayment(AsyncAPIView):
     permission_classes = [AllowAny]
 
-    def get(self, request):
+    async def get(self, request):
         authority = request.GET.get("Authority")
         status_param = request.GET.get("Status")
         FRONTEND_URL = "http://localhost:8080/profile/orders"
 
         try:
-            payment = Payment.objects.get(transaction_id=authority)
+            payment = await Payment.objects.select_related(
+                "order__customer"
+            ).aget(transaction_id=authority)
         except Payment.DoesNotExist:
             return HttpResponse("<h1>Payment not found</h1>", status=404)
 
         if status_param == "OK":
-            payload = {
-                "merchant_id": settings.ZARINPAL_MERCHANT_ID,
-                "authority": payment.transaction_id,
-                "amount": int(payment.amount * 10),
-            }
             try:
-                res = requests.post(
-                    settings.ZARINPAL_VERIFY_URL,
-                    json=payload,
-                    timeout=int(settings.OTP_TIME),
+                res_json = await get_payment_gateway().verify_payment(
+                    payment.transaction_id, int(payment.amount * 10)
                 )
-                res.raise_for_status()
-                res_json = res.json()
 
                 if res_json.get("data", {}).get("code") in [100, 101]:
-                    with transaction.atomic():
-                        payment.status = Payment.PaymentStatus.DONE
-                        payment.order.status = Order.OrderStatus.PROCESSING
-                        payment.save()
-                        payment.order.save()
-                        user_cart = payment.order.customer.cart
-                        user_cart.items.all().delete()
-                    send_payment_success_email.delay(
-                        payment.order.customer.email, payment.order.pk
-                    )
+                    await sync_to_async(finish_payment)(payment, succeeded=True)
                     message = "Payment successful. Verification complete."
                 else:
-                    with transaction.atomic():
-                        payment.status = Payment.PaymentStatus.FAILED
-                        payment.order.status = Order.OrderStatus.FAILED
-                        payment.save()
-                        payment.order.save()
+                    await sync_to_async(finish_payment)(payment, succeeded=False)
                     message = "Payment failed during verification."
             except Exception as e:
                 message = f"Error verifying payment: {e}"
 
         else:
-            with transaction.atomic():
-                payment.status = Payment.PaymentStatus.FAILED
-                payment.order.status = Order.OrderStatus.FAILED
-                payment.save()
-                payment.order.save()
+            await sync_to_async(finish_payment)(payment, succeeded=False)
             message = "Payment cancelled or failed."
 
         html = f"""
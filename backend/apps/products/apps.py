@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class ProductsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.products'
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+        from apps.categories.models import Category
+        from apps.products.models import Product
+        from apps.products.suggest import track_deleted, track_saved
+
+        for model in (Product, Category):
+            post_save.connect(track_saved, sender=model, weak=False)
+            post_delete.connect(track_deleted, sender=model, weak=False)
@@ -0,0 +1,273 @@
+import hashlib
+import json
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import (
+    Case,
+    Count,
+    Exists,
+    F,
+    IntegerField,
+    OuterRef,
+    Q,
+    Value,
+    When,
+)
+from django.db.models.functions import Floor
+from apps.categories.models import Category
+from apps.core.response_cache import catalog_version
+from apps.stores.models import StoreItem
+from apps.stores.pricing import best_price_subquery
+
+CATEGORY_TREE_KEY = "catalog:{version}:category-tree"
+FACETS_KEY = "catalog:{version}:facets:{digest}"
+FACET_HITS_KEY = "facets:hits:{digest}"
+CATEGORY_TREE_TIMEOUT = 3600
+# Window in which the requests for a filter combination are counted.
+FACET_HITS_WINDOW = 3600
+# Query params that narrow the product set, in the order they are applied.
+FILTER_PARAMS = (
+    "name",
+    "category",
+    "store",
+    "in_stock",
+    "min_rating",
+    "min_price",
+    "max_price",
+)
+RATING_FACETS = (4, 3, 2, 1)
+STORE_FACET_SIZE = 20
+
+PRICE_ORDERINGS = {
+    "price": F("price_from").asc(nulls_last=True),
+    "-price": F("price_from").desc(nulls_last=True),
+}
+# Backed by the partial indexes on the popularity counters of ``Product``.
+POPULARITY_ORDERINGS = {
+    "most_viewed": ("-view_count", "-id"),
+    "best_selling": ("-purchase_count", "-id"),
+}
+
+
+def parse_number(value):
+    """``value`` as a ``Decimal``, or ``None`` when it is missing or not a
+    finite number ("NaN" and "Infinity" parse but the ORM rejects them)."""
+    try:
+        number = Decimal(value) if value else None
+    except InvalidOperation:
+        return None
+    return number if number is not None and number.is_finite() else None
+
+
+def parse_ids(value):
+    """Ids of a comma separated query param; anything else is ignored."""
+    return [int(part) for part in (value or "").split(",") if part.strip().isdigit()]
+
+
+def on_sale(**filters):
+    """Store items of the product at ``OuterRef("pk")`` that can be bought."""
+    return StoreItem.objects.filter(
+        product=OuterRef("pk"), is_active=True, stock__gt=0, **filters
+    )
+
+
+def category_tree():
+    """``{id: (name, parent id)}`` of the active categories, cached until the
+    catalog changes."""
+    key = CATEGORY_TREE_KEY.format(version=catalog_version())
+    tree = cache.get(key)
+    if tree is None:
+        tree = {
+            pk: (name, parent_id)
+            for pk, name, parent_id in Category.objects.filter(
+                is_active=True
+            ).values_list("pk", "name", "parent_id")
+        }
+        cache.set(key, tree, CATEGORY_TREE_TIMEOUT)
+    return tree
+
+
+def with_descendants(tree, category_ids):
+    children = defaultdict(list)
+    for pk, (_, parent_id) in tree.items():
+        children[parent_id].append(pk)
+    found = set(category_ids)
+    level = list(found)
+    while level:
+        level = [child for pk in level for child in children[pk] if child not in found]
+        found.update(level)
+    return found
+
+
+def filter_by_price(products, params):
+    """Apply the ``min_price``, ``max_price`` and ``ordering`` query params,
+    which work on the best price a product is sold at."""
+    min_price = parse_number(params.get("min_price"))
+    max_price = parse_number(params.get("max_price"))
+    ordering = params.get("ordering")
+    if min_price is None and max_price is None and ordering not in PRICE_ORDERINGS:
+        return products
+    products = products.annotate(price_from=best_price_subquery())
+    if min_price is not None:
+        products = products.filter(price_from__gte=min_price)
+    if max_price is not None:
+        products = products.filter(price_from__lte=max_price)
+    if ordering in PRICE_ORDERINGS:
+        products = products.order_by(PRICE_ORDERINGS[ordering], "-id")
+    return products
+
+
+def filter_products(products, params):
+    """Apply the search and facet query params to ``products``.
+
+    ``category`` and ``store`` take comma separated ids; a category includes
+    its descendants. ``in_stock`` keeps products some store has on sale.
+    """
+    search_term = params.get("name", "")
+    if search_term:
+        products = products.filter(
+            Q(name__icontains=search_term) | Q(description__icontains=search_term)
+        )
+    categories = parse_ids(params.get("category"))
+    if categories:
+        products = products.filter(
+            category_id__in=with_descendants(category_tree(), categories)
+        )
+    stores = parse_ids(params.get("store"))
+    if stores:
+        products = products.filter(Exists(on_sale(store_id__in=stores)))
+    if params.get("in_stock") in ("1", "true"):
+        products = products.filter(Exists(on_sale()))
+    min_rating = parse_number(params.get("min_rating"))
+    if min_rating is not None:
+        products = products.filter(rating__gte=min_rating)
+    ordering = params.get("ordering")
+    if ordering in POPULARITY_ORDERINGS:
+        products = products.order_by(*POPULARITY_ORDERINGS[ordering])
+    return filter_by_price(products, params)
+
+
+def price_bucket():
+    bounds = settings.PRICE_FACET_BOUNDS
+    return Case(
+        *[
+            When(facet_price__lt=bound, then=Value(index))
+            for index, bound in enumerate(bounds)
+        ],
+        When(facet_price__isnull=False, then=Value(len(bounds))),
+        default=None,
+        output_field=IntegerField(),
+    )
+
+
+def facet_counts(products):
+    """Count ``products`` per category, rating, availability and price range
+    with one grouped query, and per store with a second one.
+
+    Category counts include the products of descendant categories.
+    """
+    rows = (
+        products.order_by()
+        .annotate(
+            facet_price=best_price_subquery(),
+            available=Exists(on_sale()),
+            rating_floor=Floor("rating"),
+        )
+        .annotate(price_range=price_bucket())
+        .values("category_id", "rating_floor", "available", "price_range")
+        .annotate(count=Count("pk"))
+    )
+    tree = category_tree()
+    total = in_stock = 0
+    categories = defaultdict(int)
+    ratings = defaultdict(int)
+    prices = defaultdict(int)
+    for row in rows:
+        count = row["count"]
+        total += count
+        in_stock += count if row["available"] else 0
+        if row["price_range"] is not None:
+            prices[row["price_range"]] += count
+        ratings[int(row["rating_floor"])] += count
+        category_id, seen = row["category_id"], set()
+        while category_id in tree and category_id not in seen:
+            seen.add(category_id)
+            categories[category_id] += count
+            category_id = tree[category_id][1]
+
+    bounds = (None, *settings.PRICE_FACET_BOUNDS, None)
+    stores = (
+        StoreItem.objects.filter(
+            product__in=products.order_by().values("pk"), is_active=True, stock__gt=0
+        )
+        .values("store_id", "store__name")
+        .annotate(count=Count("product", distinct=True))
+        .order_by("-count", "store_id")[:STORE_FACET_SIZE]
+    )
+    return {
+        "count": total,
+        "in_stock": in_stock,
+        "category": sorted(
+            (
+                {
+                    "id": pk,
+                    "name": tree[pk][0],
+                    "parent": tree[pk][1],
+                    "count": count,
+                }
+                for pk, count in categories.items()
+            ),
+            key=lambda facet: (-facet["count"], facet["id"]),
+        ),
+        "store": [
+            {"id": row["store_id"], "name": row["store__name"], "count": row["count"]}
+            for row in stores
+        ],
+        "rating": [
+            {
+                "min_rating": rating,
+                "count": sum(c for floor, c in ratings.items() if floor >= rating),
+            }
+            for rating in RATING_FACETS
+        ],
+        "price": [
+            {"min_price": bounds[index], "max_price": bounds[index + 1], "count": count}
+            for index, count in sorted(prices.items())
+        ],
+    }
+
+
+def facet_cache_digest(params):
+    filters = {name: params.get(name) for name in FILTER_PARAMS if params.get(name)}
+    source = json.dumps(filters, sort_keys=True)
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+def get_facets(products, params):
+    """Facet counts of ``products`` narrowed by ``params``.
+
+    A combination of filters asked for ``FACET_CACHE_MIN_HITS`` times within
+    an hour is cached for ``FACET_CACHE_TIMEOUT`` seconds, keyed by the
+    catalog version so any catalog change drops it. Filters are keyed in a
+    fixed order, so ``?a=1&b=2`` and ``?b=2&a=1`` share an entry.
+    """
+    if not settings.FACET_CACHE_TIMEOUT:
+        return facet_counts(filter_products(products, params))
+    digest = facet_cache_digest(params)
+    key = FACETS_KEY.format(version=catalog_version(), digest=digest)
+    facets = cache.get(key)
+    if facets is not None:
+        return facets
+    facets = facet_counts(filter_products(products, params))
+    hits_key = FACET_HITS_KEY.format(digest=digest)
+    cache.add(hits_key, 0, FACET_HITS_WINDOW)
+    try:
+        hits = cache.incr(hits_key)
+    except ValueError:
+        # Expired between add() and incr().
+        hits = 1
+    if hits >= settings.FACET_CACHE_MIN_HITS:
+        cache.set(key, facets, settings.FACET_CACHE_TIMEOUT)
+    return facets
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productimage',
+            name='image_placeholder',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
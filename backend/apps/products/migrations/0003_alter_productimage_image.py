@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:38
+
+import apps.core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_productimage_image_placeholder_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='productimage',
+            name='image',
+            field=models.ImageField(storage=apps.core.storage.media_storage, upload_to='products/'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.6 on 2026-10-19 15:37
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+# Orders PROCESSING or DELIVERED were paid.
+PAID_STATUSES = [2, 3]
+
+
+def backfill_purchase_counts(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    OrderItem = apps.get_model("orders", "OrderItem")
+    units = (
+        OrderItem.objects.filter(
+            store_item__product=OuterRef("pk"),
+            is_deleted=False,
+            order__is_deleted=False,
+            order__status__in=PAID_STATUSES,
+        )
+        .values("store_item__product")
+        .annotate(units=Sum("quantity"))
+        .values("units")
+    )
+    Product._base_manager.update(purchase_count=Coalesce(Subquery(units), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0003_alter_category_image'),
+        ('orders', '0005_stockreservation'),
+        ('products', '0003_alter_productimage_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='purchase_count',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='view_count',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_deleted', False)), fields=['-view_count', '-id'], name='product_view_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_deleted', False)), fields=['-purchase_count', '-id'], name='product_purchase_count_idx'),
+        ),
+        migrations.RunPython(backfill_purchase_counts, migrations.RunPython.noop),
+    ]
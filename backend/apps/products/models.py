@@ -1,8 +1,10 @@
 from django.db import models
 from apps.core.models import BaseModel, SoftDeleteModel, HardDeleteManager
+from apps.core.images import schedule_image_variants
+from apps.core.response_cache import track_catalog
+from apps.core.storage import media_storage, track_media
 from apps.categories.models import Category
 from django.db.models.functions import Coalesce
-from django.db.models import F, ExpressionWrapper, Value, DecimalField
 from django.db.models import Sum
 
 
@@ -15,6 +17,23 @@ class Product(SoftDeleteModel):
     )
     rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.00)  # type: ignore
     stock = models.PositiveIntegerField(default=20)
+    # Written in batches by ``flush_popularity``, never on a request.
+    view_count = models.PositiveBigIntegerField(default=0, editable=False)
+    purchase_count = models.PositiveBigIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["-view_count", "-id"],
+                name="product_view_count_idx",
+                condition=models.Q(is_active=True, is_deleted=False),
+            ),
+            models.Index(
+                fields=["-purchase_count", "-id"],
+                name="product_purchase_count_idx",
+                condition=models.Q(is_active=True, is_deleted=False),
+            ),
+        ]
 
     @property
     def total_stock(self):
@@ -25,24 +44,17 @@ class Product(SoftDeleteModel):
 
     @property
     def best_price_item(self):
-        item = (
+        return (
             self.store_items.filter(is_active=True, stock__gt=0)  # type: ignore
-            .annotate(
-                current_price=ExpressionWrapper(
-                    F("price") * (1 - Coalesce(F("discount"), Value(0)) / Value(100)),
-                    output_field=DecimalField(max_digits=10, decimal_places=2),
-                )
-            )
-            .order_by("current_price")
+            .order_by("effective_price")
             .first()
         )
-        return item
 
     @property
     def best_price(self):
         item = self.best_price_item
         if item:
-            return item.current_price
+            return item.effective_price
         return None
 
     def __str__(self) -> str:
@@ -62,7 +74,17 @@ class ProductImage(BaseModel):
     product = models.ForeignKey(
         Product, on_delete=models.CASCADE, related_name="images"
     )
-    image = models.ImageField(upload_to="products/")
+    image = models.ImageField(upload_to="products/", storage=media_storage)
+    image_variants = models.JSONField(default=dict, blank=True)
+    image_placeholder = models.TextField(blank=True, default="")
 
     def __str__(self) -> str:
         return f"{self.product} image"
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        schedule_image_variants(self, "image")
+
+
+track_media(ProductImage, "image")
+track_catalog(Product, ProductImage)
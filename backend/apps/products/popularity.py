@@ -0,0 +1,143 @@
+import threading
+from collections import defaultdict
+from functools import wraps
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Case, F, Sum, Value, When
+from django_redis.cache import RedisCache
+from apps.products.models import Product
+
+POPULARITY_KEY = "popularity:{field}"
+# Counts taken by a flush that has not reached the database yet. A failed
+# flush leaves them here and the next one retries them.
+FLUSHING_KEY = "popularity:{field}:flushing"
+COUNTERS = ("view_count", "purchase_count")
+FLUSH_BATCH_SIZE = 500
+
+
+class LocalPopularityBackend:
+    """Per-process counters, used when the cache is not Redis (tests, local runs)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = defaultdict(lambda: defaultdict(int))
+        self.flushing = {}
+
+    def increment(self, field, amounts):
+        with self.lock:
+            for product_id, amount in amounts.items():
+                self.counts[field][product_id] += amount
+
+    def take(self, field):
+        with self.lock:
+            if field not in self.flushing:
+                self.flushing[field] = dict(self.counts.pop(field, {}))
+            return dict(self.flushing[field])
+
+    def done(self, field):
+        with self.lock:
+            self.flushing.pop(field, None)
+
+
+class RedisPopularityBackend:
+    """Counters kept in one Redis hash per field (product id -> count),
+    shared by every web and Celery worker process."""
+
+    def connection(self):
+        from django_redis import get_redis_connection
+
+        return get_redis_connection("default")
+
+    def increment(self, field, amounts):
+        pipe = self.connection().pipeline(transaction=False)
+        key = POPULARITY_KEY.format(field=field)
+        for product_id, amount in amounts.items():
+            pipe.hincrby(key, product_id, amount)
+        pipe.execute()
+
+    def take(self, field):
+        connection = self.connection()
+        key = POPULARITY_KEY.format(field=field)
+        flushing = FLUSHING_KEY.format(field=field)
+        # RENAME swaps the hash out atomically: increments made while the
+        # flush runs start a new one.
+        if not connection.exists(flushing) and connection.exists(key):
+            connection.rename(key, flushing)
+        raw = connection.hgetall(flushing)
+        return {int(product_id): int(count) for product_id, count in raw.items()}
+
+    def done(self, field):
+        self.connection().delete(FLUSHING_KEY.format(field=field))
+
+
+local_backend = LocalPopularityBackend()
+
+
+def get_backend():
+    if isinstance(caches["default"], RedisCache):
+        return RedisPopularityBackend()
+    return local_backend
+
+
+def record_view(product_id):
+    get_backend().increment("view_count", {product_id: 1})
+
+
+def record_purchases(order):
+    """Count the units of each product bought with ``order``, once the
+    transaction marking it paid commits."""
+    units = dict(
+        order.items.values("store_item__product_id")
+        .annotate(units=Sum("quantity"))
+        .values_list("store_item__product_id", "units")
+    )
+    if units:
+        transaction.on_commit(
+            lambda: get_backend().increment("purchase_count", units)
+        )
+
+
+def count_views(get):
+    """Count a view of the product ``pk`` for every successful ``get``,
+    cached responses included."""
+
+    @wraps(get)
+    def wrapper(view, request, pk, *args, **kwargs):
+        response = get(view, request, pk, *args, **kwargs)
+        if response.status_code == 200:
+            record_view(pk)
+        return response
+
+    return wrapper
+
+
+def add_counts(field, counts):
+    """Add ``counts`` (product id -> amount) to ``field`` with one UPDATE per
+    ``FLUSH_BATCH_SIZE`` products."""
+    product_ids = sorted(counts)
+    for start in range(0, len(product_ids), FLUSH_BATCH_SIZE):
+        batch = product_ids[start : start + FLUSH_BATCH_SIZE]
+        Product.all_objects.filter(pk__in=batch).update(
+            **{
+                field: F(field)
+                + Case(
+                    *[When(pk=pk, then=Value(counts[pk])) for pk in batch],
+                    default=Value(0),
+                )
+            }
+        )
+
+
+def flush_popularity():
+    """Write the counters gathered since the last flush to the products.
+    Returns the number of products updated per field."""
+    backend = get_backend()
+    flushed = {}
+    for field in COUNTERS:
+        counts = backend.take(field)
+        if counts:
+            with transaction.atomic():
+                add_counts(field, counts)
+        backend.done(field)
+        flushed[field] = len(counts)
+    return flushed
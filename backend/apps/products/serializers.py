@@ -4,30 +4,63 @@ from apps.categories.serializers import CategorySimpleSerializer
 from apps.categories.models import Category
 from apps.users.serializers_base import UserSimpleSerializer
 from django.contrib.auth import get_user_model
+from apps.core.images import (
+    image_variant_urls,
+    pick_image_url,
+    read_image_header,
+    schedule_bulk_image_variants,
+)
+from django.conf import settings
+from django.db.models import Prefetch
+from decimal import Decimal
+from apps.stores.models import StoreItem
 
 User = get_user_model()
 
 
+def product_read_queryset(queryset, prefix=""):
+    """Load everything ``ProductReadSerializer`` reads in a fixed number of
+    queries. ``prefix`` is the lookup path to the product when it is nested,
+    e.g. ``"store_item__product__"`` for cart items."""
+    return queryset.select_related(f"{prefix}category").prefetch_related(
+        f"{prefix}images",
+        Prefetch(
+            f"{prefix}store_items",
+            queryset=StoreItem.objects.select_related("store").order_by("pk"),
+        ),
+    )
+
+
 class ProductImageSerializer(serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
+    variants = serializers.SerializerMethodField()
+    placeholder = serializers.CharField(source="image_placeholder", read_only=True)
 
     class Meta:
         model = ProductImage
-        fields = ["id", "image_url"]
+        fields = ["id", "image_url", "variants", "placeholder"]
 
     def get_image_url(self, obj):
         request = self.context.get("request")
+        width = self.context.get("image_width")
+        if width:
+            return pick_image_url(obj.image, obj.image_variants, width, request)
         if obj.image:
             return (
                 request.build_absolute_uri(obj.image.url) if request else obj.image.url
             )
         return None
 
+    def get_variants(self, obj):
+        return image_variant_urls(
+            obj.image, obj.image_variants, self.context.get("request")
+        )
+
 
 class ProductReadSerializer(serializers.ModelSerializer):
     category = CategorySimpleSerializer(read_only=True)
     images = ProductImageSerializer(many=True, read_only=True)
-    best_price = serializers.ReadOnlyField()
+    best_price = serializers.SerializerMethodField()
     sellers = serializers.SerializerMethodField()
     best_seller = serializers.SerializerMethodField()
 
@@ -48,27 +81,10 @@ class ProductReadSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = fields
 
-    def get_sellers(self, obj):
-        store_items = obj.store_items.all()
-        return [
-            {
-                "store": {
-                    "id": si.store.id if si.store else None,
-                    "name": si.store.name if si.store else None,
-                },
-                "id": si.id,
-                "price": si.price,
-                "discount_price": si.total_price,
-                "stock": si.stock,
-                "product": obj.id,
-            }
-            for si in store_items
-        ]
+    # The store items are read from ``obj.store_items.all()`` only, so a
+    # queryset built with ``product_read_queryset`` needs no further queries.
 
-    def get_best_seller(self, obj):
-        si = obj.store_items.all().order_by("-stock").first()
-        if not si:
-            return None
+    def seller_data(self, obj, si):
         return {
             "store": {
                 "id": si.store.id if si.store else None,
@@ -81,13 +97,32 @@ class ProductReadSerializer(serializers.ModelSerializer):
             "product": obj.id,
         }
 
+    def get_best_price(self, obj):
+        prices = [
+            si.total_price
+            for si in obj.store_items.all()
+            if si.is_active and si.stock > 0
+        ]
+        if not prices:
+            return None
+        return min(prices).quantize(Decimal("0.01"))
+
+    def get_sellers(self, obj):
+        return [self.seller_data(obj, si) for si in obj.store_items.all()]
+
+    def get_best_seller(self, obj):
+        store_items = obj.store_items.all()
+        if not store_items:
+            return None
+        return self.seller_data(obj, max(store_items, key=lambda si: si.stock))
+
 
 class ProductWriteSerializer(serializers.ModelSerializer):
     category_id = serializers.PrimaryKeyRelatedField(
         queryset=Category.objects.all(), source="category", write_only=True
     )
     uploaded_images = serializers.ListField(
-        child=serializers.ImageField(
+        child=serializers.FileField(
             max_length=1000000, allow_empty_file=False, use_url=False
         ),
         write_only=True,
@@ -105,16 +140,39 @@ class ProductWriteSerializer(serializers.ModelSerializer):
             "stock",
         ]
 
+    def validate_uploaded_images(self, value):
+        for image in value:
+            try:
+                image_format, width, height = read_image_header(image)
+            except ValueError as e:
+                raise serializers.ValidationError(f"{image.name}: {e}")
+            if image_format not in settings.IMAGE_UPLOAD_FORMATS:
+                raise serializers.ValidationError(
+                    f"{image.name}: {image_format} images are not supported"
+                )
+            if max(width, height) > settings.IMAGE_UPLOAD_MAX_DIMENSION:
+                raise serializers.ValidationError(
+                    f"{image.name}: images must be at most "
+                    f"{settings.IMAGE_UPLOAD_MAX_DIMENSION}px on each side"
+                )
+        return value
+
+    def save_images(self, product, uploaded_images):
+        # bulk_create still streams every file to storage through the field's
+        # pre_save, but inserts all rows in one query.
+        images = ProductImage.objects.bulk_create(
+            [ProductImage(product=product, image=image) for image in uploaded_images]
+        )
+        schedule_bulk_image_variants(images, "image")
+
     def create(self, validated_data):
         uploaded_images = validated_data.pop("uploaded_images", [])
         product = Product.objects.create(**validated_data)
-        for image in uploaded_images:
-            ProductImage.objects.create(product=product, image=image)
+        self.save_images(product, uploaded_images)
         return product
 
     def update(self, instance, validated_data):
         uploaded_images = validated_data.pop("uploaded_images", [])
         instance = super().update(instance, validated_data)
-        for image in uploaded_images:
-            ProductImage.objects.create(product=instance, image=image)
+        self.save_images(instance, uploaded_images)
         return instance
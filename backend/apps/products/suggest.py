@@ -0,0 +1,343 @@
+import json
+import re
+import threading
+from collections import defaultdict
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import transaction
+from django.db.models import Count, Q
+from django_redis.cache import RedisCache
+from apps.categories.models import Category
+from apps.products.models import Product
+
+# The index is built into a fresh generation and published by pointing
+# SUGGEST_LIVE_KEY at it, so lookups keep using the old one meanwhile.
+SUGGEST_GENERATION_KEY = "suggest:generation"
+SUGGEST_LIVE_KEY = "suggest:live"
+SUGGEST_BUILDING_KEY = "suggest:building"
+SUGGEST_PREFIX_KEY = "suggest:{generation}:prefix:{prefix}"
+SUGGEST_ENTRIES_KEY = "suggest:{generation}:entries"
+# Cache keys: one rebuild at a time, and one scheduled by lookups that find
+# no index at all.
+SUGGEST_REBUILD_LOCK = "suggest-rebuild:running"
+SUGGEST_REBUILD_SCHEDULED = "suggest-rebuild:scheduled"
+SUGGEST_REBUILD_TIMEOUT = 600
+# Fields whose change moves an entry in the index; saves that only touch
+# other fields (stock, rating) leave it alone.
+INDEXED_FIELDS = {"name", "is_active", "is_deleted"}
+WORD = re.compile(r"\w+")
+
+
+def normalize(text):
+    return " ".join(WORD.findall(text.lower()))
+
+
+def prefixes(name):
+    """Prefixes of the name starting at each of its words, so "laptop pro"
+    is found by "lap", "pro" and "laptop p"."""
+    words = normalize(name).split()
+    found = set()
+    for start in range(len(words)):
+        phrase = " ".join(words[start:])[: settings.SUGGEST_MAX_CHARS]
+        for end in range(settings.SUGGEST_MIN_CHARS, len(phrase) + 1):
+            found.add(phrase[:end].rstrip())
+    return found
+
+
+def matches(name, query):
+    words = normalize(name).split()
+    return any(
+        " ".join(words[start:]).startswith(query) for start in range(len(words))
+    )
+
+
+class LocalSuggestBackend:
+    """Per-process index, used when the cache is not Redis (tests, local runs)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.generations = {}
+            self.counter = 0
+            self.live = self.building = None
+
+    def start_build(self):
+        with self.lock:
+            self.counter += 1
+            self.building = self.counter
+            self.generations[self.building] = (defaultdict(dict), {})
+            return self.building
+
+    def publish(self, generation):
+        with self.lock:
+            self.generations = {generation: self.generations[generation]}
+            self.live = generation
+            self.building = None
+
+    def live_generation(self):
+        return self.live
+
+    def targets(self):
+        return [
+            generation
+            for generation in (self.live, self.building)
+            if generation is not None
+        ]
+
+    def add(self, entries, generation):
+        with self.lock:
+            if generation not in self.generations:
+                return
+            index, stored = self.generations[generation]
+            for member, entry in entries.items():
+                for prefix in prefixes(entry["name"]):
+                    index[prefix][member] = entry["score"]
+                stored[member] = entry
+
+    def remove(self, member, entry, generation):
+        with self.lock:
+            if generation not in self.generations:
+                return
+            index, stored = self.generations[generation]
+            for prefix in prefixes(entry["name"]):
+                index[prefix].pop(member, None)
+            stored.pop(member, None)
+
+    def entry(self, member, generation=None):
+        generation = self.live if generation is None else generation
+        if generation not in self.generations:
+            return None
+        return self.generations[generation][1].get(member)
+
+    def search(self, prefix, count):
+        with self.lock:
+            if self.live not in self.generations:
+                return []
+            index, stored = self.generations[self.live]
+            scores = index.get(prefix, {})
+            members = sorted(scores, key=lambda member: (-scores[member], member))
+            return [stored[member] for member in members[:count]]
+
+
+class RedisSuggestBackend:
+    """One sorted set per prefix (member -> popularity) and a hash with the
+    entries, shared by every web and Celery worker process. A lookup is a
+    ``GET`` of the live generation, one ``ZREVRANGE`` and one ``HMGET``."""
+
+    def connection(self):
+        from django_redis import get_redis_connection
+
+        return get_redis_connection("default")
+
+    def drop_stale(self, keep):
+        """Delete the keys of every generation but ``keep``: the one replaced,
+        those of rebuilds that died before publishing, and entries written to
+        the old generation by a save racing the switch."""
+        connection = self.connection()
+        stale = [
+            key
+            for key in connection.scan_iter(match="suggest:*:*", count=1000)
+            if key.split(b":")[1].isdigit() and int(key.split(b":")[1]) != keep
+        ]
+        for start in range(0, len(stale), 1000):
+            connection.delete(*stale[start : start + 1000])
+
+    def start_build(self):
+        connection = self.connection()
+        generation = connection.incr(SUGGEST_GENERATION_KEY)
+        connection.set(SUGGEST_BUILDING_KEY, generation)
+        return generation
+
+    def publish(self, generation):
+        connection = self.connection()
+        # One SET switches every lookup over atomically.
+        connection.set(SUGGEST_LIVE_KEY, generation)
+        connection.delete(SUGGEST_BUILDING_KEY)
+        self.drop_stale(generation)
+
+    def live_generation(self):
+        raw = self.connection().get(SUGGEST_LIVE_KEY)
+        return int(raw) if raw is not None else None
+
+    def targets(self):
+        raw = self.connection().mget(SUGGEST_LIVE_KEY, SUGGEST_BUILDING_KEY)
+        return sorted({int(generation) for generation in raw if generation})
+
+    def add(self, entries, generation):
+        pipe = self.connection().pipeline(transaction=False)
+        for member, entry in entries.items():
+            for prefix in prefixes(entry["name"]):
+                key = SUGGEST_PREFIX_KEY.format(generation=generation, prefix=prefix)
+                pipe.zadd(key, {member: entry["score"]})
+            pipe.hset(
+                SUGGEST_ENTRIES_KEY.format(generation=generation),
+                member,
+                json.dumps(entry),
+            )
+        pipe.execute()
+
+    def remove(self, member, entry, generation):
+        pipe = self.connection().pipeline(transaction=False)
+        for prefix in prefixes(entry["name"]):
+            pipe.zrem(
+                SUGGEST_PREFIX_KEY.format(generation=generation, prefix=prefix), member
+            )
+        pipe.hdel(SUGGEST_ENTRIES_KEY.format(generation=generation), member)
+        pipe.execute()
+
+    def entry(self, member, generation=None):
+        if generation is None:
+            generation = self.live_generation()
+        if generation is None:
+            return None
+        raw = self.connection().hget(
+            SUGGEST_ENTRIES_KEY.format(generation=generation), member
+        )
+        return json.loads(raw) if raw else None
+
+    def search(self, prefix, count):
+        generation = self.live_generation()
+        if generation is None:
+            return []
+        connection = self.connection()
+        members = connection.zrevrange(
+            SUGGEST_PREFIX_KEY.format(generation=generation, prefix=prefix),
+            0,
+            count - 1,
+        )
+        if not members:
+            return []
+        raw = connection.hmget(
+            SUGGEST_ENTRIES_KEY.format(generation=generation), members
+        )
+        return [json.loads(entry) for entry in raw if entry]
+
+
+local_backend = LocalSuggestBackend()
+
+
+def get_backend():
+    if isinstance(caches["default"], RedisCache):
+        return RedisSuggestBackend()
+    return local_backend
+
+
+def member_of(instance):
+    kind = "category" if isinstance(instance, Category) else "product"
+    return f"{kind}:{instance.pk}"
+
+
+def build_entry(instance, score):
+    kind = "category" if isinstance(instance, Category) else "product"
+    return {"type": kind, "id": instance.pk, "name": instance.name, "score": score}
+
+
+def rebuild_index():
+    """Index every active product and category into a new generation and
+    publish it; lookups use the previous one until then. Returns False when
+    another rebuild is already running.
+
+    Products are ranked by units sold, categories by the number of their
+    active products.
+    """
+    if not cache.add(SUGGEST_REBUILD_LOCK, 1, SUGGEST_REBUILD_TIMEOUT):
+        return False
+    try:
+        backend = get_backend()
+        generation = backend.start_build()
+        products = Product.objects.filter(is_active=True).only(
+            "pk", "name", "purchase_count"
+        )
+        for start in range(0, products.count(), settings.SUGGEST_BATCH_SIZE):
+            backend.add(
+                {
+                    member_of(product): build_entry(product, product.purchase_count)
+                    for product in products.order_by("pk")[
+                        start : start + settings.SUGGEST_BATCH_SIZE
+                    ]
+                },
+                generation,
+            )
+        categories = Category.objects.filter(is_active=True).annotate(
+            active_products=Count(
+                "products",
+                filter=Q(products__is_active=True, products__is_deleted=False),
+            )
+        )
+        backend.add(
+            {
+                member_of(category): build_entry(category, category.active_products)
+                for category in categories
+            },
+            generation,
+        )
+        backend.publish(generation)
+    finally:
+        cache.delete(SUGGEST_REBUILD_LOCK)
+    return True
+
+
+def schedule_rebuild():
+    """Queue a rebuild for a lookup that found no index, at most once per
+    ``SUGGEST_REBUILD_TIMEOUT``."""
+    from apps.products.tasks import rebuild_suggest_index
+
+    if cache.add(SUGGEST_REBUILD_SCHEDULED, 1, SUGGEST_REBUILD_TIMEOUT):
+        rebuild_suggest_index.delay()
+
+
+def reindex(instance):
+    """Bring the entry of ``instance`` up to date, keeping its popularity.
+    A rebuild in progress gets the change too."""
+    backend = get_backend()
+    member = member_of(instance)
+    for generation in backend.targets():
+        old = backend.entry(member, generation)
+        if old is not None:
+            backend.remove(member, old, generation)
+        if instance.is_active and not getattr(instance, "is_deleted", False):
+            score = old["score"] if old is not None else 0
+            backend.add({member: build_entry(instance, score)}, generation)
+
+
+def track_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not INDEXED_FIELDS & set(update_fields):
+        return
+    transaction.on_commit(lambda: reindex(instance))
+
+
+def track_deleted(sender, instance, **kwargs):
+    member = member_of(instance)
+
+    def remove():
+        backend = get_backend()
+        for generation in backend.targets():
+            entry = backend.entry(member, generation)
+            if entry is not None:
+                backend.remove(member, entry, generation)
+
+    transaction.on_commit(remove)
+
+
+def suggest(query, limit):
+    """Up to ``limit`` products and categories whose name has a word
+    starting with ``query``, most popular first.
+
+    Until the first rebuild has published an index there are no results; the
+    lookup queues that rebuild rather than running it inside the request.
+    """
+    query = normalize(query)
+    if len(query) < settings.SUGGEST_MIN_CHARS:
+        return []
+    backend = get_backend()
+    if backend.live_generation() is None:
+        schedule_rebuild()
+        return []
+    if len(query) <= settings.SUGGEST_MAX_CHARS:
+        return backend.search(query, limit)
+    # Only the first SUGGEST_MAX_CHARS characters are indexed.
+    found = backend.search(query[: settings.SUGGEST_MAX_CHARS], limit * 5)
+    return [entry for entry in found if matches(entry["name"], query)][:limit]
@@ -0,0 +1,19 @@
+from celery import shared_task
+from apps.products.popularity import flush_popularity
+from apps.products.suggest import rebuild_index
+
+
+@shared_task
+def rebuild_suggest_index():
+    """Rebuild the autocomplete index, picking up new popularity and rows
+    written without signals (bulk imports, seeding)."""
+    if not rebuild_index():
+        return "suggest index rebuild already running"
+    return "suggest index rebuilt"
+
+
+@shared_task
+def flush_popularity_task():
+    """Write the buffered view and purchase counters to the products."""
+    flushed = flush_popularity()
+    return ", ".join(f"{count} product(s) {field}" for field, count in flushed.items())
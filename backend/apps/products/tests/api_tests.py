@@ -0,0 +1,357 @@
+import shutil
+import tempfile
+from unittest import mock
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO
+from PIL import Image
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from apps.users.models import User
+from apps.categories.models import Category
+from apps.products.models import Product, ProductImage
+from apps.products import popularity, suggest
+from apps.stores.models import Promotion, Store, StoreItem
+from apps.stores.pricing import apply_promotions
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def make_image(name, size=(64, 48), image_format="JPEG"):
+    buffer = BytesIO()
+    Image.new("RGB", size, (120, 30, 30)).save(buffer, image_format)
+    return SimpleUploadedFile(name, buffer.getvalue(), f"image/{image_format.lower()}")
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, IMAGE_UPLOAD_MAX_DIMENSION=1000)
+class ProductCreateAPITest(APITestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.seller = User.objects.create_user(  # type: ignore
+            email="seller@example.com",
+            password="TestPass123",
+            phone="09120000000",
+            is_seller=True,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.seller)
+        self.category = Category.objects.create(name="Bags", description="Bags")
+        self.url = reverse("products_list_create")
+
+    def product_data(self, images):
+        return {
+            "name": "Bag",
+            "description": "A bag",
+            "category_id": self.category.pk,
+            "uploaded_images": images,
+        }
+
+    def test_create_product_with_images(self):
+        images = [make_image(f"bag_{i}.jpg") for i in range(3)]
+        response = self.client.post(
+            self.url, self.product_data(images), format="multipart"
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        product = Product.objects.get(name="Bag")
+        self.assertEqual(ProductImage.objects.filter(product=product).count(), 3)
+
+    def test_reject_invalid_and_oversized_images(self):
+        not_an_image = SimpleUploadedFile("bag.jpg", b"plain text", "image/jpeg")
+        response = self.client.post(
+            self.url, self.product_data([not_an_image]), format="multipart"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        huge = make_image("huge.png", size=(1200, 10), image_format="PNG")
+        response = self.client.post(
+            self.url, self.product_data([huge]), format="multipart"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Product.objects.exists())
+
+
+@override_settings(REQUEST_PROFILING_SAMPLE_RATE=1, REQUEST_QUERY_BUDGET=0)
+class RequestProfilingTest(APITestCase):
+    def test_profiled_request_reports_timings(self):
+        category = Category.objects.create(name="Bags", description="Bags")
+        Product.objects.create(name="Tote", description="A bag", category=category)
+        with self.assertLogs("apps.profiling", level="WARNING") as logs:
+            response = self.client.get(reverse("products_list_create"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("db;dur=", response["Server-Timing"])
+        self.assertIn("serializer;dur=", response["Server-Timing"])
+        self.assertIn("X-Query-Budget-Exceeded", response)
+        self.assertIn('"view": "products_list_create"', logs.output[0])
+
+    @override_settings(REQUEST_PROFILING_SAMPLE_RATE=0)
+    def test_unsampled_request_is_not_profiled(self):
+        response = self.client.get(reverse("products_list_create"))
+        self.assertNotIn("Server-Timing", response)
+
+
+class ProductPriceFilterTest(APITestCase):
+    def setUp(self):
+        seller = User.objects.create_user(  # type: ignore
+            email="seller@example.com",
+            password="TestPass123",
+            phone="09120000000",
+            is_seller=True,
+        )
+        store = Store.objects.create(seller=seller, name="Shop", description="")
+        category = Category.objects.create(name="Bags", description="Bags")
+        self.items = {}
+        prices = [("Cheap", 50, None), ("Dear", 200, 50), ("Mid", 120, None)]
+        for name, price, discount in prices:
+            product = Product.objects.create(
+                name=name, description="", category=category
+            )
+            self.items[name] = StoreItem.objects.create(
+                store=store, product=product, price=price, discount=discount, stock=3
+            )
+        self.url = reverse("products_list_create")
+
+    def names(self, **params):
+        response = self.client.get(self.url, params)
+        return [product["name"] for product in response.data["results"]]  # type: ignore
+
+    def test_filter_and_sort_by_effective_price(self):
+        self.assertEqual(self.items["Dear"].effective_price, Decimal("100.00"))
+        self.assertEqual(self.names(ordering="price"), ["Cheap", "Dear", "Mid"])
+        self.assertEqual(
+            self.names(min_price="60", max_price="110", ordering="-price"), ["Dear"]
+        )
+        self.assertEqual(
+            self.names(min_price="NaN", max_price="Infinity", ordering="price"),
+            ["Cheap", "Dear", "Mid"],
+        )
+
+    def test_scheduled_promotion_is_applied_and_taken_back(self):
+        now = timezone.now()
+        Promotion.objects.create(
+            store_item=self.items["Mid"],
+            discount=Decimal("75"),
+            starts_at=now - timedelta(minutes=1),
+            ends_at=now + timedelta(hours=1),
+        )
+        apply_promotions(now)
+        self.assertEqual(self.names(ordering="price"), ["Mid", "Cheap", "Dear"])
+
+        apply_promotions(now + timedelta(hours=2))
+        self.items["Mid"].refresh_from_db()
+        self.assertIsNone(self.items["Mid"].promotion_discount)
+        self.assertEqual(self.items["Mid"].total_price, Decimal("120.00"))
+        self.assertEqual(self.names(ordering="price"), ["Cheap", "Dear", "Mid"])
+
+
+class ProductFacetTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        seller = User.objects.create_user(  # type: ignore
+            email="seller@example.com",
+            password="TestPass123",
+            phone="09120000000",
+            is_seller=True,
+        )
+        self.store = Store.objects.create(seller=seller, name="Shop", description="")
+        self.bags = Category.objects.create(name="Bags", description="Bags")
+        self.backpacks = Category.objects.create(
+            name="Backpacks", description="Backpacks", parent=self.bags
+        )
+        shoes = Category.objects.create(name="Shoes", description="Shoes")
+        rows = [
+            ("Tote", self.bags, Decimal("4.50"), 50, 2),
+            ("Hiker", self.backpacks, Decimal("3.20"), 600000, 1),
+            ("Daypack", self.backpacks, Decimal("4.10"), 200000, 0),
+            ("Runner", shoes, Decimal("2.00"), 80000, 5),
+        ]
+        for name, category, rating, price, stock in rows:
+            product = Product.objects.create(
+                name=name, description="", category=category, rating=rating
+            )
+            StoreItem.objects.create(
+                store=self.store, product=product, price=price, stock=stock
+            )
+        self.url = reverse("products_facets")
+
+    def test_parent_category_includes_descendants(self):
+        response = self.client.get(
+            reverse("products_list_create"), {"category": self.bags.pk}
+        )
+        names = {product["name"] for product in response.data["results"]}  # type: ignore
+        self.assertEqual(names, {"Tote", "Hiker", "Daypack"})
+
+        response = self.client.get(self.url, {"category": self.bags.pk})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data  # type: ignore
+        self.assertEqual((data["count"], data["in_stock"]), (3, 2))
+        counts = {facet["name"]: facet["count"] for facet in data["category"]}
+        self.assertEqual(counts, {"Bags": 3, "Backpacks": 2})
+        self.assertEqual(data["store"], [{"id": self.store.pk, "name": "Shop", "count": 2}])
+        ratings = {facet["min_rating"]: facet["count"] for facet in data["rating"]}
+        self.assertEqual(ratings, {4: 2, 3: 3, 2: 3, 1: 3})
+        self.assertEqual(
+            [(facet["max_price"], facet["count"]) for facet in data["price"]],
+            [(100000, 1), (1000000, 1)],
+        )
+
+    def test_filters_narrow_counts(self):
+        response = self.client.get(self.url, {"in_stock": "true", "min_rating": "3"})
+        data = response.data  # type: ignore
+        self.assertEqual(data["count"], 2)
+
+        for url in (self.url, reverse("products_list_create")):
+            for value in ("NaN", "Infinity", "-inf", "abc"):
+                response = self.client.get(url, {"min_rating": value})
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(response.data["count"], 4)  # type: ignore
+        counts = {facet["name"]: facet["count"] for facet in data["category"]}
+        self.assertEqual(counts, {"Bags": 2, "Backpacks": 1})
+
+    @override_settings(FACET_CACHE_TIMEOUT=60, FACET_CACHE_MIN_HITS=2)
+    def test_popular_combinations_are_cached(self):
+        params = {"category": self.bags.pk, "in_stock": "true"}
+        self.client.get(self.url, params)
+        self.client.get(self.url, params)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, dict(reversed(params.items())))
+        self.assertEqual(response.data["count"], 2)  # type: ignore
+
+        Category.objects.create(
+            name="Clutches", description="Clutches", parent=self.bags
+        )
+        with self.assertNumQueries(3):
+            self.client.get(self.url, params)
+
+
+class ProductSuggestTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        suggest.local_backend.clear()
+        seller = User.objects.create_user(  # type: ignore
+            email="seller@example.com",
+            password="TestPass123",
+            phone="09120000000",
+            is_seller=True,
+        )
+        store = Store.objects.create(seller=seller, name="Shop", description="")
+        self.laptops = Category.objects.create(name="Laptops", description="Laptops")
+        self.products = {}
+        for name, units_sold in [("Laptop Pro 14", 9), ("Laptop Air", 30), ("Lamp", 0)]:
+            product = Product.objects.create(
+                name=name, description="", category=self.laptops
+            )
+            StoreItem.objects.create(store=store, product=product, price=10, stock=5)
+            Product.objects.filter(pk=product.pk).update(purchase_count=units_sold)
+            self.products[name] = product
+        suggest.rebuild_index()
+        self.url = reverse("products_suggest")
+
+    def names(self, query, **params):
+        response = self.client.get(self.url, {"q": query, **params})
+        return [entry["name"] for entry in response.data["results"]]  # type: ignore
+
+    def test_prefix_of_any_word_ranked_by_popularity(self):
+        self.assertEqual(
+            self.names("lap"), ["Laptop Air", "Laptop Pro 14", "Laptops"]
+        )
+        self.assertEqual(self.names("PRO"), ["Laptop Pro 14"])
+        self.assertEqual(self.names("laptop p"), ["Laptop Pro 14"])
+        self.assertEqual(self.names("lap", limit=1), ["Laptop Air"])
+        self.assertEqual(self.names("l"), [])
+        with self.assertNumQueries(0):
+            self.names("la")
+
+    def test_index_follows_saves(self):
+        self.names("lap")
+        air = self.products["Laptop Air"]
+        with self.captureOnCommitCallbacks(execute=True):
+            air.name = "Notebook Air"
+            air.save()
+            self.products["Lamp"].delete()
+            Category.objects.create(name="Lamps", description="Lamps")
+        self.assertEqual(self.names("la"), ["Laptop Pro 14", "Laptops", "Lamps"])
+        self.assertEqual(self.names("note"), ["Notebook Air"])
+        self.assertEqual(
+            suggest.local_backend.entry(f"product:{air.pk}")["score"], 30
+        )
+
+    def test_rebuild_keeps_the_live_index_until_published(self):
+        backend = suggest.local_backend
+        generation = backend.start_build()
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(
+                name="Laptop Stand", description="", category=self.laptops
+            )
+        self.assertEqual(
+            self.names("lap"),
+            ["Laptop Air", "Laptop Pro 14", "Laptops", "Laptop Stand"],
+        )
+        backend.publish(generation)
+        # Only the save made during the build reached the new generation.
+        self.assertEqual(self.names("lap"), ["Laptop Stand"])
+        self.assertTrue(suggest.rebuild_index())
+        self.assertEqual(len(self.names("lap")), 4)
+
+    def test_missing_index_is_rebuilt_by_a_task(self):
+        suggest.local_backend.clear()
+        with mock.patch("apps.products.tasks.rebuild_suggest_index.delay") as delay:
+            self.assertEqual(self.names("lap"), [])
+            self.assertEqual(self.names("lap"), [])
+        delay.assert_called_once_with()
+
+
+class ProductPopularityTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        popularity.local_backend.counts.clear()
+        popularity.local_backend.flushing.clear()
+        category = Category.objects.create(name="Books", description="Books")
+        self.first = Product.objects.create(
+            name="First", description="", category=category
+        )
+        self.second = Product.objects.create(
+            name="Second", description="", category=category
+        )
+
+    def names(self, ordering):
+        response = self.client.get(
+            reverse("products_list_create"), {"ordering": ordering}
+        )
+        return [product["name"] for product in response.data["results"]]  # type: ignore
+
+    @override_settings(CATALOG_CACHE_TIMEOUT=30)
+    def test_views_are_buffered_until_flushed(self):
+        url = reverse("products_detail_update_delete", kwargs={"pk": self.first.pk})
+        for _ in range(3):
+            self.client.get(url)
+        self.client.get(
+            reverse("products_detail_update_delete", kwargs={"pk": 999})
+        )
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.view_count, 0)
+
+        with self.assertNumQueries(3):
+            flushed = popularity.flush_popularity()
+        self.assertEqual(flushed, {"view_count": 1, "purchase_count": 0})
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.view_count, 3)
+        self.assertEqual(self.names("most_viewed"), ["First", "Second"])
+
+    def test_purchases_are_added_to_earlier_counts(self):
+        Product.objects.filter(pk=self.second.pk).update(purchase_count=4)
+        popularity.get_backend().increment(
+            "purchase_count", {self.first.pk: 3, self.second.pk: 2}
+        )
+        popularity.flush_popularity()
+        self.assertEqual(self.names("best_selling"), ["Second", "First"])
+        counts = dict(Product.objects.values_list("name", "purchase_count"))
+        self.assertEqual(counts, {"First": 3, "Second": 6})
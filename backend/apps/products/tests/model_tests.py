@@ -0,0 +1,114 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+from PIL import Image
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from apps.categories.models import Category
+from apps.core.models import MediaBlob
+from apps.core.tasks import generate_image_variants
+from apps.products.models import Product, ProductImage
+from apps.products.serializers import ProductImageSerializer
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, IMAGE_VARIANT_WIDTHS=(160, 320, 1280))
+class ProductImageVariantsTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        category = Category.objects.create(name="Shoes", description="Shoes")
+        self.product = Product.objects.create(
+            name="Shoe", description="A shoe", category=category
+        )
+        buffer = BytesIO()
+        Image.new("RGB", (800, 600), (10, 120, 200)).save(buffer, "JPEG")
+        self.image = ProductImage.objects.create(
+            product=self.product,
+            image=SimpleUploadedFile("shoe.jpg", buffer.getvalue(), "image/jpeg"),
+        )
+
+    def test_generate_variants(self):
+        generate_image_variants("products.ProductImage", self.image.pk, "image")
+        self.image.refresh_from_db()
+        variants = self.image.image_variants
+        self.assertEqual(variants["source"], self.image.image.name)
+        self.assertEqual(sorted(k for k in variants if k != "source"), ["160", "320"])
+        with self.image.image.storage.open(variants["160"]) as fileobj:
+            self.assertEqual(Image.open(fileobj).size, (160, 120))
+        self.assertTrue(self.image.image_placeholder.startswith("data:image/webp"))
+
+    def test_list_serializer_uses_small_variant(self):
+        data = ProductImageSerializer(self.image, context={"image_width": 320}).data
+        self.assertEqual(data["image_url"], self.image.image.url)
+
+        generate_image_variants("products.ProductImage", self.image.pk, "image")
+        self.image.refresh_from_db()
+        data = ProductImageSerializer(self.image, context={"image_width": 320}).data
+        self.assertTrue(data["image_url"].endswith(self.image.image_variants["320"]))
+
+    def test_identical_uploads_share_one_blob(self):
+        with self.image.image.open("rb") as fileobj:
+            content = fileobj.read()
+        copy = ProductImage.objects.create(
+            product=self.product,
+            image=SimpleUploadedFile("copy.jpg", content, "image/jpeg"),
+        )
+        name = self.image.image.name
+        self.assertEqual(copy.image.name, name)
+        self.assertTrue(name.startswith("blobs/"))
+        self.assertEqual(MediaBlob.objects.get(name=name).ref_count, 2)
+
+        storage = self.image.image.storage
+        with self.captureOnCommitCallbacks(execute=True):
+            copy.delete()
+        self.assertTrue(storage.exists(name))
+        self.assertEqual(MediaBlob.objects.get(name=name).ref_count, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductImage.objects.filter(pk=self.image.pk).delete()
+        self.assertFalse(storage.exists(name))
+        self.assertFalse(MediaBlob.objects.filter(name=name).exists())
+
+    def test_replacing_image_releases_old_blob_and_variants(self):
+        generate_image_variants("products.ProductImage", self.image.pk, "image")
+        image = ProductImage.objects.get(pk=self.image.pk)
+        old_names = [image.image.name, image.image_variants["160"]]
+        buffer = BytesIO()
+        Image.new("RGB", (200, 200), (200, 10, 10)).save(buffer, "PNG")
+        image.image = SimpleUploadedFile("new.png", buffer.getvalue(), "image/png")
+        with mock.patch(
+            "apps.core.tasks.generate_image_variants.delay"
+        ) as delay, self.captureOnCommitCallbacks(execute=True):
+            image.save()
+        delay.assert_called_once_with("products.ProductImage", image.pk, "image")
+        for name in old_names:
+            self.assertFalse(image.image.storage.exists(name))
+        self.assertTrue(image.image.storage.exists(image.image.name))
+
+    def test_only_saves_with_a_new_file_queue_variants(self):
+        image = ProductImage.objects.get(pk=self.image.pk)
+        with mock.patch(
+            "apps.core.tasks.generate_image_variants.delay"
+        ) as delay, self.captureOnCommitCallbacks(execute=True):
+            image.save()
+            self.product.images.get().save()
+        delay.assert_not_called()
+
+    def test_broker_outage_does_not_fail_the_save(self):
+        buffer = BytesIO()
+        Image.new("RGB", (200, 200), (200, 10, 10)).save(buffer, "PNG")
+        with mock.patch(
+            "apps.core.tasks.generate_image_variants.delay",
+            side_effect=ConnectionError("broker is down"),
+        ), self.assertLogs("apps.core.images", "WARNING"):
+            with self.captureOnCommitCallbacks(execute=True):
+                ProductImage.objects.create(
+                    product=self.product,
+                    image=SimpleUploadedFile("new.png", buffer.getvalue(), "image/png"),
+                )
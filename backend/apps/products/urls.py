@@ -1,7 +1,14 @@
 from django.urls import path
-from apps.products.views import ProductListView, ProductDetailView
+from apps.products.views import (
+    ProductListView,
+    ProductDetailView,
+    ProductFacetView,
+    ProductSuggestView,
+)
 
 urlpatterns = [
     path("", ProductListView.as_view(), name="products_list_create"),
+    path("facets/", ProductFacetView.as_view(), name="products_facets"),
+    path("suggest/", ProductSuggestView.as_view(), name="products_suggest"),
     path("<int:pk>/", ProductDetailView.as_view(), name="products_detail_update_delete"),
 ]
\ No newline at end of file
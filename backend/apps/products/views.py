@@ -3,12 +3,20 @@ from rest_framework import status
 from rest_framework.permissions import AllowAny
 from rest_framework.views import APIView
 from rest_framework.pagination import PageNumberPagination
-from apps.products.serializers import ProductReadSerializer, ProductWriteSerializer
+from apps.products.serializers import (
+    ProductReadSerializer,
+    ProductWriteSerializer,
+    product_read_queryset,
+)
 from apps.products.models import Product
-from django.db.models import Q
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from apps.users.permissions import IsSellerUser
+from django.conf import settings
+from apps.core.response_cache import cache_catalog_response
+from apps.products.facets import filter_products, get_facets
+from apps.products.popularity import count_views
+from apps.products.suggest import suggest
 
 
 PRODUCT_IMAGE_SCHEMA = openapi.Schema(
@@ -91,6 +99,77 @@ PAGINATED_PRODUCT_RESPONSE = openapi.Response(
     ),
 )
 
+PRODUCT_FILTER_PARAMETERS = [
+    openapi.Parameter(
+        "name",
+        openapi.IN_QUERY,
+        description="Search term for product name or description",
+        type=openapi.TYPE_STRING,
+    ),
+    openapi.Parameter(
+        "category",
+        openapi.IN_QUERY,
+        description="Comma separated category ids; each includes its subcategories",
+        type=openapi.TYPE_STRING,
+    ),
+    openapi.Parameter(
+        "store",
+        openapi.IN_QUERY,
+        description="Comma separated ids of stores that must have the product on sale",
+        type=openapi.TYPE_STRING,
+    ),
+    openapi.Parameter(
+        "in_stock",
+        openapi.IN_QUERY,
+        description="'true' for products some store has on sale only",
+        type=openapi.TYPE_BOOLEAN,
+    ),
+    openapi.Parameter(
+        "min_rating",
+        openapi.IN_QUERY,
+        description="Only products rated this or higher",
+        type=openapi.TYPE_NUMBER,
+    ),
+    openapi.Parameter(
+        "min_price",
+        openapi.IN_QUERY,
+        description="Only products sold at this price or more",
+        type=openapi.TYPE_NUMBER,
+    ),
+    openapi.Parameter(
+        "max_price",
+        openapi.IN_QUERY,
+        description="Only products sold at this price or less",
+        type=openapi.TYPE_NUMBER,
+    ),
+]
+
+PRODUCT_FACETS_RESPONSE = openapi.Response(
+    description="Facet counts of the matching products",
+    examples={
+        "application/json": {
+            "count": 12,
+            "in_stock": 9,
+            "category": [{"id": 1, "name": "Bags", "parent": None, "count": 12}],
+            "store": [{"id": 3, "name": "Shop", "count": 9}],
+            "rating": [{"min_rating": 4, "count": 5}],
+            "price": [{"min_price": None, "max_price": 100000, "count": 7}],
+        }
+    },
+)
+
+PRODUCT_SUGGEST_RESPONSE = openapi.Response(
+    description="Suggestions for the typed prefix",
+    examples={
+        "application/json": {
+            "results": [
+                {"type": "product", "id": 15, "name": "Laptop Model X"},
+                {"type": "category", "id": 5, "name": "Laptops"},
+            ]
+        }
+    },
+)
+
 NOT_FOUND_RESPONSE = openapi.Schema(
     type=openapi.TYPE_OBJECT,
     properties={
@@ -100,6 +179,8 @@ NOT_FOUND_RESPONSE = openapi.Schema(
 
 
 class ProductListView(APIView):
+    read_replica = True
+
     def get_permissions(self):
         if self.request.method == "GET":
             return [AllowAny()]
@@ -107,32 +188,30 @@ class ProductListView(APIView):
 
     @swagger_auto_schema(
         operation_summary="All Products",
-        operation_description="all products in list form. Supports search via 'name' query param (name/description) and pagination via 'page_size'.",
+        operation_description="all products in list form. Supports search via 'name' query param (name/description), the filters of /products/facets/ and pagination via 'page_size'.",
         responses={
             200: PAGINATED_PRODUCT_RESPONSE,
         },
         manual_parameters=[
-            openapi.Parameter(
-                "name",
-                openapi.IN_QUERY,
-                description="Search term for product name or description",
-                type=openapi.TYPE_STRING,
-            ),
+            *PRODUCT_FILTER_PARAMETERS,
             openapi.Parameter(
                 "page_size",
                 openapi.IN_QUERY,
                 description="Number of results per page (default: 5)",
                 type=openapi.TYPE_INTEGER,
             ),
+            openapi.Parameter(
+                "ordering",
+                openapi.IN_QUERY,
+                description="'price' or '-price' to sort by best price, 'most_viewed' or 'best_selling' to sort by popularity (default: newest first)",
+                type=openapi.TYPE_STRING,
+            ),
         ],
     )
+    @cache_catalog_response
     def get(self, request):
         products = Product.objects.filter(is_active=True).order_by("-id")
-        search_term = request.query_params.get("name", "")
-        if search_term:
-            products = products.filter(
-                Q(name__icontains=search_term) | Q(description__icontains=search_term)
-            )
+        products = filter_products(products, request.query_params)
         paginator = PageNumberPagination()
         try:
             page_size = int(request.query_params.get("page_size", 5))  # type: ignore
@@ -140,9 +219,13 @@ class ProductListView(APIView):
             page_size = 5
 
         paginator.page_size = page_size
-        result_page = paginator.paginate_queryset(products, request)
+        result_page = paginator.paginate_queryset(
+            product_read_queryset(products), request
+        )
         data = ProductReadSerializer(
-            result_page, many=True, context={"request": request}
+            result_page,
+            many=True,
+            context={"request": request, "image_width": settings.IMAGE_LIST_WIDTH},
         ).data
         return paginator.get_paginated_response(data)
 
@@ -160,18 +243,71 @@ class ProductListView(APIView):
         },
     )
     def post(self, request):
-        data = request.data.copy()
-        images = request.FILES.getlist("uploaded_images")
-        if images:
-            data.setlist("uploaded_images", images)
-        serializer = ProductWriteSerializer(data=data, context={"request": request})
+        # request.data already merges request.FILES; copying it would deep-copy
+        # every uploaded file.
+        serializer = ProductWriteSerializer(
+            data=request.data, context={"request": request}
+        )
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class ProductFacetView(APIView):
+    read_replica = True
+    permission_classes = [AllowAny]
+
+    @swagger_auto_schema(
+        operation_summary="Product Facets",
+        operation_description="number of products per category, store, rating and price range among the products matching the filters; a category counts the products of its subcategories too",
+        responses={200: PRODUCT_FACETS_RESPONSE},
+        manual_parameters=PRODUCT_FILTER_PARAMETERS,
+    )
+    def get(self, request):
+        products = Product.objects.filter(is_active=True)
+        facets = get_facets(products, request.query_params)
+        return Response(facets, status=status.HTTP_200_OK)
+
+
+class ProductSuggestView(APIView):
+    permission_classes = [AllowAny]
+
+    @swagger_auto_schema(
+        operation_summary="Product And Category Suggestions",
+        operation_description="products and categories with a word starting with 'q', most popular first; meant to be called on every keystroke",
+        responses={200: PRODUCT_SUGGEST_RESPONSE},
+        manual_parameters=[
+            openapi.Parameter(
+                "q",
+                openapi.IN_QUERY,
+                description="What the user typed so far (at least 2 characters)",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                "limit",
+                openapi.IN_QUERY,
+                description="Number of suggestions (default: 10, at most 20)",
+                type=openapi.TYPE_INTEGER,
+            ),
+        ],
+    )
+    def get(self, request):
+        try:
+            limit = int(request.query_params.get("limit", 10))
+        except ValueError:
+            limit = 10
+        limit = min(max(limit, 1), settings.SUGGEST_MAX_RESULTS)
+        results = [
+            {"type": entry["type"], "id": entry["id"], "name": entry["name"]}
+            for entry in suggest(request.query_params.get("q", ""), limit)
+        ]
+        return Response({"results": results}, status=status.HTTP_200_OK)
+
+
 class ProductDetailView(APIView):
+    read_replica = True
+
     def get_permissions(self):
         if self.request.method == "GET":
             return [AllowAny()]
@@ -190,9 +326,11 @@ class ProductDetailView(APIView):
             ),
         },
     )
+    @count_views
+    @cache_catalog_response
     def get(self, request, pk):
         try:
-            product = Product.objects.get(pk=pk, is_active=True)
+            product = product_read_queryset(Product.objects).get(pk=pk, is_active=True)
         except Product.DoesNotExist:
             return Response(
                 {"message": "no such product"}, status=status.HTTP_404_NOT_FOUND
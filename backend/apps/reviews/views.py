@@ -12,6 +12,7 @@ from rest_framework.pagination import PageNumberPagination
 from django.db.models import Q
 from apps.reviews.models import Review
 from apps.products.models import Product
+from apps.products.serializers import product_read_queryset
 from apps.stores.models import Store
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
@@ -89,6 +90,7 @@ NOT_FOUND_RESPONSE = openapi.Schema(
 
 class ProductReviewListView(APIView):
     permission_classes = [AllowAny]
+    read_replica = True
 
     @swagger_auto_schema(
         operation_summary="All Product's Reviews",
@@ -122,7 +124,10 @@ class ProductReviewListView(APIView):
                 {"message": "no such product"}, status=status.HTTP_404_NOT_FOUND
             )
 
-        product_reviews = Review.objects.filter(product_id=product_id)
+        product_reviews = product_read_queryset(
+            Review.objects.filter(product_id=product_id).select_related("user"),
+            "product__",
+        )
         search_term = request.query_params.get("search", None)
         if search_term:
             product_reviews = product_reviews.filter(
@@ -146,6 +151,7 @@ class ProductReviewListView(APIView):
 
 class StoreReviewListView(APIView):
     permission_classes = [AllowAny]
+    read_replica = True
 
     @swagger_auto_schema(
         operation_summary="All Store's Reviews",
@@ -179,7 +185,9 @@ class StoreReviewListView(APIView):
                 {"message": "no such store"}, status=status.HTTP_404_NOT_FOUND
             )
 
-        store_reviews = Review.objects.filter(store=store)
+        store_reviews = Review.objects.filter(store=store).select_related(
+            "user", "store"
+        )
         search_term = request.query_params.get("search", None)
         if search_term:
             store_reviews = store_reviews.filter(
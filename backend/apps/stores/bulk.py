@@ -0,0 +1,191 @@
+import csv
+import io
+import json
+from itertools import islice
+from django.db import transaction
+from django.utils import timezone
+from apps.products.models import Product
+from apps.stores.models import StoreItem
+from apps.stores.serializers import StoreItemBulkRowSerializer
+
+BULK_CHUNK_SIZE = 500
+BULK_FIELDS = ["price", "discount", "stock", "is_active"]
+FILE_FORMATS = {
+    ".csv": "csv",
+    ".json": "jsonl",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+}
+
+
+def detect_file_format(filename, requested=None):
+    if requested in ("csv", "jsonl"):
+        return requested
+    for extension, file_format in FILE_FORMATS.items():
+        if filename.lower().endswith(extension):
+            return file_format
+    return None
+
+
+def iter_file_rows(fileobj, file_format):
+    """Yield ``(data, error)`` for every row of a CSV or JSON Lines upload.
+
+    The file is decoded line by line, so memory use does not depend on its size.
+    """
+    raw = getattr(fileobj, "file", fileobj)
+    if file_format == "csv":
+        text = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+        try:
+            for row in csv.DictReader(text):
+                yield {
+                    key.strip(): value.strip()
+                    for key, value in row.items()
+                    if key and value is not None and value.strip() != ""
+                }, None
+        except UnicodeDecodeError:
+            # The reader decodes ahead of the rows, so nothing after this point
+            # can be trusted to line up with a row number.
+            yield None, "file is not valid UTF-8; rows from here on were skipped"
+    else:
+        for line in raw:
+            try:
+                line = line.decode("utf-8").strip()
+            except UnicodeDecodeError:
+                yield None, "line is not valid UTF-8"
+                continue
+            if not line:
+                continue
+            try:
+                data = json.loads(line)
+            except ValueError:
+                yield None, "invalid JSON"
+                continue
+            if isinstance(data, dict):
+                yield data, None
+            else:
+                yield None, "each line must be a JSON object"
+
+
+def apply_chunk(store, chunk):
+    report = []
+    valid = []
+    for row_number, data, error in chunk:
+        if error:
+            report.append({"row": row_number, "status": "error", "errors": error})
+            continue
+        serializer = StoreItemBulkRowSerializer(data=data)
+        if not serializer.is_valid():
+            report.append(
+                {"row": row_number, "status": "error", "errors": serializer.errors}
+            )
+            continue
+        valid.append((row_number, serializer.validated_data))
+
+    product_ids = {data["product"] for _, data in valid}
+    with transaction.atomic():
+        products = {
+            product.pk: product
+            for product in Product.objects.select_for_update()
+            .filter(pk__in=product_ids)
+            .order_by("pk")
+        }
+        existing = {}
+        for store_item in StoreItem.objects.filter(
+            store=store, product_id__in=product_ids
+        ).order_by("-is_active", "pk"):
+            existing.setdefault(store_item.product_id, store_item)  # type: ignore
+
+        to_create = {}
+        to_update = {}
+        touched_products = {}
+        results = []
+        for row_number, data in valid:
+            product = products.get(data["product"])
+            if product is None:
+                report.append(
+                    {"row": row_number, "status": "error", "errors": "no such product"}
+                )
+                continue
+
+            store_item = existing.get(product.pk) or to_create.get(product.pk)
+            is_new_item = store_item is None
+            if is_new_item:
+                if "price" not in data:
+                    report.append(
+                        {
+                            "row": row_number,
+                            "status": "error",
+                            "errors": "price is required for new items",
+                        }
+                    )
+                    continue
+                store_item = StoreItem(store=store, product=product, stock=0)
+
+            if store_item.pk is None and "stock" in data:
+                # Like StoreItemListView.post, new store items take their stock
+                # out of the product's stock.
+                needed = data["stock"] - store_item.stock
+                if product.stock < needed:
+                    report.append(
+                        {
+                            "row": row_number,
+                            "status": "error",
+                            "errors": "not enough product stock",
+                        }
+                    )
+                    continue
+                product.stock -= needed
+                touched_products[product.pk] = product
+
+            if is_new_item:
+                to_create[product.pk] = store_item
+            for field in BULK_FIELDS:
+                if field in data:
+                    setattr(store_item, field, data[field])
+            if store_item.pk is not None:
+                to_update[store_item.pk] = store_item
+            # A later row for an item created earlier in the chunk updates it.
+            row_status = "created" if is_new_item else "updated"
+            results.append((row_number, store_item, row_status))
+
+        for store_item in [*to_create.values(), *to_update.values()]:
+            store_item.effective_price = store_item.total_price
+        StoreItem.objects.bulk_create(list(to_create.values()))
+        now = timezone.now()
+        for store_item in to_update.values():
+            store_item.updated_at = now
+        StoreItem.objects.bulk_update(
+            list(to_update.values()), BULK_FIELDS + ["effective_price", "updated_at"]
+        )
+        Product.objects.bulk_update(list(touched_products.values()), ["stock"])
+
+    for row_number, store_item, row_status in results:
+        report.append({"row": row_number, "status": row_status, "id": store_item.pk})
+    report.sort(key=lambda entry: entry["row"])
+    return report
+
+
+def import_store_items(store, rows, chunk_size=BULK_CHUNK_SIZE):
+    """Validate and apply ``rows`` (an iterable of ``(data, error)``) in chunks.
+
+    Each chunk is committed in its own transaction, so a failure in one chunk
+    does not roll back rows that were already applied.
+    """
+    numbered = (
+        (row_number, data, error)
+        for row_number, (data, error) in enumerate(rows, start=1)
+    )
+    summary = {"created": 0, "updated": 0, "failed": 0, "report": []}
+    while True:
+        chunk = list(islice(numbered, chunk_size))
+        if not chunk:
+            break
+        for entry in apply_chunk(store, chunk):
+            if entry["status"] == "created":
+                summary["created"] += 1
+            elif entry["status"] == "updated":
+                summary["updated"] += 1
+            else:
+                summary["failed"] += 1
+            summary["report"].append(entry)
+    return summary
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stores', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesRollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StoreDailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('date', models.DateField()),
+                ('orders_count', models.PositiveIntegerField(default=0)),
+                ('units_sold', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='stores.store')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('store', 'date'), name='unique_store_daily_sales')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StoreItemDailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('date', models.DateField()),
+                ('orders_count', models.PositiveIntegerField(default=0)),
+                ('units_sold', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='item_daily_sales', to='stores.store')),
+                ('store_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='stores.storeitem')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['store', 'date'], name='stores_stor_store_i_995bbb_idx')],
+                'constraints': [models.UniqueConstraint(fields=('store_item', 'date'), name='unique_store_item_daily_sales')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stores', '0003_daily_sales'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoreItemImport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('file', models.FileField(upload_to='imports/store_items/')),
+                ('file_format', models.CharField(max_length=10)),
+                ('status', models.IntegerField(choices=[(1, 'PENDING'), (2, 'RUNNING'), (3, 'DONE'), (4, 'FAILED')], default=1)),
+                ('created_count', models.PositiveIntegerField(default=0)),
+                ('updated_count', models.PositiveIntegerField(default=0)),
+                ('failed_count', models.PositiveIntegerField(default=0)),
+                ('report', models.JSONField(blank=True, default=list)),
+                ('error', models.TextField(blank=True, default='')),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='item_imports', to='stores.store')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
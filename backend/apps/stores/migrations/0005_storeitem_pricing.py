@@ -0,0 +1,62 @@
+# Generated by Django 5.2.6 on 2026-10-19 15:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import DecimalField, ExpressionWrapper, F, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_effective_prices(apps, schema_editor):
+    StoreItem = apps.get_model("stores", "StoreItem")
+    StoreItem._base_manager.update(
+        effective_price=ExpressionWrapper(
+            F("price") * (1 - Coalesce(F("discount"), Value(0)) / Value(100)),
+            output_field=DecimalField(max_digits=10, decimal_places=2),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_alter_productimage_image'),
+        ('stores', '0004_storeitemimport'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Promotion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('discount', models.DecimalField(decimal_places=2, help_text='Discount percentage', max_digits=5)),
+                ('starts_at', models.DateTimeField()),
+                ('ends_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='storeitem',
+            name='effective_price',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='storeitem',
+            name='promotion_discount',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=5, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='storeitem',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_deleted', False), ('stock__gt', 0)), fields=['product', 'effective_price'], name='storeitem_product_price_idx'),
+        ),
+        migrations.AddField(
+            model_name='promotion',
+            name='store_item',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='promotions', to='stores.storeitem'),
+        ),
+        migrations.AddIndex(
+            model_name='promotion',
+            index=models.Index(fields=['starts_at', 'ends_at'], name='stores_prom_starts__1e4075_idx'),
+        ),
+        migrations.RunPython(backfill_effective_prices, migrations.RunPython.noop),
+    ]
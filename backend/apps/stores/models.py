@@ -1,8 +1,9 @@
 from django.db import models
-from apps.core.models import SoftDeleteModel, HardDeleteManager
+from apps.core.models import BaseModel, SoftDeleteModel, HardDeleteManager
+from apps.core.response_cache import track_catalog
 from apps.products.models import Product
 from django.conf import settings
-from decimal import Decimal
+from decimal import ROUND_HALF_UP, Decimal
 
 
 class Store(SoftDeleteModel):
@@ -40,15 +41,44 @@ class StoreItem(SoftDeleteModel):
     )
     stock = models.PositiveIntegerField(default=0)
     is_active = models.BooleanField(default=True)
+    # Discount of the running promotion, kept up to date by
+    # apps.stores.tasks.apply_promotions.
+    promotion_discount = models.DecimalField(
+        max_digits=5, decimal_places=2, null=True, blank=True, editable=False
+    )
+    # total_price, stored so listings can filter and sort on it in SQL.
+    effective_price = models.DecimalField(
+        max_digits=10, decimal_places=2, default=0, editable=False
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["product", "effective_price"],
+                name="storeitem_product_price_idx",
+                condition=models.Q(is_active=True, stock__gt=0, is_deleted=False),
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"{self.product} store item in {self.store}"
 
     @property
     def total_price(self):
-        if self.discount:
-            return self.price * (Decimal("1") - self.discount / Decimal("100"))
-        return self.price
+        """Price after the larger of the store's discount and the running
+        promotion, rounded to cents."""
+        discount = max(self.discount or 0, self.promotion_discount or 0)
+        price = Decimal(self.price)
+        if discount:
+            price *= Decimal("1") - Decimal(discount) / Decimal("100")
+        return price.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+    def save(self, *args, **kwargs):
+        self.effective_price = self.total_price
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "effective_price" not in update_fields:
+            kwargs["update_fields"] = [*update_fields, "effective_price"]
+        super().save(*args, **kwargs)
 
     def delete(self, using=None, keep_parents=False):
         self.storeItem_cartItem.all().delete()  # type: ignore
@@ -62,3 +92,108 @@ class HardDeleteStoreItem(StoreItem):
         proxy = True
         verbose_name = "deleted Store item"
         verbose_name_plural = "deleted Store items"
+
+
+class StoreDailySales(BaseModel):
+    store = models.ForeignKey(
+        Store, on_delete=models.CASCADE, related_name="daily_sales"
+    )
+    date = models.DateField()
+    orders_count = models.PositiveIntegerField(default=0)
+    units_sold = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["store", "date"], name="unique_store_daily_sales"
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.store} sales on {self.date}"
+
+
+class StoreItemDailySales(BaseModel):
+    store = models.ForeignKey(
+        Store, on_delete=models.CASCADE, related_name="item_daily_sales"
+    )
+    store_item = models.ForeignKey(
+        StoreItem, on_delete=models.CASCADE, related_name="daily_sales"
+    )
+    date = models.DateField()
+    orders_count = models.PositiveIntegerField(default=0)
+    units_sold = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["store_item", "date"], name="unique_store_item_daily_sales"
+            )
+        ]
+        indexes = [models.Index(fields=["store", "date"])]
+
+    def __str__(self) -> str:
+        return f"{self.store_item} sales on {self.date}"
+
+
+class SalesRollupWatermark(models.Model):
+    """Last ``Order.updated_at`` already folded into the daily sales tables."""
+
+    name = models.CharField(max_length=50, unique=True)
+    value = models.DateTimeField()
+
+    def __str__(self) -> str:
+        return f"{self.name} rolled up to {self.value}"
+
+
+class StoreItemImport(BaseModel):
+    class ImportStatus(models.IntegerChoices):
+        PENDING = 1, "PENDING"
+        RUNNING = 2, "RUNNING"
+        DONE = 3, "DONE"
+        FAILED = 4, "FAILED"
+
+    store = models.ForeignKey(
+        Store, on_delete=models.CASCADE, related_name="item_imports"
+    )
+    file = models.FileField(upload_to="imports/store_items/")
+    file_format = models.CharField(max_length=10)
+    status = models.IntegerField(
+        choices=ImportStatus.choices, default=ImportStatus.PENDING
+    )
+    created_count = models.PositiveIntegerField(default=0)
+    updated_count = models.PositiveIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+    report = models.JSONField(default=list, blank=True)
+    error = models.TextField(blank=True, default="")
+
+    def __str__(self) -> str:
+        return f"{self.pk}. item import for {self.store} with status {self.status}"
+
+
+class Promotion(BaseModel):
+    """A discount on a store item between ``starts_at`` and ``ends_at``.
+
+    While several promotions of an item overlap the largest applies; a
+    store discount larger than the promotion still wins.
+    """
+
+    store_item = models.ForeignKey(
+        StoreItem, on_delete=models.CASCADE, related_name="promotions"
+    )
+    discount = models.DecimalField(
+        max_digits=5, decimal_places=2, help_text="Discount percentage"
+    )
+    starts_at = models.DateTimeField()
+    ends_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [models.Index(fields=["starts_at", "ends_at"])]
+
+    def __str__(self) -> str:
+        return f"{self.discount}% off {self.store_item} from {self.starts_at} to {self.ends_at}"
+
+
+track_catalog(Store, StoreItem, Promotion)
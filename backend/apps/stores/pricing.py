@@ -0,0 +1,45 @@
+from django.db.models import Max, OuterRef, Q, Subquery
+from django.utils import timezone
+from apps.core.response_cache import invalidate_catalog
+from apps.stores.models import Promotion, StoreItem
+
+
+def best_price_subquery(outer_ref="pk"):
+    """Lowest ``effective_price`` among the store items on sale of the
+    product at ``outer_ref``; answered from ``storeitem_product_price_idx``."""
+    return Subquery(
+        StoreItem.objects.filter(
+            product=OuterRef(outer_ref), is_active=True, stock__gt=0
+        )
+        .order_by("effective_price")
+        .values("effective_price")[:1]
+    )
+
+
+def apply_promotions(now=None):
+    """Give every store item the discount of its running promotion, and take
+    it back from items whose promotion ended. Returns the updated items."""
+    now = now or timezone.now()
+    running = dict(
+        Promotion.objects.filter(starts_at__lte=now, ends_at__gt=now)
+        .values("store_item_id")
+        .annotate(discount=Max("discount"))
+        .values_list("store_item_id", "discount")
+    )
+    candidates = StoreItem.objects.filter(
+        Q(promotion_discount__isnull=False) | Q(pk__in=list(running))
+    )
+    changed = []
+    for store_item in candidates:
+        discount = running.get(store_item.pk)
+        if store_item.promotion_discount != discount:
+            store_item.promotion_discount = discount
+            store_item.effective_price = store_item.total_price
+            store_item.updated_at = now
+            changed.append(store_item)
+    StoreItem.objects.bulk_update(
+        changed, ["promotion_discount", "effective_price", "updated_at"]
+    )
+    if changed:
+        invalidate_catalog()
+    return changed
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from apps.stores.models import Store, StoreItem
+from apps.stores.models import Promotion, Store, StoreItem, StoreItemImport
 from apps.products.serializers import ProductReadSerializer
 from apps.products.models import Product
 
@@ -63,3 +63,54 @@ class StoreItemWriteSerializer(serializers.ModelSerializer):
             "stock",
             "is_active",
         ]
+
+
+class StoreItemBulkRowSerializer(serializers.Serializer):
+    product = serializers.IntegerField(min_value=1)
+    price = serializers.DecimalField(
+        max_digits=10, decimal_places=2, min_value=0, required=False
+    )
+    discount = serializers.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        min_value=0,
+        max_value=100,
+        required=False,
+        allow_null=True,
+    )
+    stock = serializers.IntegerField(min_value=0, required=False)
+    is_active = serializers.BooleanField(required=False)
+
+
+class StoreItemImportSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = StoreItemImport
+        fields = [
+            "id",
+            "file_format",
+            "status",
+            "created_count",
+            "updated_count",
+            "failed_count",
+            "report",
+            "error",
+            "created_at",
+            "updated_at",
+        ]
+        read_only_fields = fields
+
+
+class PromotionSerializer(serializers.ModelSerializer):
+    discount = serializers.DecimalField(
+        max_digits=5, decimal_places=2, min_value=0, max_value=100
+    )
+
+    class Meta:
+        model = Promotion
+        fields = ["id", "store_item", "discount", "starts_at", "ends_at"]
+        read_only_fields = ["id", "store_item"]
+
+    def validate(self, attrs):
+        if attrs["ends_at"] <= attrs["starts_at"]:
+            raise serializers.ValidationError("ends_at must be after starts_at")
+        return attrs
@@ -0,0 +1,132 @@
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+from celery import shared_task
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from apps.orders.models import Order, OrderItem
+from apps.stores.models import (
+    StoreDailySales,
+    StoreItemDailySales,
+    SalesRollupWatermark,
+    StoreItemImport,
+)
+from apps.stores.bulk import import_store_items, iter_file_rows
+from apps.stores.pricing import apply_promotions
+
+SALES_WATERMARK = "daily_sales"
+EXCLUDED_ORDER_STATUSES = [Order.OrderStatus.CANCELLED, Order.OrderStatus.FAILED]
+# Rebuilding a day is idempotent, so re-scan a little before the watermark to
+# pick up orders whose transaction committed after the previous run started.
+SALES_WATERMARK_OVERLAP = timedelta(minutes=5)
+
+
+def rebuild_daily_sales(day, store_ids):
+    """Recompute the rollup rows of ``store_ids`` for a single day."""
+    items = (
+        OrderItem.objects.filter(
+            order__is_deleted=False,
+            order__created_at__date=day,
+            store_item__store_id__in=store_ids,
+        )
+        .exclude(order__status__in=EXCLUDED_ORDER_STATUSES)
+        .order_by()
+    )
+    item_rows = items.values("store_item_id", "store_item__store_id").annotate(
+        orders_count=Count("order_id", distinct=True),
+        units_sold=Sum("quantity"),
+        revenue=Sum("total_price"),
+    )
+    store_rows = items.values("store_item__store_id").annotate(
+        orders_count=Count("order_id", distinct=True),
+        units_sold=Sum("quantity"),
+        revenue=Sum("total_price"),
+    )
+
+    with transaction.atomic():
+        StoreItemDailySales.objects.filter(date=day, store_id__in=store_ids).delete()
+        StoreDailySales.objects.filter(date=day, store_id__in=store_ids).delete()
+        StoreItemDailySales.objects.bulk_create(
+            [
+                StoreItemDailySales(
+                    store_id=row["store_item__store_id"],
+                    store_item_id=row["store_item_id"],
+                    date=day,
+                    orders_count=row["orders_count"],
+                    units_sold=row["units_sold"],
+                    revenue=row["revenue"],
+                )
+                for row in item_rows
+            ]
+        )
+        StoreDailySales.objects.bulk_create(
+            [
+                StoreDailySales(
+                    store_id=row["store_item__store_id"],
+                    date=day,
+                    orders_count=row["orders_count"],
+                    units_sold=row["units_sold"],
+                    revenue=row["revenue"],
+                )
+                for row in store_rows
+            ]
+        )
+
+
+@shared_task
+def rollup_store_sales():
+    watermark, _ = SalesRollupWatermark.objects.get_or_create(
+        name=SALES_WATERMARK,
+        defaults={"value": datetime(1970, 1, 1, tzinfo=dt_timezone.utc)},
+    )
+    upper = timezone.now()
+    changed = (
+        OrderItem.all_objects.filter(
+            order__updated_at__gt=watermark.value - SALES_WATERMARK_OVERLAP,
+            order__updated_at__lte=upper,
+        )
+        .annotate(day=TruncDate("order__created_at"))
+        .values_list("day", "store_item__store_id")
+        .distinct()
+    )
+
+    stores_by_day = defaultdict(set)
+    for day, store_id in changed:
+        stores_by_day[day].add(store_id)
+
+    for day, store_ids in stores_by_day.items():
+        rebuild_daily_sales(day, store_ids)
+
+    watermark.value = upper
+    watermark.save(update_fields=["value"])
+    return f"rolled up {len(stores_by_day)} day(s)"
+
+
+@shared_task
+def import_store_items_task(import_id):
+    job = StoreItemImport.objects.select_related("store").get(pk=import_id)
+    job.status = StoreItemImport.ImportStatus.RUNNING
+    job.save(update_fields=["status", "updated_at"])
+    try:
+        with job.file.open("rb") as fileobj:
+            summary = import_store_items(
+                job.store, iter_file_rows(fileobj, job.file_format)
+            )
+    except Exception as e:
+        job.status = StoreItemImport.ImportStatus.FAILED
+        job.error = str(e)
+        job.save(update_fields=["status", "error", "updated_at"])
+        raise
+    job.status = StoreItemImport.ImportStatus.DONE
+    job.created_count = summary["created"]
+    job.updated_count = summary["updated"]
+    job.failed_count = summary["failed"]
+    job.report = summary["report"]
+    job.save()
+    return f"imported {summary['created'] + summary['updated']} store item(s)"
+
+
+@shared_task
+def apply_promotions_task():
+    return f"repriced {len(apply_promotions())} store item(s)"
@@ -0,0 +1,264 @@
+from decimal import Decimal
+from asgiref.sync import sync_to_async
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.urls import reverse
+from datetime import timedelta
+from django.utils import timezone
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
+from apps.users.models import User
+from apps.categories.models import Category
+from apps.products.models import Product
+from apps.stores.models import Store, StoreItem, StoreDailySales
+from apps.stores.pricing import apply_promotions
+from apps.stores.tasks import rollup_store_sales
+from apps.addresses.models import Address
+from apps.orders.models import Order, OrderItem
+
+
+class StoreAnalyticsAPITest(APITestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(  # type: ignore
+            email="seller@example.com",
+            password="TestPass123",
+            phone="09120000000",
+            is_seller=True,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.seller)
+        category = Category.objects.create(name="Books", description="Books")
+        self.store = Store.objects.create(
+            seller=self.seller, name="Book Store", description="Store"
+        )
+        self.items = [
+            StoreItem.objects.create(
+                store=self.store,
+                product=Product.objects.create(
+                    name=name, description="A book", category=category
+                ),
+                price=Decimal("10.00"),
+                stock=100,
+            )
+            for name in ("Book A", "Book B")
+        ]
+        self.address = Address.objects.create(
+            user=self.seller,
+            label="Home",
+            city="Tehran",
+            state="Tehran",
+            postal_code="12345",
+            country="Iran",
+        )
+
+    def create_order(self, quantities, order_status=Order.OrderStatus.PROCESSING):
+        order = Order.objects.create(
+            customer=self.seller,
+            address=self.address,
+            total_price=Decimal("0"),
+            status=order_status,
+        )
+        for store_item, quantity in zip(self.items, quantities):
+            OrderItem.objects.create(
+                order=order,
+                store_item=store_item,
+                quantity=quantity,
+                price=store_item.price,
+                total_price=store_item.price * quantity,
+            )
+        return order
+
+    def test_rollup_and_sales_series(self):
+        self.create_order([1, 3])
+        self.create_order([2, 0])
+        self.create_order([5, 5], order_status=Order.OrderStatus.CANCELLED)
+        rollup_store_sales()
+
+        response = self.client.get(reverse("store_sales_analytics"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        totals = response.data["totals"]  # type: ignore
+        self.assertEqual(totals["orders_count"], 2)
+        self.assertEqual(totals["units_sold"], 6)
+        self.assertEqual(totals["revenue"], Decimal("60.00"))
+
+    def test_rollup_is_incremental(self):
+        order = self.create_order([1, 1])
+        rollup_store_sales()
+        self.assertEqual(StoreDailySales.objects.get().units_sold, 2)
+
+        order.status = Order.OrderStatus.CANCELLED
+        order.save()
+        rollup_store_sales()
+        self.assertFalse(StoreDailySales.objects.exists())
+
+    def test_top_items(self):
+        self.create_order([1, 4])
+        rollup_store_sales()
+        response = self.client.get(
+            reverse("store_top_items_analytics"), {"order_by": "units", "limit": 1}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data["results"]  # type: ignore
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]["product_name"], "Book B")
+        self.assertEqual(results[0]["units_sold"], 4)
+
+        response = self.client.get(
+            reverse("store_top_items_analytics"), {"order_by": "units", "limit": -1}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 1)  # type: ignore
+
+
+class StoreItemTestCase(APITestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(  # type: ignore
+            email="seller@example.com",
+            password="TestPass123",
+            phone="09120000000",
+            is_seller=True,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.seller)
+        self.store = Store.objects.create(
+            seller=self.seller, name="Book Store", description="Store"
+        )
+        category = Category.objects.create(name="Books", description="Books")
+        self.product = Product.objects.create(
+            name="Book A", description="A book", category=category, stock=20
+        )
+        self.other_product = Product.objects.create(
+            name="Book B", description="A book", category=category, stock=20
+        )
+        self.store_item = StoreItem.objects.create(
+            store=self.store, product=self.product, price=Decimal("10.00"), stock=1
+        )
+
+
+class StoreItemBulkAPITest(StoreItemTestCase):
+    def test_csv_upsert_report(self):
+        content = (
+            "product,price,discount,stock\n"
+            f"{self.product.pk},12.50,,7\n"
+            f"{self.other_product.pk},9.00,10,5\n"
+            f"{self.other_product.pk + 100},9.00,,1\n"
+            f"{self.product.pk},not-a-price,,1\n"
+        )
+        upload = SimpleUploadedFile("items.csv", content.encode(), "text/csv")
+        response = self.client.post(
+            reverse("store_item_bulk"), {"file": upload}, format="multipart"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data  # type: ignore
+        self.assertEqual((data["created"], data["updated"], data["failed"]), (1, 1, 2))
+        self.assertEqual(
+            [entry["status"] for entry in data["report"]],
+            ["updated", "created", "error", "error"],
+        )
+
+        self.store_item.refresh_from_db()
+        self.assertEqual(self.store_item.price, Decimal("12.50"))
+        self.assertEqual(self.store_item.stock, 7)
+        created = StoreItem.objects.get(store=self.store, product=self.other_product)
+        self.assertEqual(created.discount, Decimal("10.00"))
+        self.other_product.refresh_from_db()
+        self.assertEqual(self.other_product.stock, 15)
+
+    def test_undecodable_csv_and_repeated_rows(self):
+        upload = SimpleUploadedFile(
+            "items.csv", "product,price\n1,caf\xe9\n".encode("latin-1"), "text/csv"
+        )
+        response = self.client.post(
+            reverse("store_item_bulk"), {"file": upload}, format="multipart"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["failed"], 1)  # type: ignore
+        self.assertIn("UTF-8", response.data["report"][0]["errors"])  # type: ignore
+
+        response = self.client.post(
+            reverse("store_item_bulk"),
+            {
+                "rows": [
+                    {"product": self.other_product.pk, "price": "5.00", "stock": 2},
+                    {"product": self.other_product.pk, "stock": 3},
+                ]
+            },
+            format="json",
+        )
+        data = response.data  # type: ignore
+        self.assertEqual((data["created"], data["updated"]), (1, 1))
+        created = StoreItem.objects.get(store=self.store, product=self.other_product)
+        self.assertEqual(created.stock, 3)
+        self.other_product.refresh_from_db()
+        self.assertEqual(self.other_product.stock, 17)
+
+    def test_json_rows(self):
+        response = self.client.post(
+            reverse("store_item_bulk"),
+            {"rows": [{"product": self.product.pk, "is_active": False}, "bad"]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["updated"], 1)  # type: ignore
+        self.assertEqual(response.data["failed"], 1)  # type: ignore
+        self.store_item.refresh_from_db()
+        self.assertFalse(self.store_item.is_active)
+
+    def test_export_items(self):
+        response = self.client.get(reverse("store_item_export"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lines = b"".join(response.streaming_content).decode().splitlines()  # type: ignore
+        self.assertEqual(lines[0].split(",")[:3], ["id", "product_id", "product__name"])
+        self.assertEqual(len(lines), 2)
+
+        response = self.client.get(
+            reverse("store_item_export"), {"file_format": "jsonl"}
+        )
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertIn(b'"product__name": "Book A"', b"".join(response.streaming_content))  # type: ignore
+
+    @override_settings(ASGI_SERVER=True)
+    async def test_export_streams_under_asgi(self):
+        token = await sync_to_async(RefreshToken.for_user)(self.seller)
+        response = await self.async_client.get(
+            reverse("store_item_export"),
+            headers={"AUTHORIZATION": f"Bearer {token.access_token}"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.is_async)
+        body = b"".join([chunk async for chunk in response.streaming_content])
+        lines = body.decode().splitlines()
+        self.assertEqual(lines[0].split(",")[:3], ["id", "product_id", "product__name"])
+        self.assertEqual(len(lines), 2)
+
+
+class StoreItemPromotionAPITest(StoreItemTestCase):
+    def test_running_promotion_sets_effective_price(self):
+        now = timezone.now()
+        response = self.client.post(
+            reverse("store_item_promotions", kwargs={"pk": self.store_item.pk}),
+            {
+                "discount": "20.00",
+                "starts_at": now - timedelta(hours=1),
+                "ends_at": now + timedelta(hours=1),
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.store_item.refresh_from_db()
+        self.assertEqual(self.store_item.effective_price, Decimal("8.00"))
+
+        apply_promotions(now + timedelta(hours=2))
+        self.store_item.refresh_from_db()
+        self.assertIsNone(self.store_item.promotion_discount)
+        self.assertEqual(self.store_item.effective_price, Decimal("10.00"))
+
+    def test_promotion_must_end_after_start(self):
+        now = timezone.now()
+        response = self.client.post(
+            reverse("store_item_promotions", kwargs={"pk": self.store_item.pk}),
+            {"discount": "20.00", "starts_at": now, "ends_at": now},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -5,9 +5,17 @@ from apps.stores.views import (
     StoreAddressDetailView,
     StoreItemListView,
     StoreItemDetailView,
+    StoreItemBulkView,
+    StoreItemPromotionView,
+    StoreItemImportDetailView,
+    StoreItemExportView,
     StoreOrderListView,
+    StoreOrderSummaryView,
+    StoreOrderExportView,
     StoreOrderDetailView,
     ChangeOrderStatusView,
+    StoreSalesAnalyticsView,
+    StoreTopItemsAnalyticsView,
 )
 
 urlpatterns = [
@@ -16,7 +24,15 @@ urlpatterns = [
     path("address/<int:pk>/", StoreAddressDetailView.as_view(), name="store_address_detail_update_delete"),
     path("items/", StoreItemListView.as_view(), name="store_item_list_create"),
     path("items/<int:pk>/", StoreItemDetailView.as_view(), name="store_item_detail_update_delete"),
+    path("items/<int:pk>/promotions/", StoreItemPromotionView.as_view(), name="store_item_promotions"),
+    path("items/bulk/", StoreItemBulkView.as_view(), name="store_item_bulk"),
+    path("items/export/", StoreItemExportView.as_view(), name="store_item_export"),
+    path("items/bulk/<int:pk>/", StoreItemImportDetailView.as_view(), name="store_item_import_detail"),
     path("orders/", StoreOrderListView.as_view(), name="store_order_list"),
+    path("orders/export/", StoreOrderExportView.as_view(), name="store_order_export"),
+    path("orders/summary/", StoreOrderSummaryView.as_view(), name="store_order_summary"),
     path("orders/<int:pk>/", StoreOrderDetailView.as_view(), name="store_order_detail"),
     path("orders/change-status/<int:pk>/", ChangeOrderStatusView.as_view(), name="store_order_change_status"),
+    path("analytics/sales/", StoreSalesAnalyticsView.as_view(), name="store_sales_analytics"),
+    path("analytics/top-items/", StoreTopItemsAnalyticsView.as_view(), name="store_top_items_analytics"),
 ]
\ No newline at end of file
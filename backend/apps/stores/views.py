@@ -1,3 +1,4 @@
+from decimal import Decimal
 from rest_framework.response import Response
 from rest_framework import status
 from apps.users.permissions import IsSellerUser
@@ -8,18 +9,36 @@ from apps.stores.serializers import (
     StoreWriteSerializer,
     StoreItemReadSerializer,
     StoreItemWriteSerializer,
+    StoreItemImportSerializer,
+    PromotionSerializer,
 )
-from apps.stores.models import Store, StoreItem
+from apps.stores.models import (
+    Store,
+    StoreItem,
+    StoreDailySales,
+    StoreItemDailySales,
+    StoreItemImport,
+    Promotion,
+)
+from apps.stores.bulk import detect_file_format, import_store_items, iter_file_rows
+from apps.stores.exports import stream_export
+from apps.stores.pricing import apply_promotions
+from apps.stores.tasks import import_store_items_task
+from django.conf import settings
 from django.db.models import Q
 from apps.addresses.serializers import AddressReadSerializer, AddressWriteSerializer
 from apps.addresses.models import Address
-from apps.orders.models import Order
-from apps.orders.serializers import OrderStatusSerializer
+from apps.orders.models import Order, OrderItem, StoreOrder
+from apps.orders.serializers import OrderStatusSerializer, StoreOrderReadSerializer
 from django.shortcuts import get_object_or_404
 from drf_yasg.utils import swagger_auto_schema
 from apps.products.models import Product
+from apps.products.serializers import product_read_queryset
 from django.db import transaction
-from django.db.models import F
+from django.db.models import F, Count, Sum, Exists, OuterRef
+from django.utils.dateparse import parse_date
+from django.utils import timezone
+from datetime import timedelta
 from django.db.models.deletion import ProtectedError
 
 
@@ -224,7 +243,9 @@ class StoreItemListView(APIView):
     )
     def get(self, request):
         user_store = Store.objects.get(seller=request.user)
-        store_items = StoreItem.objects.filter(store=user_store,is_active=True)
+        store_items = product_read_queryset(
+            StoreItem.objects.filter(store=user_store, is_active=True), "product__"
+        )
         search_term = request.query_params.get("search", None)
         if search_term:
             store_items = store_items.filter(
@@ -279,7 +300,9 @@ class StoreItemDetailView(APIView):
     def get(self, request, pk):
         user_store = Store.objects.get(seller=request.user)
         try:
-            store_item = StoreItem.objects.get(pk=pk, store=user_store,is_active=True)
+            store_item = product_read_queryset(StoreItem.objects, "product__").get(
+                pk=pk, store=user_store, is_active=True
+            )
         except StoreItem.DoesNotExist:
             return Response(
                 {"message": "no such Store item"}, status=status.HTTP_404_NOT_FOUND
@@ -366,52 +389,310 @@ class StoreItemDetailView(APIView):
                 )
 
 
+class StoreItemPromotionView(APIView):
+    permission_classes = [IsSellerUser]
+
+    @swagger_auto_schema(
+        operation_summary="Promotions Of An Item In Your Store",
+        operation_description="see the scheduled promotions of an item in your store",
+        responses={200: PromotionSerializer(many=True), 404: "Not found"},
+    )
+    def get(self, request, pk):
+        store_item = get_object_or_404(StoreItem, pk=pk, store__seller=request.user)
+        promotions = Promotion.objects.filter(store_item=store_item).order_by(
+            "starts_at"
+        )
+        return Response(
+            PromotionSerializer(promotions, many=True).data, status=status.HTTP_200_OK
+        )
+
+    @swagger_auto_schema(
+        request_body=PromotionSerializer,
+        operation_summary="Schedule A Promotion For An Item In Your Store",
+        operation_description="give an item in your store a discount between starts_at and ends_at",
+        responses={201: PromotionSerializer, 400: "Bad Request", 404: "Not found"},
+        examples={
+            "application/json": {
+                "discount": "15.00",
+                "starts_at": "2025-01-01T00:00:00Z",
+                "ends_at": "2025-01-08T00:00:00Z",
+            }
+        },
+    )
+    def post(self, request, pk):
+        store_item = get_object_or_404(StoreItem, pk=pk, store__seller=request.user)
+        serializer = PromotionSerializer(data=request.data)
+        if serializer.is_valid():
+            serializer.save(store_item=store_item)
+            # A promotion that is already running applies right away instead
+            # of at the next scheduler tick.
+            apply_promotions()
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class StoreItemBulkView(APIView):
+    permission_classes = [IsSellerUser]
+    statement_timeout = "report"
+
+    @swagger_auto_schema(
+        operation_summary="Bulk Create Or Update Items In Your Store",
+        operation_description=(
+            "upsert many store items at once, keyed by product id. Send a CSV or "
+            "JSON Lines file as 'file' (columns/keys: product, price, discount, "
+            "stock, is_active) or a JSON body {'rows': [...]}. Files above the "
+            "sync size limit, or sent with '?background=true', are imported by a "
+            "background job whose report is available at items/bulk/<id>/."
+        ),
+        responses={
+            200: "Per-row import report",
+            202: StoreItemImportSerializer,
+            400: "Bad Request",
+        },
+    )
+    def post(self, request):
+        user_store = get_object_or_404(Store, seller=request.user)
+        uploaded = request.FILES.get("file")
+        if uploaded is None:
+            rows = request.data.get("rows")
+            if not isinstance(rows, list):
+                return Response(
+                    {"message": "send a 'file' or a list of 'rows'"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            summary = import_store_items(
+                user_store,
+                (
+                    (row, None)
+                    if isinstance(row, dict)
+                    else (None, "each row must be an object")
+                    for row in rows
+                ),
+            )
+            return Response(summary, status=status.HTTP_200_OK)
+
+        file_format = detect_file_format(
+            uploaded.name, request.query_params.get("file_format")
+        )
+        if file_format is None:
+            return Response(
+                {"message": "file must be CSV or JSON Lines"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        background = request.query_params.get("background", "").lower() in (
+            "1",
+            "true",
+        )
+        if background or uploaded.size > settings.STORE_ITEM_IMPORT_SYNC_MAX_BYTES:
+            job = StoreItemImport.objects.create(
+                store=user_store, file=uploaded, file_format=file_format
+            )
+            transaction.on_commit(lambda: import_store_items_task.delay(job.pk))
+            return Response(
+                StoreItemImportSerializer(job).data, status=status.HTTP_202_ACCEPTED
+            )
+
+        summary = import_store_items(user_store, iter_file_rows(uploaded, file_format))
+        return Response(summary, status=status.HTTP_200_OK)
+
+
+class StoreItemImportDetailView(APIView):
+    permission_classes = [IsSellerUser]
+
+    @swagger_auto_schema(
+        operation_summary="A Bulk Import Of Your Store",
+        operation_description="status and per-row report of a background store item import",
+        responses={200: StoreItemImportSerializer, 404: "Not found"},
+    )
+    def get(self, request, pk):
+        user_store = get_object_or_404(Store, seller=request.user)
+        try:
+            job = StoreItemImport.objects.get(pk=pk, store=user_store)
+        except StoreItemImport.DoesNotExist:
+            return Response(
+                {"message": "no such import"}, status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(
+            StoreItemImportSerializer(job).data, status=status.HTTP_200_OK
+        )
+
+
+def filter_store_orders(store_orders, query_params):
+    status_term = query_params.get("status", "")
+    if status_term:
+        try:
+            store_orders = store_orders.filter(
+                status=Order.OrderStatus[status_term.upper()].value
+            )
+        except KeyError:
+            return store_orders.none()
+
+    date_from = parse_date(query_params.get("date_from", "") or "")
+    if date_from:
+        store_orders = store_orders.filter(created_at__date__gte=date_from)
+    date_to = parse_date(query_params.get("date_to", "") or "")
+    if date_to:
+        store_orders = store_orders.filter(created_at__date__lte=date_to)
+
+    search_term = query_params.get("search", None)
+    if search_term:
+        # The name the customer bought, and the live product's description,
+        # which the snapshot does not keep.
+        store_orders = store_orders.filter(
+            Exists(
+                OrderItem.objects.filter(
+                    Q(snapshot__product_name__icontains=search_term)
+                    | Q(store_item__product__description__icontains=search_term),
+                    order_id=OuterRef("order_id"),
+                    store_item__store_id=OuterRef("store_id"),
+                )
+            )
+        )
+    return store_orders
+
+
 class StoreOrderListView(APIView):
     permission_classes = [IsSellerUser]
 
     @swagger_auto_schema(
         operation_summary="All Your Store's Orders",
-        operation_description="all orders from your store",
-        responses={200: OrderStatusSerializer(many=True)},
+        operation_description="all orders from your store. Filterable by 'status', 'date_from', 'date_to' (YYYY-MM-DD) and 'search' (product name or description).",
+        responses={200: StoreOrderReadSerializer(many=True)},
     )
     def get(self, request):
         user_store = get_object_or_404(Store, seller=self.request.user)
-        user_orders = Order.objects.filter(
-            items__store_item__store=user_store
-        ).distinct()
-
-        search_term = request.query_params.get("search", None)
-        if search_term:
-            user_orders = user_orders.filter(
-                Q(items__store_item__product__description__icontains=search_term)
-                | Q(items__store_item__product__name__icontains=search_term)
-            )
+        store_orders = filter_store_orders(
+            StoreOrder.objects.filter(store=user_store).order_by("-created_at"),
+            request.query_params,
+        )
 
         paginator = PageNumberPagination()
-        paginator.page_size = int(request.query_params.get("page_size", 10))
-        result_page = paginator.paginate_queryset(user_orders, request)
-        serializer = OrderStatusSerializer(result_page, many=True)
+        try:
+            paginator.page_size = int(request.query_params.get("page_size", 10))
+        except ValueError:
+            paginator.page_size = 10
+        result_page = paginator.paginate_queryset(store_orders, request)
+        serializer = StoreOrderReadSerializer(result_page, many=True)
         return paginator.get_paginated_response(serializer.data)
 
 
+class StoreItemExportView(APIView):
+    permission_classes = [IsSellerUser]
+    statement_timeout = "report"
+
+    @swagger_auto_schema(
+        operation_summary="Export Items Of Your Store",
+        operation_description="download all of your store items as CSV (default) or JSON Lines ('file_format=jsonl'). The file is streamed, so it works for any number of items.",
+        responses={200: "CSV or JSON Lines file"},
+    )
+    def get(self, request):
+        user_store = get_object_or_404(Store, seller=request.user)
+        store_items = StoreItem.objects.filter(store=user_store).order_by("pk")
+        return stream_export(
+            store_items,
+            [
+                "id",
+                "product_id",
+                "product__name",
+                "price",
+                "discount",
+                "stock",
+                "is_active",
+                "updated_at",
+            ],
+            request.query_params.get("file_format", "csv"),
+            "store_items",
+        )
+
+
+class StoreOrderExportView(APIView):
+    permission_classes = [IsSellerUser]
+    statement_timeout = "report"
+
+    @swagger_auto_schema(
+        operation_summary="Export Orders Of Your Store",
+        operation_description="download your store's orders as CSV (default) or JSON Lines ('file_format=jsonl'). Accepts the same filters as the order list.",
+        responses={200: "CSV or JSON Lines file"},
+    )
+    def get(self, request):
+        user_store = get_object_or_404(Store, seller=request.user)
+        store_orders = filter_store_orders(
+            StoreOrder.objects.filter(store=user_store).order_by("-created_at"),
+            request.query_params,
+        )
+        labels = dict(Order.OrderStatus.choices)
+
+        def with_status_label(row):
+            row["status"] = labels.get(row["status"], row["status"])
+            return row
+
+        return stream_export(
+            store_orders,
+            ["order_id", "status", "subtotal", "items_count", "created_at"],
+            request.query_params.get("file_format", "csv"),
+            "store_orders",
+            transform=with_status_label,
+        )
+
+
+class StoreOrderSummaryView(APIView):
+    permission_classes = [IsSellerUser]
+    statement_timeout = "report"
+
+    @swagger_auto_schema(
+        operation_summary="Your Store's Order Totals",
+        operation_description="order counts and revenue of your store, grouped by status. Accepts the same filters as the order list.",
+        responses={200: "Order totals"},
+    )
+    def get(self, request):
+        user_store = get_object_or_404(Store, seller=self.request.user)
+        store_orders = filter_store_orders(
+            StoreOrder.objects.filter(store=user_store), request.query_params
+        )
+        rows = store_orders.values("status").annotate(
+            orders=Count("id"), subtotal=Sum("subtotal")
+        ).order_by("status")
+
+        excluded = {Order.OrderStatus.CANCELLED, Order.OrderStatus.FAILED}
+        by_status = []
+        orders_count = 0
+        revenue = Decimal("0")
+        for row in rows:
+            by_status.append(
+                {
+                    "status": Order.OrderStatus(row["status"]).label,
+                    "orders": row["orders"],
+                    "subtotal": row["subtotal"],
+                }
+            )
+            orders_count += row["orders"]
+            if row["status"] not in excluded:
+                revenue += row["subtotal"]
+        return Response(
+            {"orders": orders_count, "revenue": revenue, "by_status": by_status},
+            status=status.HTTP_200_OK,
+        )
+
+
 class StoreOrderDetailView(APIView):
     permission_classes = [IsSellerUser]
 
     @swagger_auto_schema(
         operation_summary="An Order From Your Store",
         operation_description="see detail's of an order from your store",
-        responses={200: OrderStatusSerializer, 404: "Not found"},
+        responses={200: StoreOrderReadSerializer, 404: "Not found"},
     )
     def get(self, request, pk):
         user_store = get_object_or_404(Store, seller=self.request.user)
         try:
-            order = Order.objects.get(pk=pk, items__store_item__store=user_store)
-        except Order.DoesNotExist:
+            store_order = StoreOrder.objects.get(order_id=pk, store=user_store)
+        except StoreOrder.DoesNotExist:
             return Response(
                 {"message": "No such order found for your store"},
                 status=status.HTTP_404_NOT_FOUND,
             )
-        serializer = OrderStatusSerializer(order)
+        serializer = StoreOrderReadSerializer(store_order)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
@@ -428,8 +709,10 @@ class ChangeOrderStatusView(APIView):
     def post(self, request, pk):
         user_store = get_object_or_404(Store, seller=self.request.user)
         try:
-            order = Order.objects.get(pk=pk, items__store_item__store=user_store)
-        except Order.DoesNotExist:
+            order = StoreOrder.objects.select_related("order").get(
+                order_id=pk, store=user_store
+            ).order
+        except StoreOrder.DoesNotExist:
             return Response(
                 {"message": "No such order found for your store"},
                 status=status.HTTP_404_NOT_FOUND,
@@ -441,3 +724,94 @@ class ChangeOrderStatusView(APIView):
             serializer.save()
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+def get_analytics_range(query_params):
+    date_to = parse_date(query_params.get("date_to", "") or "") or timezone.now().date()
+    date_from = parse_date(query_params.get("date_from", "") or "") or (
+        date_to - timedelta(days=29)
+    )
+    return date_from, date_to
+
+
+class StoreSalesAnalyticsView(APIView):
+    permission_classes = [IsSellerUser]
+    statement_timeout = "report"
+
+    @swagger_auto_schema(
+        operation_summary="Your Store's Daily Sales",
+        operation_description="daily orders, units sold and revenue of your store between 'date_from' and 'date_to' (YYYY-MM-DD, last 30 days by default). Served from the daily rollups, so today's numbers may lag a few minutes.",
+        responses={200: "Daily sales series"},
+    )
+    def get(self, request):
+        user_store = get_object_or_404(Store, seller=self.request.user)
+        date_from, date_to = get_analytics_range(request.query_params)
+        rows = (
+            StoreDailySales.objects.filter(
+                store=user_store, date__gte=date_from, date__lte=date_to
+            )
+            .order_by("date")
+            .values("date", "orders_count", "units_sold", "revenue")
+        )
+        series = list(rows)
+        totals = {
+            "orders_count": sum(row["orders_count"] for row in series),
+            "units_sold": sum(row["units_sold"] for row in series),
+            "revenue": sum((row["revenue"] for row in series), Decimal("0")),
+        }
+        return Response(
+            {
+                "date_from": date_from,
+                "date_to": date_to,
+                "totals": totals,
+                "series": series,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class StoreTopItemsAnalyticsView(APIView):
+    permission_classes = [IsSellerUser]
+    statement_timeout = "report"
+
+    @swagger_auto_schema(
+        operation_summary="Your Store's Best Selling Items",
+        operation_description="top store items by 'revenue' or 'units' (query param 'order_by') between 'date_from' and 'date_to'. 'limit' defaults to 10.",
+        responses={200: "Top store items"},
+    )
+    def get(self, request):
+        user_store = get_object_or_404(Store, seller=self.request.user)
+        date_from, date_to = get_analytics_range(request.query_params)
+        try:
+            limit = max(1, min(int(request.query_params.get("limit", 10)), 100))
+        except ValueError:
+            limit = 10
+        order_field = (
+            "-units_sold"
+            if request.query_params.get("order_by") == "units"
+            else "-revenue"
+        )
+        rows = (
+            StoreItemDailySales.objects.filter(
+                store=user_store, date__gte=date_from, date__lte=date_to
+            )
+            .values("store_item_id")
+            .annotate(
+                orders_count=Sum("orders_count"),
+                units_sold=Sum("units_sold"),
+                revenue=Sum("revenue"),
+            )
+            .order_by(order_field, "store_item_id")[:limit]
+        )
+        items = list(rows)
+        names = dict(
+            StoreItem.all_objects.filter(
+                pk__in=[row["store_item_id"] for row in items]
+            ).values_list("pk", "product__name")
+        )
+        for row in items:
+            row["product_name"] = names.get(row["store_item_id"])
+        return Response(
+            {"date_from": date_from, "date_to": date_to, "results": items},
+            status=status.HTTP_200_OK,
+        )
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:38
+
+import apps.core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_user_picture_placeholder_user_picture_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='picture',
+            field=models.ImageField(blank=True, null=True, storage=apps.core.storage.media_storage, upload_to='users/pictures/'),
+        ),
+    ]
@@ -5,6 +5,8 @@ from apps.core.models import (
     SoftDeleteManager,
     HardDeleteManager,
 )
+from apps.core.images import schedule_image_variants
+from apps.core.storage import media_storage, track_media
 
 
 class UserManager(BaseUserManager, SoftDeleteManager):
@@ -36,7 +38,11 @@ class User(SoftDeleteModel, AbstractUser):
     email = models.EmailField(unique=True)
     phone = models.CharField(max_length=15, unique=True)
     is_seller = models.BooleanField(default=False)
-    picture = models.ImageField(upload_to="users/pictures/", null=True, blank=True)
+    picture = models.ImageField(
+        upload_to="users/pictures/", storage=media_storage, null=True, blank=True
+    )
+    picture_variants = models.JSONField(default=dict, blank=True)
+    picture_placeholder = models.TextField(blank=True, default="")
     USERNAME_FIELD = "phone"
     REQUIRED_FIELDS = ["email", "first_name", "last_name"]
     objects = UserManager()
@@ -48,6 +54,13 @@ class User(SoftDeleteModel, AbstractUser):
     def __str__(self):
         return f"{self.full_name}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        schedule_image_variants(self, "picture")
+
+
+track_media(User, "picture")
+
 
 class HardDeleteUser(User):
     objects = HardDeleteManager()
@@ -5,6 +5,7 @@ import re
 from django.contrib.auth.password_validation import validate_password
 from django.contrib.auth import get_user_model
 from apps.orders.serializers import OrderReadSerializer
+from apps.core.images import image_variant_urls
 
 User = get_user_model()
 
@@ -49,6 +50,7 @@ class PasswordResetSerializer(serializers.Serializer):
 
 class UserReadSerializer(serializers.ModelSerializer):
     orders = serializers.SerializerMethodField()
+    picture_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = User
@@ -60,10 +62,17 @@ class UserReadSerializer(serializers.ModelSerializer):
             "last_name",
             "full_name",
             "picture",
+            "picture_variants",
+            "picture_placeholder",
             "orders",
         ]
         read_only_fields = fields
 
+    def get_picture_variants(self, obj):
+        return image_variant_urls(
+            obj.picture, obj.picture_variants, self.context.get("request")
+        )
+
     def get_orders(self, obj):
         return OrderReadSerializer(
             obj.orders.all(), many=True, context=self.context
@@ -12,10 +12,14 @@ from .signals import register_seller
 from apps.users.tasks import send_otp_sms_task, send_otp_email_task
 from django.core.cache import cache
 from rest_framework.views import APIView
+from asgiref.sync import sync_to_async
+from apps.core.views import AsyncAPIView
 from drf_yasg.utils import swagger_auto_schema
 from django.conf import settings
 from apps.users.permissions import IsSellerUser
 from apps.stores.models import Store
+from apps.orders.models import Order
+from django.db.models import Prefetch, prefetch_related_objects
 from rest_framework_simplejwt.tokens import RefreshToken
 import logging
 
@@ -45,6 +49,15 @@ class MyUserView(APIView):
     def get(self, request):
         user = request.user
         if user.is_active:
+            prefetch_related_objects(
+                [user],
+                Prefetch(
+                    "orders",
+                    queryset=Order.objects.select_related(
+                        "customer", "address"
+                    ).prefetch_related("items"),
+                ),
+            )
             serializer = UserReadSerializer(user)
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(
@@ -110,7 +123,7 @@ class MyUserView(APIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class SellerRegistrationView(APIView):
+class SellerRegistrationView(AsyncAPIView):
     permission_classes = [IsAuthenticated]
 
     @swagger_auto_schema(
@@ -127,7 +140,7 @@ class SellerRegistrationView(APIView):
             "application/json (verify OTP)": {"code": "123456"},
         },
     )
-    def post(self, request):
+    async def post(self, request):
         user = request.user
         seller_otp_key = f"seller_otp_user_{user.id}"
 
@@ -135,16 +148,16 @@ class SellerRegistrationView(APIView):
             serializer = CodeSerializer(data=request.data)
             if serializer.is_valid():
                 user_otp = serializer.validated_data["code"]  # type: ignore
-                main_otp = cache.get(seller_otp_key)
+                main_otp = await cache.aget(seller_otp_key)
                 if user_otp != main_otp:
                     return Response(
                         {"detail": "The entered code is incorrect."},
                         status=status.HTTP_400_BAD_REQUEST,
                     )
                 user.is_seller = True
-                user.save()
-                register_seller.send(sender=self.__class__, user=user)
-                cache.delete(seller_otp_key)
+                await user.asave()
+                await register_seller.asend(sender=self.__class__, user=user)
+                await cache.adelete(seller_otp_key)
                 return Response(
                     {"message": "Congratulations! You are now a seller."},
                     status=status.HTTP_200_OK,
@@ -159,10 +172,10 @@ class SellerRegistrationView(APIView):
                 )
 
             code = randint(100000, 999999)
-            cache.set(seller_otp_key, code, timeout=settings.OTP_TIME)
+            await cache.aset(seller_otp_key, code, timeout=settings.OTP_TIME)
             logger.debug("Seller OTP for user %s: %s", user.id, code)
-            send_otp_sms_task.delay(user.phone, code)
-            send_otp_email_task.delay(user.email, code)
+            await sync_to_async(send_otp_sms_task.delay)(user.phone, code)
+            await sync_to_async(send_otp_email_task.delay)(user.email, code)
             return Response(
                 {"message": "Verification code has been sent"},
                 status=status.HTTP_200_OK,
@@ -12,5 +12,9 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+# Before the settings load: only the web server gets the default statement
+# timeout, not Celery workers or management commands.
+os.environ.setdefault('DB_WEB_PROCESS', 'True')
+os.environ.setdefault('ASGI_SERVER', 'True')
 
 application = get_asgi_application()
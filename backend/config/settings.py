@@ -11,7 +11,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
-from decouple import config
+from corsheaders.defaults import default_headers
+from decouple import Csv, config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -61,9 +62,17 @@ INSTALLED_APPS = [
 ]
 
 CORS_ALLOW_ALL_ORIGINS = True
+# Guest carts are named by this header (see apps.cart.storage).
+CORS_ALLOW_HEADERS = (*default_headers, "x-cart-token")
+CORS_EXPOSE_HEADERS = ["X-Cart-Token"]
 
 
 MIDDLEWARE = [
+    'apps.core.middleware.RequestMetricsMiddleware',
+    'apps.core.middleware.RequestProfilingMiddleware',
+    'apps.core.middleware.CompressionMiddleware',
+    'apps.core.middleware.StatementTimeoutMiddleware',
+    'apps.core.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -115,13 +124,65 @@ DATABASES = {
         'PASSWORD': config('DB_PASSWORD'),
         'HOST': config('DB_HOST', default='localhost'),
         'PORT': config('DB_PORT', default='5432'),
+        # Keep connections open between requests, checking them before reuse.
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool),
+        'OPTIONS': {},
     }
 }
 
+# Statement timeouts in milliseconds (0 for none). Views opt into a longer
+# class with a ``statement_timeout = "report"`` attribute, see
+# apps.core.middleware.StatementTimeoutMiddleware.
+DB_STATEMENT_TIMEOUTS = {
+    'default': config('DB_STATEMENT_TIMEOUT', default=5000, cast=int),
+    'report': config('DB_REPORT_STATEMENT_TIMEOUT', default=30000, cast=int),
+}
+
+# DB_POOL uses Django's psycopg connection pool (psycopg 3 with the pool
+# extra, in requirements.txt) and replaces CONN_MAX_AGE.
+if config('DB_POOL', default=False, cast=bool):
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+        'max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+        'timeout': config('DB_POOL_TIMEOUT', default=10, cast=int),
+    }
+
+# Behind pgbouncer in transaction mode: no server-side cursors, and no session
+# settings, since the next transaction may run on another server connection.
+# Set the default statement_timeout on the database role instead.
+# The default timeout only applies to the web server (config.wsgi and
+# config.asgi set DB_WEB_PROCESS): migrations, seeding and Celery tasks may
+# legitimately run long statements.
+DB_PGBOUNCER = config('DB_PGBOUNCER', default=False, cast=bool)
+DB_WEB_PROCESS = config('DB_WEB_PROCESS', default=False, cast=bool)
+if DB_PGBOUNCER:
+    DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+elif DB_STATEMENT_TIMEOUTS['default'] and DB_WEB_PROCESS:
+    DATABASES['default']['OPTIONS']['options'] = (
+        f"-c statement_timeout={DB_STATEMENT_TIMEOUTS['default']}"
+    )
+
+# Read replicas, one alias per host in DB_REPLICA_HOSTS, using the primary's
+# credentials. Views with ``read_replica = True`` read from them; a client is
+# kept on the primary for DB_REPLICA_PIN_SECONDS after each of its writes.
+DB_REPLICAS = []
+for index, host in enumerate(config('DB_REPLICA_HOSTS', default='', cast=Csv()), 1):
+    DATABASES[f'replica_{index}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'OPTIONS': dict(DATABASES['default']['OPTIONS']),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DB_REPLICAS.append(f'replica_{index}')
+DATABASE_ROUTERS = ['apps.core.db_router.ReplicaRouter']
+DB_REPLICA_PIN_SECONDS = config('DB_REPLICA_PIN_SECONDS', default=5, cast=int)
+
 
 CACHES = {
     "default": {
-        "BACKEND": "django_redis.cache.RedisCache",
+        "BACKEND": "apps.core.profiling.ProfiledRedisCache",
         "LOCATION": f"redis://{config('REDIS_HOST', 'redis')}:{config('REDIS_PORT', '6379')}/1",
         "OPTIONS": {
             "CLIENT_CLASS": "django_redis.client.DefaultClient",
@@ -178,6 +239,84 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"
+    },
+    # Product, category and user images are deduplicated by content hash.
+    "media": {"BACKEND": "apps.core.storage.ContentAddressedStorage"},
+}
+
+# WebP variants generated for uploaded product, category and user images.
+IMAGE_VARIANT_WIDTHS = (160, 320, 640, 1280)
+IMAGE_VARIANT_QUALITY = 80
+# Uploaded images are checked against these using only the file header.
+IMAGE_UPLOAD_FORMATS = ("JPEG", "PNG", "WEBP", "GIF")
+IMAGE_UPLOAD_MAX_DIMENSION = 8000
+# Width of the variant list endpoints return instead of the original file.
+IMAGE_LIST_WIDTH = 320
+
+# Bulk store item uploads larger than this are imported by a Celery worker.
+STORE_ITEM_IMPORT_SYNC_MAX_BYTES = config(
+    'STORE_ITEM_IMPORT_SYNC_MAX_BYTES', default=512 * 1024, cast=int
+)
+
+# Share of requests profiled by RequestProfilingMiddleware (0 to 1), and the
+# number of queries above which a profiled request is logged as a warning.
+REQUEST_PROFILING_SAMPLE_RATE = config(
+    'REQUEST_PROFILING_SAMPLE_RATE', default=0.1, cast=float
+)
+REQUEST_QUERY_BUDGET = config('REQUEST_QUERY_BUDGET', default=30, cast=int)
+
+# Responses smaller than this are sent uncompressed. With
+# CATALOG_CACHE_TIMEOUT set (e.g. 30), anonymous product and category
+# responses are cached for that many seconds, compressed forms included.
+# Stock changed through queryset updates, which includes every checkout,
+# payment and released hold, shows up once an entry expires.
+COMPRESSION_MIN_SIZE = config('COMPRESSION_MIN_SIZE', default=1024, cast=int)
+CATALOG_CACHE_TIMEOUT = config('CATALOG_CACHE_TIMEOUT', default=0, cast=int)
+# Facet counts of a filter combination requested FACET_CACHE_MIN_HITS times
+# within an hour are cached for FACET_CACHE_TIMEOUT seconds (0 disables).
+# Stock sold since shows up once an entry expires.
+FACET_CACHE_TIMEOUT = config('FACET_CACHE_TIMEOUT', default=60, cast=int)
+FACET_CACHE_MIN_HITS = config('FACET_CACHE_MIN_HITS', default=3, cast=int)
+# Upper bounds of the price ranges counted by /api/products/facets/.
+PRICE_FACET_BOUNDS = (100000, 500000, 1000000, 5000000)
+# /api/products/suggest/ answers from a prefix index of product and
+# category names; prefixes shorter than SUGGEST_MIN_CHARS are not indexed
+# and only the first SUGGEST_MAX_CHARS characters are.
+SUGGEST_MIN_CHARS = 2
+SUGGEST_MAX_CHARS = 20
+SUGGEST_MAX_RESULTS = 20
+SUGGEST_BATCH_SIZE = 1000
+
+# Upper bound for each dependency probe of the readiness check and /metrics.
+HEALTH_CHECK_TIMEOUT = config('HEALTH_CHECK_TIMEOUT', default=2.0, cast=float)
+# Probe results and /metrics gauges are reused for this long in each process.
+HEALTH_CHECK_CACHE_SECONDS = config('HEALTH_CHECK_CACHE_SECONDS', default=5, cast=float)
+METRICS_CELERY_QUEUES = ("celery",)
+# Bearer token Prometheus sends to /metrics; the endpoint answers 403 without it.
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+# Seconds each process buffers request and task timings before pushing them
+# to the metrics store in one batch.
+METRICS_FLUSH_INTERVAL = config('METRICS_FLUSH_INTERVAL', default=5, cast=float)
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "apps.profiling": {
+            "handlers": ["console"],
+            "level": config('PROFILING_LOG_LEVEL', default='INFO'),
+            "propagate": False,
+        },
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -188,11 +327,27 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'apps.core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'apps.core.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
+    'DEFAULT_THROTTLE_RATES': {
+        'otp_request': config('OTP_REQUEST_RATE', default='5/minute'),
+        'otp_verify': config('OTP_VERIFY_RATE', default='10/minute'),
+    },
 }
 
+# Seconds an emailed or texted one-time code stays valid.
+OTP_TIME = config('OTP_TIME', default=120, cast=int)
+
 from datetime import timedelta
 
 SIMPLE_JWT = {
@@ -234,6 +389,36 @@ ZARINPAL_SANDBOX = True
 SANDBOX = True 
 MERCHANT_ID = "a0000000-0000-0000-0000-000000000000"
 
+ZARINPAL_MERCHANT_ID = config('ZARINPAL_MERCHANT_ID', default=MERCHANT_ID)
+ZARINPAL_HOST = "sandbox.zarinpal.com" if ZARINPAL_SANDBOX else "payment.zarinpal.com"
+ZARINPAL_REQUEST_URL = f"https://{ZARINPAL_HOST}/pg/v4/payment/request.json"
+ZARINPAL_VERIFY_URL = f"https://{ZARINPAL_HOST}/pg/v4/payment/verify.json"
+ZARINPAL_STARTPAY = f"https://{ZARINPAL_HOST}/pg/StartPay/"
+ZARINPAL_CALLBACK = config(
+    'ZARINPAL_CALLBACK', default='http://localhost:8000/api/payments/verify/'
+)
+# apps.payments.gateway.FakeGateway approves every payment without a network
+# call, for benchmarks and offline development.
+PAYMENT_GATEWAY = config(
+    'PAYMENT_GATEWAY', default='apps.payments.gateway.ZarinPalGateway'
+)
+# "redis" keeps carts in Redis hashes, written back to the database every
+# minute and at checkout, and enables guest carts; "database" uses the rows.
+CART_STORAGE = config('CART_STORAGE', default='database')
+# Seconds a Redis cart is kept after its last change.
+CART_TTL = config('CART_TTL', default=7 * 24 * 3600, cast=int)
+# Seconds checkout holds stock for an unpaid order; longer than the gateway
+# keeps a payment open, so a customer still paying never loses the items.
+STOCK_RESERVATION_TTL = config('STOCK_RESERVATION_TTL', default=1200, cast=int)
+PAYMENT_GATEWAY_TIMEOUT = config('PAYMENT_GATEWAY_TIMEOUT', default=10, cast=int)
+# Open connections to the gateway each ASGI worker keeps at most.
+PAYMENT_GATEWAY_MAX_CONNECTIONS = config(
+    'PAYMENT_GATEWAY_MAX_CONNECTIONS', default=20, cast=int
+)
+# Set by config.asgi. Only there does one event loop serve every request, so
+# the gateway client can be kept open; WSGI runs each async view on a new loop.
+ASGI_SERVER = config('ASGI_SERVER', default=False, cast=bool)
+
 import os
 
 CELERY_BROKER_URL =  'redis://localhost:6379/0'
@@ -243,6 +428,33 @@ CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 
+CELERY_BEAT_SCHEDULE = {
+    "rollup-store-sales": {
+        "task": "apps.stores.tasks.rollup_store_sales",
+        "schedule": timedelta(minutes=15),
+    },
+    "apply-promotions": {
+        "task": "apps.stores.tasks.apply_promotions_task",
+        "schedule": timedelta(minutes=1),
+    },
+    "flush-popularity": {
+        "task": "apps.products.tasks.flush_popularity_task",
+        "schedule": timedelta(minutes=1),
+    },
+    "rebuild-suggest-index": {
+        "task": "apps.products.tasks.rebuild_suggest_index",
+        "schedule": timedelta(hours=1),
+    },
+    "flush-carts": {
+        "task": "apps.cart.tasks.flush_carts",
+        "schedule": timedelta(minutes=1),
+    },
+    "release-expired-reservations": {
+        "task": "apps.orders.tasks.release_expired_reservations_task",
+        "schedule": timedelta(minutes=1),
+    },
+}
+
 
 JAZZMIN_SETTINGS = {
     # title of the window (Will default to current_admin_site.site_title if absent or None)
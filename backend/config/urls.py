@@ -5,7 +5,7 @@ from django.conf.urls.static import static
 from drf_yasg.views import get_schema_view  # type: ignore
 from drf_yasg import openapi  # type: ignore
 from rest_framework import permissions  # type: ignore
-from config.views import health_check
+from config.views import health_check, metrics, readiness_check, serve_media
 
 schema_view = get_schema_view(
     openapi.Info(
@@ -22,6 +22,8 @@ schema_view = get_schema_view(
 
 urlpatterns = [
     path("health/", health_check),
+    path("ready/", readiness_check),
+    path("metrics", metrics),
     path("admin/", admin.site.urls),
     re_path(
         r"^swagger(?P<format>\.json|\.yaml)$",
@@ -38,5 +40,7 @@ urlpatterns = [
 ]
 
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    urlpatterns += static(
+        settings.MEDIA_URL, view=serve_media, document_root=settings.MEDIA_ROOT
+    )
 
@@ -1,5 +1,64 @@
-from django.http import JsonResponse
+import hmac
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+from django.views.static import serve
+from apps.core.metrics import (
+    cached,
+    check,
+    probe_cache,
+    probe_database,
+    render_metrics,
+)
+from apps.core.storage import BLOB_CACHE_CONTROL, is_blob
 
 
 def health_check(request):
     return JsonResponse({"status": "ok"})
+
+
+def run_probes():
+    checks = {}
+    for name, probe in [("database", probe_database), ("cache", probe_cache)]:
+        ok, seconds, error = check(probe)
+        checks[name] = {"ok": ok, "ms": round(seconds * 1000, 1)}
+        if error:
+            checks[name]["error"] = error
+    return checks
+
+
+def readiness_check(request):
+    """Probe Postgres and Redis, each bounded by ``HEALTH_CHECK_TIMEOUT``.
+    The result is reused for ``HEALTH_CHECK_CACHE_SECONDS``."""
+    checks = cached("readiness", run_probes)
+    ready = all(result["ok"] for result in checks.values())
+    return JsonResponse(
+        {"status": "ok" if ready else "unavailable", "checks": checks},
+        status=200 if ready else 503,
+    )
+
+
+def has_metrics_token(request):
+    expected = f"Bearer {settings.METRICS_TOKEN}"
+    given = request.headers.get("Authorization", "")
+    return bool(settings.METRICS_TOKEN) and hmac.compare_digest(
+        given.encode(), expected.encode()
+    )
+
+
+def metrics(request):
+    """Prometheus metrics, for scrapers sending ``METRICS_TOKEN`` as a bearer
+    token. Without a token configured the endpoint is closed."""
+    if not has_metrics_token(request):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+def serve_media(request, path, document_root=None, show_indexes=False):
+    """Development media server. Content-addressed blobs never change, so they
+    get the same long-lived cache header the web server sets in production."""
+    response = serve(request, path, document_root, show_indexes)
+    if is_blob(path):
+        response["Cache-Control"] = BLOB_CACHE_CONTROL
+    return response
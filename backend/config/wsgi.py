@@ -12,5 +12,8 @@ import os
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+# Before the settings load: only the web server gets the default statement
+# timeout, not Celery workers or management commands.
+os.environ.setdefault('DB_WEB_PROCESS', 'True')
 
 application = get_wsgi_application()
@@ -3,25 +3,29 @@ from apps.accounts.tests.test_account import *
 from apps.addresses.tests.api_tests import *
 from apps.addresses.tests.model_tests import *
 
+from apps.core.tests.api_tests import *
+from apps.core.tests.query_budget_tests import *
+
 # from apps.cart.tests.api_tests import *
 # from apps.cart.tests.model_tests import *
+from apps.cart.tests.storage_tests import *
 
 # from apps.categories.tests.api_tests import *
 # from apps.categories.tests.model_tests import *
 
 # from apps.orders.tests.api_tests import *
-# from apps.orders.tests.model_tests import *
+from apps.orders.tests.model_tests import *
 
 # from apps.payments.tests.api_tests import *
 # from apps.payments.tests.model_tests import *
 
-# from apps.products.tests.api_tests import *
-# from apps.products.tests.model_tests import *
+from apps.products.tests.api_tests import *
+from apps.products.tests.model_tests import *
 
 # from apps.reviews.tests.api_tests import *
 # from apps.reviews.tests.model_tests import *
 
-# from apps.stores.tests.api_tests import *
+from apps.stores.tests.api_tests import *
 # from apps.stores.tests.model_tests import *
 
 # from apps.users.tests.api_tests import *